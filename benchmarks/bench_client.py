@@ -0,0 +1,263 @@
+"""Measure push and execute against a local mock server, and catch regressions.
+
+Each scenario pushes a DataFrame of the given rows, width and dtypes, then
+queries a result of the same shape back as JSON and as an Arrow stream. It
+reports push throughput with per-stage timings, the peak memory used by the
+push, and query rows per second. Scenarios run in their own process, and on
+Linux the memory high-water mark is reset before pushing, so that earlier
+allocations do not hide the peak of the push.
+
+The mock server runs in the benchmark process and competes with the client for
+the GIL, so absolute numbers understate real throughput; compare them with a
+baseline recorded on the same machine.
+
+Run with:
+    poetry run python benchmarks/bench_client.py
+    poetry run python benchmarks/bench_client.py --rows 100000 --dtypes mixed
+    poetry run python benchmarks/bench_client.py --save-baseline
+    poetry run python benchmarks/bench_client.py --compare
+"""
+
+import argparse
+import itertools
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Optional
+
+from mock_server import DTYPES, MockChakraServer, make_frame
+
+from chakra_py import Chakra, TransportConfig
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_ROWS = [10_000, 100_000, 500_000]
+DEFAULT_WIDTHS = [4, 16]
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baselines.json")
+DEFAULT_TOLERANCE = 0.25
+# Differences below these are noise, whatever the relative change
+MEMORY_NOISE_MB = 16.0
+TIME_NOISE_SECONDS = 0.05
+# Metrics compared with the baseline, where higher is worse
+COMPARED_METRICS = ("push_seconds", "push_peak_mb", "json_seconds", "arrow_seconds")
+
+
+def _proc_status_mb(field: str) -> Optional[float]:
+    """A memory field of /proc/self/status, in MB, on Linux."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_rss() -> float:
+    """Reset the memory high-water mark where possible and return the current RSS in MB."""
+    try:
+        # Linux resets VmHWM to the current RSS when 5 is written here
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+    current = _proc_status_mb("VmRSS")
+    return current if current is not None else peak_rss_mb()
+
+
+def peak_rss_mb() -> Optional[float]:
+    """The memory high-water mark of this process, in MB."""
+    peak = _proc_status_mb("VmHWM")
+    if peak is not None or resource is None:
+        return peak
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+
+def best_of(func, repeat: int):
+    """The result of the fastest of repeat calls and its wall-clock time."""
+    best, best_result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        if elapsed < best:
+            best, best_result = elapsed, result
+    return best_result, best
+
+
+def run_scenario(rows: int, width: int, dtypes: str, repeat: int) -> dict:
+    """Run one scenario in this process and return its metrics."""
+    df = make_frame(rows, width, dtypes)
+    raw_mb = df.memory_usage(deep=True).sum() / 1024 / 1024
+    query = f"SELECT * FROM {dtypes}_{width} LIMIT {rows}"
+
+    with MockChakraServer() as server, Chakra(
+        "access:secret:benchmark",
+        quiet=True,
+        transport_config=TransportConfig(base_url=server.url),
+    ) as client:
+        # Log in and create the table untimed
+        client.push("bench.main.data", df.head(10), method="parquet")
+
+        memory_before = reset_peak_rss()
+        push, push_seconds = best_of(
+            lambda: client.push("bench.main.data", df, method="parquet"), repeat
+        )
+        memory_after = peak_rss_mb()
+
+        # Let the server build its results untimed
+        client.execute(query)
+        client.execute_arrow(query)
+        _, json_seconds = best_of(lambda: client.execute(query), repeat)
+        _, arrow_seconds = best_of(lambda: client.execute_arrow(query), repeat)
+
+    return {
+        "rows": rows,
+        "width": width,
+        "dtypes": dtypes,
+        "raw_mb": raw_mb,
+        "push_seconds": push_seconds,
+        "push_mb_per_s": raw_mb / push_seconds,
+        "push_peak_mb": (
+            memory_after - memory_before
+            if None not in (memory_before, memory_after)
+            else None
+        ),
+        "push_timings": {
+            stage: seconds
+            for stage, seconds in push.timings.items()
+            if stage != "total"
+        },
+        "compression_ratio": push.compression_ratio,
+        "json_seconds": json_seconds,
+        "json_rows_per_s": rows / json_seconds,
+        "arrow_seconds": arrow_seconds,
+        "arrow_rows_per_s": rows / arrow_seconds,
+    }
+
+
+def run_isolated(rows: int, width: int, dtypes: str, repeat: int) -> dict:
+    """Run one scenario in a fresh process."""
+    output = subprocess.run(
+        [
+            sys.executable,
+            __file__,
+            "--worker",
+            json.dumps([rows, width, dtypes, repeat]),
+        ],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def scenario_key(result: dict) -> str:
+    return f"{result['dtypes']}/{result['rows']}x{result['width']}"
+
+
+def regressions(results: list[dict], baseline: dict, tolerance: float) -> list[str]:
+    """Describe the metrics that got worse than the baseline by more than tolerance."""
+    found = []
+    for result in results:
+        previous = baseline.get(scenario_key(result))
+        if previous is None:
+            continue
+        for metric in COMPARED_METRICS:
+            old, new = previous.get(metric), result.get(metric)
+            if old is None or new is None:
+                continue
+            noise = MEMORY_NOISE_MB if metric.endswith("_mb") else TIME_NOISE_SECONDS
+            if new - old < noise:
+                continue
+            if new > old * (1 + tolerance):
+                found.append(
+                    f"{scenario_key(result)} {metric}: {old:.3f} -> {new:.3f} "
+                    f"(+{(new / old - 1) * 100:.0f}%)"
+                )
+    return found
+
+
+def print_results(results: list[dict]) -> None:
+    print(
+        f"{'scenario':>22} {'MB':>7} {'push MB/s':>10} {'peak MB':>8} "
+        f"{'json rows/s':>12} {'arrow rows/s':>13}  push stages (s)"
+    )
+    for result in results:
+        peak = result["push_peak_mb"]
+        stages = " ".join(
+            f"{stage} {seconds:.3f}"
+            for stage, seconds in sorted(result["push_timings"].items())
+        )
+        print(
+            f"{scenario_key(result):>22} {result['raw_mb']:>7.1f} "
+            f"{result['push_mb_per_s']:>10.1f} "
+            f"{peak if peak is not None else float('nan'):>8.1f} "
+            f"{result['json_rows_per_s']:>12,.0f} {result['arrow_rows_per_s']:>13,.0f}"
+            f"  {stages}"
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS)
+    parser.add_argument("--widths", type=int, nargs="+", default=DEFAULT_WIDTHS)
+    parser.add_argument("--dtypes", nargs="+", choices=DTYPES, default=list(DTYPES))
+    parser.add_argument("--repeat", type=int, default=3, help="keep the best of N runs")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="store the results as the baseline"
+    )
+    parser.add_argument(
+        "--compare",
+        action="store_true",
+        help="exit with status 1 if a metric regressed against the baseline",
+    )
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_scenario(*json.loads(args.worker))))
+        return 0
+
+    results = [
+        run_isolated(rows, width, dtypes, args.repeat)
+        for dtypes, width, rows in itertools.product(
+            args.dtypes, args.widths, args.rows
+        )
+    ]
+    print_results(results)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    if args.save_baseline:
+        baseline.update({scenario_key(result): result for result in results})
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nSaved {len(results)} scenarios to {args.baseline}")
+
+    if args.compare:
+        found = regressions(results, baseline, args.tolerance)
+        if found:
+            print("\nRegressions against the baseline:")
+            print("\n".join(f"  {line}" for line in found))
+            return 1
+        print("\nNo regressions against the baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""Time how `execute` turns each kind of response body into a DataFrame.
+
+Each path is the one `execute` takes for its response:
+
+- row-wise: a JSON body with the default dtype_backend, built row by row
+  into a NumPy-backed DataFrame
+- json pyarrow: a JSON body with dtype_backend="pyarrow", decoded column by
+  column into an Arrow table and wrapped in Arrow dtypes
+- ipc pyarrow: an Arrow IPC stream with dtype_backend="pyarrow"
+
+Times include parsing the body. Ratios are relative to the row-wise path,
+above 1 meaning faster.
+
+Run with:
+    poetry run python benchmarks/bench_execute.py [rows ...]
+"""
+
+import json
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from chakra_py.results import arrow_to_pandas, decode_arrow_stream, decode_json_result
+
+
+def make_response(rows: int) -> tuple[bytes, bytes]:
+    """Build the same result as a JSON body and an Arrow IPC stream."""
+    rng = np.random.default_rng(0)
+    table = pa.Table.from_pydict(
+        {
+            "id": np.arange(rows),
+            "value": rng.normal(size=rows),
+            "category": rng.choice(["a", "b", "c", "d"], size=rows),
+            "active": rng.random(rows) > 0.5,
+        }
+    )
+    body = {
+        "columns": table.column_names,
+        "rows": [list(r.values()) for r in table.to_pylist()],
+    }
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return json.dumps(body).encode(), sink.getvalue().to_pybytes()
+
+
+def timed(func, repeat: int = 3) -> float:
+    """Best wall-clock time of func over a few runs, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(sizes: list[int]) -> None:
+    print(
+        f"{'rows':>10} {'row-wise':>10} {'json pyarrow':>13} {'ipc pyarrow':>12} "
+        f"{'json x':>7} {'ipc x':>8}"
+    )
+    for rows in sizes:
+        json_body, arrow_body = make_response(rows)
+
+        def row_wise():
+            data = json.loads(json_body)
+            return pd.DataFrame(data["rows"], columns=data["columns"])
+
+        def json_pyarrow():
+            return arrow_to_pandas(decode_json_result(json.loads(json_body)))
+
+        def ipc_pyarrow():
+            return arrow_to_pandas(decode_arrow_stream(arrow_body))
+
+        # Arrow dtypes hold the same values as the NumPy dtypes of row-wise
+        expected = row_wise()
+        for path in (json_pyarrow, ipc_pyarrow):
+            pd.testing.assert_frame_equal(
+                path().astype(expected.dtypes.to_dict()), expected
+            )
+
+        baseline, decoded, ipc = (
+            timed(row_wise),
+            timed(json_pyarrow),
+            timed(ipc_pyarrow),
+        )
+        print(
+            f"{rows:>10} {baseline * 1000:>8.1f}ms {decoded * 1000:>11.1f}ms "
+            f"{ipc * 1000:>10.1f}ms "
+            f"{baseline / decoded:>6.2f}x {baseline / ipc:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000])
@@ -0,0 +1,140 @@
+"""Measure import time, construction time and per-call overhead of a quiet client.
+
+Import and construction are timed in fresh processes, best of several runs.
+Per-call overhead is the time a quiet `execute` of an empty result takes
+beyond a bare `requests` POST of the same query on a kept-alive connection,
+both against the local mock server. The run fails if a measurement exceeds
+its target, so that eager imports or per-call console work do not creep back.
+
+Run with:
+    poetry run python benchmarks/bench_startup.py
+    poetry run python benchmarks/bench_startup.py --calls 2000
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+import requests
+from mock_server import MockChakraServer
+
+from chakra_py import Chakra, TransportConfig
+
+# Targets in seconds, with room for slower machines than the one they were
+# measured on (about 0.2s to import and 0.3ms of overhead per call)
+TARGETS = {
+    "import_seconds": 0.4,
+    "construct_seconds": 0.01,
+    "call_overhead_seconds": 0.001,
+}
+# Modules that must not be loaded by importing and constructing a quiet client
+HEAVY_MODULES = ("pandas", "pyarrow", "tqdm", "httpx")
+
+_STARTUP_SCRIPT = f"""
+import json, sys, time
+start = time.perf_counter()
+from chakra_py import Chakra
+imported = time.perf_counter()
+Chakra("access:secret:benchmark", quiet=True)
+constructed = time.perf_counter()
+print(json.dumps({{
+    "import_seconds": imported - start,
+    "construct_seconds": constructed - imported,
+    "heavy_modules": [m for m in {HEAVY_MODULES!r} if m in sys.modules],
+}}))
+"""
+
+
+def measure_startup(repeat: int) -> dict:
+    """Best import and construction times over fresh processes."""
+    runs = [
+        json.loads(
+            subprocess.run(
+                [sys.executable, "-c", _STARTUP_SCRIPT],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+        )
+        for _ in range(repeat)
+    ]
+    return {
+        "import_seconds": min(run["import_seconds"] for run in runs),
+        "construct_seconds": min(run["construct_seconds"] for run in runs),
+        "heavy_modules": runs[0]["heavy_modules"],
+    }
+
+
+def _best_per_call(func, calls: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(calls):
+            func()
+        best = min(best, (time.perf_counter() - start) / calls)
+    return best
+
+
+def measure_call_overhead(calls: int, repeat: int) -> dict:
+    """Seconds per quiet execute, per bare POST, and the difference."""
+    query = "SELECT 1"
+    with MockChakraServer() as server, Chakra(
+        "access:secret:benchmark",
+        quiet=True,
+        transport_config=TransportConfig(base_url=server.url),
+    ) as client, requests.Session() as session:
+        client.execute(query)
+        url = f"{server.url}/api/v1/query"
+        headers = {"Authorization": f"Bearer {client.token}"}
+        session.post(url, json={"sql": query}, headers=headers).json()
+
+        client_seconds = _best_per_call(lambda: client.execute(query), calls, repeat)
+        raw_seconds = _best_per_call(
+            lambda: session.post(url, json={"sql": query}, headers=headers).json(),
+            calls,
+            repeat,
+        )
+    return {
+        "call_seconds": client_seconds,
+        "raw_call_seconds": raw_seconds,
+        "call_overhead_seconds": max(client_seconds - raw_seconds, 0.0),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--calls", type=int, default=500, help="calls per run")
+    parser.add_argument("--repeat", type=int, default=5, help="keep the best of N runs")
+    args = parser.parse_args()
+
+    results = {
+        **measure_startup(args.repeat),
+        **measure_call_overhead(args.calls, args.repeat),
+    }
+    print(f"{'import':>16} {results['import_seconds'] * 1e3:>8.1f} ms")
+    print(f"{'construct':>16} {results['construct_seconds'] * 1e3:>8.3f} ms")
+    print(f"{'execute':>16} {results['call_seconds'] * 1e3:>8.3f} ms")
+    print(f"{'bare POST':>16} {results['raw_call_seconds'] * 1e3:>8.3f} ms")
+    print(f"{'call overhead':>16} {results['call_overhead_seconds'] * 1e3:>8.3f} ms")
+
+    failures = [
+        f"{metric}: {results[metric] * 1e3:.3f} ms > {target * 1e3:.3f} ms"
+        for metric, target in TARGETS.items()
+        if results[metric] > target
+    ]
+    if results["heavy_modules"]:
+        failures.append(
+            f"importing a quiet client loaded {', '.join(results['heavy_modules'])}"
+        )
+    if failures:
+        print("\nTargets missed:")
+        print("\n".join(f"  {line}" for line in failures))
+        return 1
+    print("\nAll startup and overhead targets met.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+"""Local stand-in for the Chakra API and its presigned upload target.
+
+Used by the benchmarks to measure the client without network variance. The
+server accepts every request the client sends, discards uploaded parts and
+answers `SELECT * FROM <dtypes>_<width> LIMIT <rows>` with a synthetic result
+built by `make_frame`, as JSON or as an Arrow stream depending on the Accept
+header. Encoded results are cached, so only the first request for a shape pays
+for building it.
+"""
+
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from chakra_py.results import ARROW_STREAM_MEDIA_TYPE
+from chakra_py.typemap import column_types
+
+DTYPES = ("numeric", "strings", "mixed")
+
+_RESULT_QUERY = re.compile(r"FROM\s+(\w+)_(\d+)\s+LIMIT\s+(\d+)", re.IGNORECASE)
+
+
+def make_frame(rows: int, width: int, dtypes: str, seed: int = 0) -> pd.DataFrame:
+    """Build a DataFrame of random data.
+
+    Args:
+        rows: Number of rows
+        width: Number of columns
+        dtypes: "numeric" for int64 and float64 columns, "strings" for short
+            string columns, or "mixed" for integers, floats, strings,
+            booleans and timestamps
+        seed: Seed of the random generator
+    """
+    if dtypes not in DTYPES:
+        raise ValueError(f"dtypes must be one of {', '.join(DTYPES)}")
+    rng = np.random.default_rng(seed)
+    words = np.array([f"value-{i:05d}" for i in range(10_000)], dtype=object)
+    generators = {
+        "int": lambda: rng.integers(0, 1_000_000, size=rows),
+        "float": lambda: rng.normal(size=rows),
+        "str": lambda: rng.choice(words, size=rows),
+        "bool": lambda: rng.random(rows) > 0.5,
+        "timestamp": lambda: pd.Timestamp("2024-01-01")
+        + pd.to_timedelta(rng.integers(0, 86_400 * 365, size=rows), unit="s"),
+    }
+    kinds = {
+        "numeric": ["int", "float"],
+        "strings": ["str"],
+        "mixed": ["int", "float", "str", "bool", "timestamp"],
+    }[dtypes]
+    return pd.DataFrame(
+        {
+            f"c{i}_{kinds[i % len(kinds)]}": generators[kinds[i % len(kinds)]]()
+            for i in range(width)
+        }
+    )
+
+
+class MockChakraServer:
+    """A threaded HTTP server speaking enough of the Chakra API for the client.
+
+    Example:
+        >>> with MockChakraServer() as server:
+        ...     client = Chakra("a:b:c", transport_config=TransportConfig(base_url=server.url))
+    """
+
+    def __init__(self):
+        self.bytes_uploaded = 0
+        self.requests = 0
+        self._results: dict[tuple[str, int, int, bool], bytes] = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def __enter__(self) -> "MockChakraServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def result_body(self, dtypes: str, width: int, rows: int, arrow: bool) -> bytes:
+        """The encoded result of `SELECT * FROM <dtypes>_<width> LIMIT <rows>`."""
+        key = (dtypes, width, rows, arrow)
+        with self._lock:
+            if key not in self._results:
+                self._results[key] = _encode_result(
+                    make_frame(rows, width, dtypes), arrow
+                )
+            return self._results[key]
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep connections alive like the real API does, without Nagle
+            # delaying the body of each response behind its headers
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def _reply(self, content: bytes, content_type="application/json"):
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def _read_body(self) -> bytes:
+                with server._lock:
+                    server.requests += 1
+                return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+            def do_POST(self):
+                body = self._read_body()
+                if self.path == "/api/v1/servers":
+                    self._reply(b'{"token": "DDB_benchmark"}')
+                elif self.path == "/api/v1/query":
+                    self._query(json.loads(body)["sql"])
+                else:
+                    self._reply(b"{}")
+
+            def _query(self, sql: str):
+                match = _RESULT_QUERY.search(sql)
+                if match is None:
+                    self._reply(b'{"columns": [], "rows": []}')
+                    return
+                arrow = ARROW_STREAM_MEDIA_TYPE in self.headers.get("Accept", "")
+                dtypes, width, rows = (
+                    match.group(1),
+                    int(match.group(2)),
+                    int(match.group(3)),
+                )
+                self._reply(
+                    server.result_body(dtypes, width, rows, arrow),
+                    ARROW_STREAM_MEDIA_TYPE if arrow else "application/json",
+                )
+
+            def do_GET(self):
+                self._read_body()
+                url = urlparse(self.path)
+                name = parse_qs(url.query)["filename"][0]
+                self._reply(
+                    json.dumps(
+                        {"presignedUrl": f"{server.url}/upload/{name}", "key": name}
+                    ).encode()
+                )
+
+            def do_PUT(self):
+                body = self._read_body()
+                with server._lock:
+                    server.bytes_uploaded += len(body)
+                self._reply(b"")
+
+            def do_DELETE(self):
+                self._read_body()
+                self._reply(b"{}")
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def _encode_result(df: pd.DataFrame, arrow: bool) -> bytes:
+    """Encode a result the way the API sends it."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if arrow:
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+    types = list(column_types(table.schema).values())
+    return (
+        '{"columns": '
+        + json.dumps(list(df.columns))
+        + ', "types": '
+        + json.dumps(types)
+        + ', "rows": '
+        + df.to_json(orient="values", date_format="iso")
+        + "}"
+    ).encode()
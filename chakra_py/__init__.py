@@ -1 +1,64 @@
-from .client import Chakra
+import importlib
+from typing import TYPE_CHECKING
+
+# Public names and the submodules defining them. They are imported when first
+# used, so that e.g. `from chakra_py import Chakra` does not pay for httpx.
+_EXPORTS = {
+    "AsyncChakra": "async_client",
+    "BufferedWriter": "writer",
+    "TokenCache": "auth",
+    "QueryCache": "cache",
+    "Chakra": "client",
+    "ParquetOptions": "encoding",
+    "Instrumentation": "instrumentation",
+    "OpenTelemetryExporter": "instrumentation",
+    "Span": "instrumentation",
+    "SpanCollector": "instrumentation",
+    "SpanHook": "instrumentation",
+    "PushJournal": "journal",
+    "LocalMirror": "mirror",
+    "MirroredTable": "mirror",
+    "ResultOptions": "results",
+    "RetryPolicy": "retry",
+    "SchemaCache": "schemas",
+    "PreparedStatement": "statements",
+    "SyncIndex": "sync",
+    "TransportConfig": "transport",
+}
+
+__all__ = list(_EXPORTS)
+
+if TYPE_CHECKING:
+    from .async_client import AsyncChakra
+    from .auth import TokenCache
+    from .cache import QueryCache
+    from .client import Chakra
+    from .encoding import ParquetOptions
+    from .instrumentation import (
+        Instrumentation,
+        OpenTelemetryExporter,
+        Span,
+        SpanCollector,
+        SpanHook,
+    )
+    from .journal import PushJournal
+    from .mirror import LocalMirror, MirroredTable
+    from .results import ResultOptions
+    from .retry import RetryPolicy
+    from .schemas import SchemaCache
+    from .statements import PreparedStatement
+    from .sync import SyncIndex
+    from .transport import TransportConfig
+    from .writer import BufferedWriter
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,974 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import itertools
+import time
+import uuid
+from collections import deque
+from typing import TYPE_CHECKING, BinaryIO, Iterable, Optional, Sequence, Union
+
+from colorama import Fore, Style
+
+from . import protocol
+from .auth import TokenCache, account_fingerprint, expires_soon
+from .cache import QueryCache, write_targets
+from .client import BANNER, DEFAULT_UPLOAD_WORKERS, JSON_HEADERS, __version__
+from .encoding import ParquetOptions, resolve_parquet_options, update_bandwidth
+from .exceptions import ChakraAuthError
+from .inserts import insert_bodies, use_direct_insert
+from .instrumentation import Instrumentation
+from .lazy import lazy_import
+from .progress import progress_bar
+from .reports import PushResult, StageTimer, SyncResult
+from .results import ResultOptions, build_result
+from .retry import RetryPolicy
+from .schemas import SchemaCache, changes_schema, validate_columns
+from .sources import PushData, to_record_batch_reader, write_parquet_parts
+from .statements import PreparedStatement, executemany_requests
+from .sync import (
+    SyncIndex,
+    delete_matching_sql,
+    diff_rows,
+    insert_from_sql,
+    staging_table_name,
+)
+from .transport import TransportConfig
+from .typemap import column_types, null_columns
+
+if TYPE_CHECKING:
+    from tqdm import tqdm
+
+pd = lazy_import("pandas")
+pa = lazy_import("pyarrow")
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - exercised only without the extra
+    httpx = None
+
+DEFAULT_MAX_CONCURRENCY = 32
+
+# Bytes read from a staged part at a time while it is uploaded
+UPLOAD_READ_SIZE = 1024 * 1024
+
+
+class _UploadStream:
+    """Async iterable over a part file in fixed-size reads, for httpx to stream.
+
+    Each iteration starts from the beginning of the file, so a retried upload
+    sends the whole part again.
+    """
+
+    def __init__(self, file: BinaryIO, read_size: int = UPLOAD_READ_SIZE):
+        self.file = file
+        self.read_size = read_size
+
+    async def __aiter__(self):
+        await asyncio.to_thread(self.file.seek, 0)
+        while True:
+            chunk = await asyncio.to_thread(self.file.read, self.read_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def ensure_authenticated_async(func):
+    """Async counterpart of `ensure_authenticated`.
+
+    Tokens missing or about to expire are refreshed before the call is made.
+    Requests rejected with a 401 during the call log in again and are resent
+    one by one by `AsyncChakra._request`, so the call itself never runs twice.
+    """
+
+    @functools.wraps(func)
+    async def wrapper(self, *args, **kwargs):
+        if not self.token or expires_soon(self._token_expires_at):
+            await self._refresh_token(stale_token=self.token)
+        return await func(self, *args, **kwargs)
+
+    return wrapper
+
+
+class AsyncChakra:
+    """Asyncio client for interacting with the Chakra API.
+
+    Mirrors `Chakra` on top of a single pooled httpx connection pool, so many
+    queries and pushes can run concurrently from one event loop. Requires the
+    `async` extra (`pip install "chakra-py[async]"`).
+
+    Example:
+        >>> async with AsyncChakra("DB_SESSION_KEY", quiet=True) as client:
+        ...     frames = await asyncio.gather(
+        ...         *(client.execute(query) for query in queries)
+        ...     )
+    """
+
+    def __init__(
+        self,
+        db_session_key: str,
+        quiet: bool = False,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        transport: Optional["httpx.AsyncBaseTransport"] = None,
+        cache: Optional[QueryCache] = None,
+        transport_config: Optional[TransportConfig] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        token_cache: Optional[TokenCache] = None,
+        schema_cache: Optional[SchemaCache] = None,
+        instrumentation: Optional[Instrumentation] = None,
+    ):
+        """Initialize the async Chakra client.
+
+        Args:
+            db_session_key: The DB session key to use - can be found in the Chakra Settings page
+            quiet: If True, suppresses all stdout messages (default: False)
+            max_concurrency: Maximum number of requests in flight at once,
+                which is also the size of the connection pool
+            transport: Optional httpx transport, e.g. to run against a mock server
+            cache: Optional QueryCache serving repeated read-only queries locally
+            transport_config: Timeout and base URL settings, see TransportConfig.
+                Connection pooling is sized by max_concurrency instead
+            retry_policy: How requests failing with transient errors are
+                retried, see RetryPolicy
+            token_cache: Optional TokenCache reusing tokens across processes
+            schema_cache: Optional SchemaCache letting repeated pushes to
+                the same table skip DDL round trips
+            instrumentation: Optional Instrumentation reporting each request
+                and processing step as a span to hooks
+        """
+        if httpx is None:
+            raise ImportError(
+                'AsyncChakra requires httpx, install it with: pip install "chakra-py[async]"'
+            )
+
+        self._db_session_key = db_session_key
+        # Scopes cached results to the account
+        self._account = account_fingerprint(db_session_key)
+        self._token = None
+        self._token_expires_at: Optional[float] = None
+        self._token_cache = token_cache
+        self._quiet = quiet
+        self._max_concurrency = max_concurrency
+        self._transport_config = transport_config or TransportConfig()
+        self._retry_policy = retry_policy or RetryPolicy()
+        self.instrumentation = instrumentation or Instrumentation()
+        # Bytes per second of recent uploads, used by parquet_options="auto"
+        self._upload_bandwidth: Optional[float] = None
+        self.cache = cache
+        self.schema_cache = schema_cache
+        self._client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=max_concurrency,
+            ),
+            timeout=httpx.Timeout(
+                self._transport_config.read_timeout,
+                connect=self._transport_config.connect_timeout,
+            ),
+            transport=transport,
+        )
+        # Created lazily so that they bind to the event loop actually in use
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._auth_lock: Optional[asyncio.Lock] = None
+
+        if not quiet:
+            print(BANNER.format(version=__version__))
+
+    async def __aenter__(self) -> "AsyncChakra":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Close the underlying connection pool."""
+        await self._client.aclose()
+
+    @property
+    def token(self) -> Optional[str]:
+        return self._token
+
+    @token.setter
+    def token(self, value: str):
+        self._token = value
+
+    def _print(self, message: str) -> None:
+        """Print a message if quiet mode is not enabled."""
+        if not self._quiet:
+            print(message)
+
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        authenticated: bool = True,
+        idempotent: bool = True,
+        **kwargs,
+    ) -> "httpx.Response":
+        """Send a request, holding one of the max_concurrency slots while in flight.
+
+        The token is only attached to API requests, never to presigned upload
+        URLs, which carry their own credentials. Requests rejected with a 401
+        log in again and are resent; concurrent requests hitting a 401 with
+        the same stale token share a single re-login. Transient failures are
+        retried according to the retry policy, while other error statuses are
+        returned as is. Retries, body sizes and the status are added to the
+        current span.
+
+        Raises:
+            ChakraAuthError: If the request is still rejected after logging in again
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        headers = kwargs.pop("headers", None) or {}
+        url = self._transport_config.api_url(url)
+        span = self.instrumentation.current_span()
+        attempts = 0
+
+        async def attempt() -> "httpx.Response":
+            nonlocal attempts
+            attempts += 1
+            async with self._semaphore:
+                response = await self._client.request(
+                    method, url, headers=request_headers, **kwargs
+                )
+            if protocol.is_retryable_status(response.status_code):
+                response.raise_for_status()
+            return response
+
+        try:
+            for login_attempt in range(1, protocol.MAX_LOGIN_ATTEMPTS + 1):
+                token = self.token
+                request_headers = headers
+                if authenticated and token:
+                    request_headers = {**headers, "Authorization": f"Bearer {token}"}
+                response = await self._retry_policy.run_async(attempt, idempotent)
+                if not authenticated or response.status_code != 401:
+                    break
+                self._print(
+                    f"Attempt {login_attempt} failed with 401. Stale token. Attempting login..."
+                )
+                # A rejected request was not processed, so resending it is safe
+                await self._refresh_token(stale_token=token)
+            else:
+                raise ChakraAuthError(
+                    f"Failed to authenticate after {protocol.MAX_LOGIN_ATTEMPTS} attempts."
+                )
+        finally:
+            span.retries += attempts - 1
+        span.record_response(response)
+        return response
+
+    async def _refresh_token(self, stale_token: Optional[str]) -> None:
+        """Log in again unless another task already replaced stale_token."""
+        if self._auth_lock is None:
+            self._auth_lock = asyncio.Lock()
+        async with self._auth_lock:
+            if self.token != stale_token:
+                return
+            cached = None
+            if stale_token is None and self._token_cache is not None:
+                cached = await asyncio.to_thread(
+                    self._token_cache.load, self._db_session_key
+                )
+            if cached is not None:
+                self.token, self._token_expires_at = cached
+            else:
+                await self.login()
+
+    async def _fetch_token(self, db_session_key: str) -> tuple[str, Optional[float]]:
+        """Fetch a token from the Chakra API."""
+        response = await self._request(
+            "POST",
+            protocol.TOKEN_URL,
+            authenticated=False,
+            json=protocol.token_payload(db_session_key),
+        )
+        response.raise_for_status()
+        body = response.json()
+        return body["token"], protocol.token_expiry(body, body["token"])
+
+    async def login(self) -> None:
+        """Set the authentication token for API requests."""
+        self._print(f"\n{Fore.GREEN}Authenticating with Chakra DB...{Style.RESET_ALL}")
+        with self.instrumentation.span("login"):
+            token, expires_at = await self._fetch_token(self._db_session_key)
+        protocol.check_token(token)
+        self.token, self._token_expires_at = token, expires_at
+        if self._token_cache is not None:
+            await asyncio.to_thread(
+                self._token_cache.store, self._db_session_key, token, expires_at
+            )
+        self._print(f"{Fore.GREEN}✓ Successfully authenticated!{Style.RESET_ALL}\n")
+
+    async def _post_query(self, sql: str) -> None:
+        response = await self._request("POST", protocol.QUERY_URL, json={"sql": sql})
+        response.raise_for_status()
+
+    def _is_known(self, name: str) -> bool:
+        """Whether the schema cache knows that a database, schema or table exists."""
+        return self.schema_cache is not None and self.schema_cache.exists(name)
+
+    async def _create_database_and_schema(self, table_name: str) -> None:
+        """Create database and schema if they don't exist."""
+        if not self._is_known(table_name.split(".")[0]):
+            with self.instrumentation.span(
+                "ddl", statement="create_database", table_name=table_name
+            ):
+                response = await self._request(
+                    "POST",
+                    protocol.DATABASES_URL,
+                    json=protocol.create_database_payload(table_name),
+                )
+                if response.status_code != 409:
+                    # only raise error if the database doesn't already exist
+                    response.raise_for_status()
+        with self.instrumentation.span(
+            "ddl", statement="create_schema", table_name=table_name
+        ):
+            await self._post_query(protocol.create_schema_sql(table_name))
+
+    async def _request_presigned_url(self, file_name: str) -> dict:
+        """Request a presigned URL for the upload."""
+        response = await self._request("GET", protocol.presigned_upload_url(file_name))
+        response.raise_for_status()
+        return response.json()
+
+    async def _stage_part(
+        self,
+        filename: str,
+        file: BinaryIO,
+        file_size: int,
+        s3_keys: list[str],
+        timer: StageTimer,
+        pbar: tqdm,
+    ) -> str:
+        """Request a presigned URL for a part and upload it, then close the part.
+
+        Returns:
+            The key of the staged file
+        """
+        try:
+            with timer.stage("presign"), self.instrumentation.span(
+                "presign", file_name=filename
+            ):
+                presigned = await self._request_presigned_url(filename)
+            s3_keys.append(presigned["key"])
+            started = time.perf_counter()
+            with timer.stage("upload"), self.instrumentation.span(
+                "upload", file_name=filename
+            ):
+                # The part is streamed rather than read into memory, with its
+                # length given since presigned URLs reject chunked uploads
+                response = await self._request(
+                    "PUT",
+                    presigned["presignedUrl"],
+                    authenticated=False,
+                    content=_UploadStream(file),
+                    headers={
+                        **protocol.PARQUET_HEADERS,
+                        "Content-Length": str(file_size),
+                    },
+                )
+                response.raise_for_status()
+        finally:
+            file.close()
+        self._upload_bandwidth = update_bandwidth(
+            self._upload_bandwidth, file_size, time.perf_counter() - started
+        )
+        pbar.update(file_size)
+        return presigned["key"]
+
+    async def _prepare_table(
+        self,
+        table_name: str,
+        columns: dict[str, str],
+        create_if_missing: bool,
+        replace_if_exists: bool,
+        timer: StageTimer,
+    ) -> dict[str, str]:
+        """Create the database, schema and table, replacing the table if asked.
+
+        Objects that the schema cache knows to exist are not created again.
+
+        Returns:
+            The columns of the table for the schema cache: the pushed columns
+            if the table was replaced, the columns read from the server if
+            the table was not known yet, and otherwise none
+        """
+        schema_name = table_name.rsplit(".", 1)[0]
+        with timer.stage("ddl"):
+            if (create_if_missing or replace_if_exists) and not self._is_known(
+                schema_name
+            ):
+                await self._create_database_and_schema(table_name)
+
+            if replace_if_exists:
+                with self.instrumentation.span(
+                    "ddl", statement="drop_table", table_name=table_name
+                ):
+                    await self._post_query(protocol.drop_table_sql(table_name))
+
+            known = self._is_known(table_name)
+            if replace_if_exists or (create_if_missing and not known):
+                with self.instrumentation.span(
+                    "ddl", statement="create_table", table_name=table_name
+                ):
+                    await self._post_query(
+                        protocol.create_table_sql(table_name, columns)
+                    )
+
+        if replace_if_exists:
+            return columns
+        if self.schema_cache is None or known:
+            return {}
+        # CREATE TABLE IF NOT EXISTS may have kept a table with wider columns
+        return await self._table_columns(table_name)
+
+    async def _table_columns(self, table_name: str) -> dict[str, str]:
+        """Read the column types of a table, or none if they cannot be read."""
+        try:
+            response = await self._request(
+                "POST",
+                protocol.QUERY_URL,
+                json=protocol.table_columns_payload(table_name),
+            )
+            response.raise_for_status()
+            return protocol.table_columns(response.json())
+        except Exception:
+            return {}
+
+    async def _insert_rows(
+        self,
+        table_name: str,
+        table: pa.Table,
+        result: PushResult,
+        timer: StageTimer,
+        pbar: tqdm,
+    ) -> None:
+        """Insert rows with batched INSERT statements of about a megabyte each."""
+        bodies = insert_bodies(table_name, table)
+        while True:
+            with timer.stage("encode"):
+                batch = next(bodies, None)
+            if batch is None:
+                break
+            body, rows = batch
+            pbar.total += len(body)
+            pbar.refresh()
+            with timer.stage("insert"), self.instrumentation.span(
+                "insert", table_name=table_name
+            ) as span:
+                span.rows = rows
+                response = await self._request(
+                    "POST",
+                    protocol.QUERY_URL,
+                    idempotent=False,
+                    content=body,
+                    headers=JSON_HEADERS,
+                )
+                response.raise_for_status()
+            pbar.update(len(body))
+            result.rows += rows
+            result.parts += 1
+            result.bytes_sent += len(body)
+        result.raw_bytes = table.nbytes
+
+    async def _upload_parts(
+        self,
+        table_name: str,
+        reader: pa.RecordBatchReader,
+        chunk_size: Optional[int],
+        max_workers: int,
+        staged: list[asyncio.Future],
+        s3_keys: list[str],
+        result: PushResult,
+        timer: StageTimer,
+        pbar: tqdm,
+    ) -> None:
+        """Encode parquet parts and stage each one as soon as it is encoded.
+
+        Tasks resolving to the staged keys are appended to staged in part
+        order, keeping at most max_workers encoded parts in flight.
+        """
+        upload_id = str(uuid.uuid4())
+        parts = write_parquet_parts(reader, chunk_size, options=result.parquet_options)
+        in_flight = deque()
+        for part_number in itertools.count():
+            with timer.stage("encode"):
+                part = await asyncio.to_thread(next, parts, None)
+            if part is None:
+                break
+            file, file_size, rows, raw_bytes = part
+            result.rows += rows
+            result.parts += 1
+            result.bytes_sent += file_size
+            result.raw_bytes += raw_bytes
+            pbar.total += file_size + 2
+            pbar.refresh()
+
+            filename = protocol.staged_filename(
+                table_name, upload_id, part_number, bool(chunk_size)
+            )
+            if len(in_flight) >= max_workers:
+                await in_flight.popleft()
+            task = asyncio.ensure_future(
+                self._stage_part(filename, file, file_size, s3_keys, timer, pbar)
+            )
+            staged.append(task)
+            in_flight.append(task)
+
+    async def _import_and_clean_up(
+        self,
+        table_name: str,
+        staged: list[asyncio.Future],
+        s3_keys: list[str],
+        dedupe_on_append: bool,
+        primary_key_columns: list[str],
+        timer: StageTimer,
+        pbar: tqdm,
+    ) -> None:
+        """Import staged files in order, deleting each one in the background.
+
+        Deleted keys are removed from s3_keys, leaving only the files that
+        still have to be cleaned up. Failing to delete a file that was
+        imported does not fail the push.
+        """
+        pbar.set_description("Importing data into warehouse...")
+        deletions = []
+        for task in staged:
+            s3_key = await task
+            url, payload = protocol.import_request(
+                table_name, s3_key, dedupe_on_append, primary_key_columns
+            )
+            with timer.stage("import"), self.instrumentation.span(
+                "import", table_name=table_name, key=s3_key
+            ):
+                response = await self._request(
+                    "POST", url, idempotent=False, json=payload
+                )
+                response.raise_for_status()
+            pbar.update(1)
+            # Clean up while the next part is imported
+            deletions.append(
+                asyncio.ensure_future(
+                    self._delete_staged_file(s3_key, s3_keys, timer, pbar)
+                )
+            )
+
+        pbar.set_description("Cleaning up...")
+        await asyncio.gather(*deletions, return_exceptions=True)
+        await self._discard_staged_files(s3_keys)
+
+    async def _delete_file(self, s3_key: str) -> None:
+        response = await self._request(
+            "DELETE", protocol.FILES_URL, json=protocol.delete_file_payload(s3_key)
+        )
+        response.raise_for_status()
+
+    async def _delete_staged_file(
+        self, s3_key: str, s3_keys: list[str], timer: StageTimer, pbar: tqdm
+    ) -> None:
+        """Delete an imported file and forget its key."""
+        with timer.stage("cleanup"), self.instrumentation.span("cleanup", key=s3_key):
+            await self._delete_file(s3_key)
+        s3_keys.remove(s3_key)
+        pbar.update(1)
+
+    async def _discard_staged_files(self, s3_keys: list[str]) -> None:
+        """Delete the staged files left behind by a push, warning about leftovers."""
+        for s3_key in list(s3_keys):
+            try:
+                with self.instrumentation.span("cleanup", key=s3_key):
+                    await self._delete_file(s3_key)
+                s3_keys.remove(s3_key)
+            except Exception:
+                self._print(
+                    f"{Fore.YELLOW}Could not delete staged file {s3_key}{Style.RESET_ALL}"
+                )
+
+    async def push(
+        self,
+        table_name: str,
+        data: PushData,
+        create_if_missing: bool = True,
+        replace_if_exists: bool = False,
+        dedupe_on_append: bool = False,
+        primary_key_columns: list[str] = [],
+        chunk_size: Optional[int] = None,
+        max_workers: int = DEFAULT_UPLOAD_WORKERS,
+        method: str = "auto",
+        parquet_options: Union[ParquetOptions, str, None] = None,
+        enum_columns: Optional[dict[str, list[str]]] = None,
+    ) -> PushResult:
+        """Push data to a table. See `Chakra.push` for the arguments.
+
+        Parquet encoding runs in a worker thread so the event loop stays
+        responsive while large frames are serialized.
+        """
+        table_name = protocol.qualify_table_name(table_name)
+        direct_insert = use_direct_insert(data, method, dedupe_on_append, chunk_size)
+        options = resolve_parquet_options(parquet_options, data, self._upload_bandwidth)
+
+        with self.instrumentation.span("push", table_name=table_name) as span:
+            result = await self._push(
+                table_name,
+                data,
+                direct_insert,
+                create_if_missing,
+                replace_if_exists,
+                dedupe_on_append,
+                primary_key_columns,
+                chunk_size,
+                max_workers,
+                options,
+                enum_columns,
+            )
+            span.set_attribute("method", result.method)
+            span.rows = result.rows
+        return result
+
+    @ensure_authenticated_async
+    async def _push(
+        self,
+        table_name: str,
+        data: PushData,
+        direct_insert: bool,
+        create_if_missing: bool,
+        replace_if_exists: bool,
+        dedupe_on_append: bool,
+        primary_key_columns: list[str],
+        chunk_size: Optional[int],
+        max_workers: int,
+        options: ParquetOptions,
+        enum_columns: Optional[dict[str, list[str]]] = None,
+    ) -> PushResult:
+        """Encode, upload and import data, streaming parts as they are encoded.
+
+        The table is created concurrently with encoding and staging the
+        first parts; rows are only imported or inserted once it exists.
+        """
+        reader = to_record_batch_reader(data)
+        result = PushResult(table_name, "insert" if direct_insert else "parquet")
+        if not direct_insert:
+            result.parquet_options = options
+        timer = StageTimer()
+        # Staged files that still have to be deleted
+        s3_keys: list[str] = []
+        staged: list[asyncio.Future] = []
+
+        columns = column_types(reader.schema, enum_columns)
+        if self.schema_cache is not None:
+            if replace_if_exists:
+                self.schema_cache.invalidate(table_name)
+            else:
+                # Fail before uploading anything if the table cannot take the data
+                known_columns = self.schema_cache.columns(table_name)
+                if known_columns is not None:
+                    validate_columns(
+                        table_name,
+                        known_columns,
+                        columns,
+                        null_columns(
+                            reader.schema,
+                            (
+                                data
+                                if isinstance(data, (pd.DataFrame, pa.Table))
+                                else None
+                            ),
+                        ),
+                    )
+
+        with timer.stage("total"), progress_bar(
+            self._quiet,
+            total=0,
+            desc="Uploading data...",
+            bar_format="{desc}: {percentage:3.0f}%|{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}]",
+            colour="green",
+            unit="B",
+            unit_scale=True,
+        ) as pbar:
+            ddl = asyncio.ensure_future(
+                self._prepare_table(
+                    table_name, columns, create_if_missing, replace_if_exists, timer
+                )
+            )
+            try:
+                if direct_insert:
+                    table_columns = await ddl
+                    await self._insert_rows(
+                        table_name, reader.read_all(), result, timer, pbar
+                    )
+                else:
+                    await self._upload_parts(
+                        table_name,
+                        reader,
+                        chunk_size,
+                        max_workers,
+                        staged,
+                        s3_keys,
+                        result,
+                        timer,
+                        pbar,
+                    )
+                    table_columns = await ddl
+                    await self._import_and_clean_up(
+                        table_name,
+                        staged,
+                        s3_keys,
+                        dedupe_on_append,
+                        primary_key_columns,
+                        timer,
+                        pbar,
+                    )
+                if self.cache is not None:
+                    await asyncio.to_thread(self.cache.invalidate_table, table_name)
+                if self.schema_cache is not None:
+                    self.schema_cache.add(table_name, table_columns)
+                pbar.set_description("Data import finished.")
+
+            except Exception as e:
+                if self.schema_cache is not None:
+                    self.schema_cache.invalidate(table_name, parents=True)
+                # Stop the DDL and the remaining uploads before cleaning up
+                for task in [ddl, *staged]:
+                    task.cancel()
+                await asyncio.gather(ddl, *staged, return_exceptions=True)
+                await self._discard_staged_files(s3_keys)
+                protocol.raise_api_error(e)
+
+        result.timings = dict(timer.timings)
+        self._print(
+            f"{Fore.GREEN}✓ Successfully pushed {result.rows} records to {table_name}!{Style.RESET_ALL}\n"
+        )
+        return result
+
+    async def sync(
+        self,
+        table_name: str,
+        data: Union[pd.DataFrame, pa.Table],
+        primary_key_columns: list[str],
+        index: Optional[SyncIndex] = None,
+        delete_missing: bool = False,
+        create_if_missing: bool = True,
+        max_workers: int = DEFAULT_UPLOAD_WORKERS,
+    ) -> SyncResult:
+        """Upsert data into a table, sending only rows changed since the last sync.
+
+        See `Chakra.sync` for the arguments. Diffing and reading or writing
+        the index run in a worker thread.
+        """
+        table_name = protocol.qualify_table_name(table_name)
+        if isinstance(data, pa.Table):
+            data = data.to_pandas()
+        if index is None:
+            index = SyncIndex()
+
+        timer = StageTimer()
+        with timer.stage("total"), self.instrumentation.span(
+            "sync", table_name=table_name
+        ) as span:
+            with timer.stage("diff"):
+                previous = await asyncio.to_thread(index.load, table_name)
+                changes = await asyncio.to_thread(
+                    diff_rows, data, primary_key_columns, previous, delete_missing
+                )
+            result = SyncResult(
+                table_name,
+                inserted=changes.inserted,
+                updated=changes.updated,
+                deleted=changes.deleted,
+                unchanged=changes.unchanged,
+            )
+
+            if previous is None and create_if_missing:
+                await self.push(table_name, data.iloc[:0], create_if_missing=True)
+
+            staged = []
+            try:
+                with timer.stage("push"):
+                    for kind, rows in (
+                        ("keys", changes.deleted_keys),
+                        ("rows", changes.changed),
+                    ):
+                        if len(rows):
+                            staged.append(staging_table_name(table_name, kind))
+                            pushed = await self.push(
+                                staged[-1],
+                                rows,
+                                replace_if_exists=True,
+                                max_workers=max_workers,
+                            )
+                            result.bytes_sent += pushed.bytes_sent
+
+                with timer.stage("apply"):
+                    for staging_table in staged:
+                        await self._run_statement(
+                            delete_matching_sql(
+                                table_name, staging_table, primary_key_columns
+                            )
+                        )
+                    if len(changes.changed):
+                        await self._run_statement(
+                            insert_from_sql(table_name, staged[-1], list(data.columns))
+                        )
+            except Exception as e:
+                protocol.raise_api_error(e)
+            finally:
+                await self._drop_staging_tables(staged)
+
+            await asyncio.to_thread(index.store, table_name, changes.index)
+            if self.cache is not None:
+                await asyncio.to_thread(self.cache.invalidate_table, table_name)
+            span.rows = len(changes.changed) + changes.deleted
+
+        result.timings = dict(timer.timings)
+        self._print(
+            f"{Fore.GREEN}✓ Synced {table_name}: {result.inserted} inserted, "
+            f"{result.updated} updated, {result.deleted} deleted, "
+            f"{result.unchanged} unchanged{Style.RESET_ALL}\n"
+        )
+        return result
+
+    async def _drop_staging_tables(self, staging_tables: list[str]) -> None:
+        """Drop the staging tables of a sync, warning about leftovers."""
+        for staging_table in staging_tables:
+            try:
+                await self._run_statement(protocol.drop_table_sql(staging_table))
+            except Exception:
+                self._print(
+                    f"{Fore.YELLOW}Could not drop staging table {staging_table}{Style.RESET_ALL}"
+                )
+
+    @ensure_authenticated_async
+    async def _run_statement(self, sql: str) -> None:
+        """Run a statement whose result is not needed."""
+        with self.instrumentation.span("query", query=sql):
+            await self._post_query(sql)
+        if self.schema_cache is not None and changes_schema(sql):
+            self.schema_cache.clear()
+
+    async def execute(
+        self,
+        query: str,
+        parameters: list = [],
+        return_type: str = "pandas",
+        dtype_backend: Optional[str] = None,
+        use_cache: bool = True,
+        result_options: Optional[ResultOptions] = None,
+    ) -> Union[pd.DataFrame, pa.Table]:
+        """Execute a query. See `Chakra.execute` for the arguments."""
+        protocol.validate_result_options(return_type, dtype_backend)
+
+        if self.cache is not None and use_cache:
+            # The cache may read from disk, so keep it off the event loop
+            result = await asyncio.to_thread(
+                self.cache.get,
+                query,
+                parameters,
+                return_type,
+                dtype_backend,
+                result_options,
+                self._account,
+            )
+            if result is not None:
+                self._print(
+                    f"{Fore.GREEN}✓ Query served from cache!{Style.RESET_ALL}\n"
+                )
+                return result
+
+        with self.instrumentation.span("execute") as span:
+            result = await self._execute(
+                query, parameters, return_type, dtype_backend, result_options
+            )
+            span.rows = len(result)
+        if self.cache is not None:
+            await asyncio.to_thread(
+                self.cache.put,
+                query,
+                result,
+                parameters,
+                return_type,
+                dtype_backend,
+                result_options,
+                self._account,
+            )
+
+        self._print(f"{Fore.GREEN}✓ Query executed successfully!{Style.RESET_ALL}\n")
+        return result
+
+    @ensure_authenticated_async
+    async def _execute(
+        self,
+        query: str,
+        parameters: list,
+        return_type: str,
+        dtype_backend: Optional[str],
+        result_options: Optional[ResultOptions] = None,
+    ) -> Union[pd.DataFrame, pa.Table]:
+        """Send a query and build its result."""
+        use_arrow = return_type == "arrow" or dtype_backend == "pyarrow"
+
+        try:
+            with self.instrumentation.span("query", query=query):
+                response = await self._request(
+                    "POST",
+                    protocol.QUERY_URL,
+                    idempotent=protocol.is_read_only_query(query),
+                    json=protocol.query_payload(query, parameters),
+                    headers=protocol.query_headers(use_arrow),
+                )
+                response.raise_for_status()
+            if self.schema_cache is not None and changes_schema(query):
+                self.schema_cache.clear()
+            result = build_result(
+                response, return_type, use_arrow, self.instrumentation, result_options
+            )
+        except Exception as e:
+            protocol.raise_api_error(e)
+        return result
+
+    async def execute_arrow(self, query: str, parameters: list = []) -> pa.Table:
+        """Execute a query and return results as a pyarrow Table."""
+        return await self.execute(query, parameters, return_type="arrow")
+
+    def prepare(self, query: str) -> PreparedStatement:
+        """Prepare a query to execute it repeatedly. See `Chakra.prepare`."""
+        return PreparedStatement(self, query)
+
+    async def executemany(self, query: str, parameter_sets: Iterable[Sequence]) -> int:
+        """Execute a statement once per set of parameters. See `Chakra.executemany`."""
+        executions = 0
+        with self.instrumentation.span("executemany", query=query) as span:
+            try:
+                for sql, parameters, count in executemany_requests(
+                    query, parameter_sets
+                ):
+                    await self._send_statement(query, sql, parameters)
+                    executions += count
+            except Exception as e:
+                protocol.raise_api_error(e)
+            finally:
+                span.rows = executions
+                if self.schema_cache is not None and changes_schema(query):
+                    self.schema_cache.clear()
+                if self.cache is not None:
+                    for table_name in write_targets(query):
+                        await asyncio.to_thread(self.cache.invalidate_table, table_name)
+
+        self._print(
+            f"{Fore.GREEN}✓ Executed statement {executions} times!{Style.RESET_ALL}\n"
+        )
+        return executions
+
+    @ensure_authenticated_async
+    async def _send_statement(self, query: str, sql: str, parameters: list) -> None:
+        """Send one request of executemany, with placeholders already rewritten."""
+        with self.instrumentation.span("query", query=query):
+            response = await self._request(
+                "POST",
+                protocol.QUERY_URL,
+                idempotent=protocol.is_read_only_query(sql),
+                json={"sql": sql, "parameters": parameters},
+            )
+            response.raise_for_status()
@@ -0,0 +1,101 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Optional, Union
+
+DEFAULT_TOKEN_CACHE_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "chakra", "tokens.json"
+)
+# How long tokens whose expiry is unknown are reused from the cache
+DEFAULT_TOKEN_MAX_AGE = 600.0
+# Tokens are refreshed this many seconds before they expire
+TOKEN_REFRESH_MARGIN_SECONDS = 60.0
+
+
+def expires_soon(expires_at: Optional[float]) -> bool:
+    """Whether a token expiring at expires_at should be refreshed now."""
+    return (
+        expires_at is not None
+        and time.time() >= expires_at - TOKEN_REFRESH_MARGIN_SECONDS
+    )
+
+
+def account_fingerprint(db_session_key: str) -> str:
+    """A hash identifying the account of a DB session key without revealing it."""
+    return hashlib.sha256(db_session_key.encode()).hexdigest()
+
+
+class TokenCache:
+    """Tokens persisted on disk, so that short-lived processes skip logging in.
+
+    Entries are keyed by a hash of the DB session key, which is never written
+    to disk, and the file is only readable by its owner.
+
+    Example:
+        >>> client = Chakra("DB_SESSION_KEY", token_cache=TokenCache())
+    """
+
+    def __init__(
+        self,
+        path: Union[str, os.PathLike] = DEFAULT_TOKEN_CACHE_PATH,
+        max_age: float = DEFAULT_TOKEN_MAX_AGE,
+    ):
+        """Initialize the cache.
+
+        Args:
+            path: JSON file holding the cached tokens
+            max_age: Seconds during which a token whose expiry is unknown is reused
+        """
+        self.path = os.fspath(path)
+        self.max_age = max_age
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(db_session_key: str) -> str:
+        return account_fingerprint(db_session_key)
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path) as file:
+                entries = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    def load(self, db_session_key: str) -> Optional[tuple[str, Optional[float]]]:
+        """Return a cached (token, expiry) that is still valid, or None."""
+        with self._lock:
+            entry = self._read().get(self._key(db_session_key))
+        if not isinstance(entry, dict) or not isinstance(entry.get("token"), str):
+            return None
+        expires_at = entry.get("expires_at")
+        if expires_at is None:
+            if time.time() >= entry.get("fetched_at", 0) + self.max_age:
+                return None
+        elif expires_soon(expires_at):
+            return None
+        return entry["token"], expires_at
+
+    def store(
+        self, db_session_key: str, token: str, expires_at: Optional[float]
+    ) -> None:
+        """Cache a freshly fetched token, ignoring failures to write the file."""
+        with self._lock:
+            entries = self._read()
+            entries[self._key(db_session_key)] = {
+                "token": token,
+                "expires_at": expires_at,
+                "fetched_at": time.time(),
+            }
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+                with os.fdopen(fd, "w") as file:
+                    json.dump(entries, file)
+                # Replace atomically so concurrent processes never read a partial file
+                os.replace(tmp_path, self.path)
+            except OSError:
+                pass
@@ -0,0 +1,343 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Union
+
+from . import protocol
+from .lazy import lazy_import
+from .results import ResultOptions, arrow_to_pandas
+
+pd = lazy_import("pandas")
+pa = lazy_import("pyarrow")
+pq = lazy_import("pyarrow.parquet")
+
+DEFAULT_CACHE_TTL = 300.0
+DEFAULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+QUERY_METADATA_KEY = b"chakra.query"
+
+# String literals and quoted identifiers are kept verbatim, everything else is
+# lowercased with whitespace collapsed so that reformatted queries share an entry
+_SQL_TOKEN = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|\s+|[^'\"\s]+")
+_WRITE_TARGET = re.compile(
+    r"\b(?:insert\s+(?:or\s+\w+\s+)?into|update|delete\s+from|truncate(?:\s+table)?"
+    r"|(?:drop|alter)\s+table(?:\s+if\s+exists)?"
+    r"|create\s+(?:or\s+replace\s+)?table(?:\s+if\s+not\s+exists)?)\s+([\w.\"]+)",
+    re.IGNORECASE,
+)
+
+Result = Union["pd.DataFrame", "pa.Table"]
+
+
+def normalize_sql(query: str) -> str:
+    """Fold case, whitespace and trailing semicolons outside of quoted text."""
+    tokens = _SQL_TOKEN.findall(query.strip().rstrip(";").strip())
+    return "".join(
+        " " if token.isspace() else token if token[0] in "'\"" else token.lower()
+        for token in tokens
+    )
+
+
+def is_cacheable(query: str) -> bool:
+    """Whether a query only reads data, so its result can be cached."""
+    return protocol.is_read_only_query(normalize_sql(query))
+
+
+def write_targets(query: str) -> list[str]:
+    """Tables written by a statement, as far as they can be recognized."""
+    return [target.replace('"', "") for target in _WRITE_TARGET.findall(query)]
+
+
+def _result_nbytes(result: Result) -> int:
+    if isinstance(result, pa.Table):
+        return result.nbytes
+    return int(result.memory_usage(index=True, deep=True).sum())
+
+
+def _copy(result: Result) -> Result:
+    # Arrow tables are immutable, DataFrames are copied so that callers can
+    # modify what they get without corrupting the cache
+    return result if isinstance(result, pa.Table) else result.copy()
+
+
+class QueryCache:
+    """Client-side cache of query results with TTL and LRU eviction.
+
+    Results are held in memory up to max_bytes, evicting the least recently
+    used entries first. If a directory is given, results are also written
+    there as parquet files so they survive process restarts. Clients key
+    their results by a hash of their DB session key, so a cache shared by
+    clients of several accounts never serves one account's results to
+    another.
+
+    Example:
+        >>> client = Chakra("DB_SESSION_KEY", cache=QueryCache(ttl=60))
+        >>> client.execute("SELECT * FROM table")  # round trip
+        >>> client.execute("SELECT *  FROM table")  # served from cache
+        >>> client.cache.stats
+        {'hits': 1, 'misses': 1, 'evictions': 0, 'entries': 1, 'bytes': ...}
+    """
+
+    def __init__(
+        self,
+        ttl: float = DEFAULT_CACHE_TTL,
+        max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+        directory: Optional[str] = None,
+        max_disk_bytes: Optional[int] = None,
+    ):
+        """Initialize the cache.
+
+        Args:
+            ttl: Seconds after which an entry is considered stale
+            max_bytes: Memory budget for cached results
+            directory: Optional directory for the on-disk tier
+            max_disk_bytes: Optional size budget for the on-disk tier
+        """
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        # key -> (result, normalized query, size in bytes, expiry)
+        self._entries: "OrderedDict[str, tuple[Result, str, int, float]]" = (
+            OrderedDict()
+        )
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @property
+    def stats(self) -> dict:
+        """Hit, miss and eviction counters plus the current memory usage."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    def _key(
+        self,
+        sql: str,
+        parameters: list,
+        return_type: str,
+        dtype_backend: Optional[str],
+        result_options: Optional[ResultOptions],
+        account: Optional[str],
+    ) -> str:
+        payload = json.dumps(
+            [account, sql, parameters, return_type, dtype_backend, result_options],
+            default=str,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(
+        self,
+        query: str,
+        parameters: list = [],
+        return_type: str = "pandas",
+        dtype_backend: Optional[str] = None,
+        result_options: Optional[ResultOptions] = None,
+        account: Optional[str] = None,
+    ) -> Optional[Result]:
+        """Return a fresh cached result for the query, or None.
+
+        Queries that write data are never served from the cache, and results
+        are only served to the account that cached them.
+        """
+        if not is_cacheable(query):
+            return None
+        sql = normalize_sql(query)
+        key = self._key(
+            sql, parameters, return_type, dtype_backend, result_options, account
+        )
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[3] < time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return _copy(entry[0])
+
+        result = self._read_from_disk(key, return_type, dtype_backend)
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._store(key, sql, result)
+        return _copy(result)
+
+    def put(
+        self,
+        query: str,
+        result: Result,
+        parameters: list = [],
+        return_type: str = "pandas",
+        dtype_backend: Optional[str] = None,
+        result_options: Optional[ResultOptions] = None,
+        account: Optional[str] = None,
+    ) -> None:
+        """Record the result of a query.
+
+        Read-only queries are cached, while statements writing to a table
+        (INSERT, UPDATE, DROP TABLE, ...) invalidate the entries reading it,
+        whichever account cached them.
+        """
+        if not is_cacheable(query):
+            for table_name in write_targets(query):
+                self.invalidate_table(table_name)
+            return
+        sql = normalize_sql(query)
+        key = self._key(
+            sql, parameters, return_type, dtype_backend, result_options, account
+        )
+        result = _copy(result)
+        with self._lock:
+            self._store(key, sql, result)
+        self._write_to_disk(key, sql, result)
+
+    def invalidate_table(self, table_name: str) -> int:
+        """Drop every entry whose query mentions the table.
+
+        Matching is done on the unqualified table name, so it may drop a few
+        more entries than strictly necessary but never keeps a stale one.
+
+        Returns:
+            The number of in-memory entries removed
+        """
+        pattern = re.compile(
+            rf"\b{re.escape(table_name.split('.')[-1])}\b", re.IGNORECASE
+        )
+        with self._lock:
+            stale = [
+                key for key, entry in self._entries.items() if pattern.search(entry[1])
+            ]
+            for key in stale:
+                self._remove(key)
+
+        for path in self._disk_files():
+            try:
+                metadata = pq.read_schema(path).metadata or {}
+                if pattern.search(metadata.get(QUERY_METADATA_KEY, b"").decode()):
+                    os.remove(path)
+            except (OSError, pa.ArrowException):
+                pass
+        return len(stale)
+
+    def clear(self) -> None:
+        """Drop all entries, in memory and on disk."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        for path in self._disk_files():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _store(self, key: str, sql: str, result: Result) -> None:
+        """Insert an entry and evict least recently used ones over budget."""
+        if key in self._entries:
+            self._remove(key)
+        nbytes = _result_nbytes(result)
+        if nbytes > self.max_bytes:
+            return
+        self._entries[key] = (result, sql, nbytes, time.monotonic() + self.ttl)
+        self._bytes += nbytes
+        while self._bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        _, _, nbytes, _ = self._entries.pop(key)
+        self._bytes -= nbytes
+
+    def _disk_files(self) -> list[str]:
+        if not self.directory:
+            return []
+        return [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.endswith(".parquet")
+        ]
+
+    def _read_from_disk(
+        self, key: str, return_type: str, dtype_backend: Optional[str]
+    ) -> Optional[Result]:
+        if not self.directory:
+            return None
+        path = os.path.join(self.directory, f"{key}.parquet")
+        try:
+            if os.path.getmtime(path) + self.ttl < time.time():
+                os.remove(path)
+                return None
+            table = pq.read_table(path)
+        except (OSError, pa.ArrowException):
+            return None
+
+        metadata = dict(table.schema.metadata or {})
+        metadata.pop(QUERY_METADATA_KEY, None)
+        table = table.replace_schema_metadata(metadata or None)
+        if return_type == "arrow":
+            return table
+        if dtype_backend == "pyarrow":
+            return arrow_to_pandas(table)
+        return table.to_pandas()
+
+    def _write_to_disk(self, key: str, sql: str, result: Result) -> None:
+        if not self.directory:
+            return
+        path = os.path.join(self.directory, f"{key}.parquet")
+        try:
+            table = (
+                result
+                if isinstance(result, pa.Table)
+                else pa.Table.from_pandas(result, preserve_index=False)
+            )
+            metadata = {**(table.schema.metadata or {}), QUERY_METADATA_KEY: sql}
+            # Write to a temporary name first so readers never see partial files
+            pq.write_table(table.replace_schema_metadata(metadata), f"{path}.tmp")
+            os.replace(f"{path}.tmp", path)
+        except (OSError, ValueError, pa.ArrowException):
+            # A result that cannot be stored on disk is simply not persisted
+            return
+        self._prune_disk()
+
+    def _prune_disk(self) -> None:
+        """Remove the oldest files once the on-disk tier exceeds its budget."""
+        if not self.max_disk_bytes:
+            return
+        try:
+            files = sorted(
+                (os.path.getmtime(path), os.path.getsize(path), path)
+                for path in self._disk_files()
+            )
+        except OSError:
+            return
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+            with self._lock:
+                self.evictions += 1
@@ -1,19 +1,98 @@
+from __future__ import annotations
+
+import functools
+import itertools
 import os
-import tempfile
+import threading
+import time
 import uuid
-from typing import Any, Dict, Optional, Union
+import weakref
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    BinaryIO,
+    Dict,
+    Iterable,
+    Iterator,
+    Optional,
+    Sequence,
+    Union,
+)
 
-import pandas as pd
 import requests
 from colorama import Fore, Style
-from tqdm import tqdm
-
-from .exceptions import ChakraAPIError, ChakraAuthError
-
-BASE_URL = "https://api.chakra.dev".rstrip("/")
 
-DEFAULT_BATCH_SIZE = 1000
-TOKEN_PREFIX = "DDB_"
+from . import protocol
+from .auth import (
+    TOKEN_REFRESH_MARGIN_SECONDS,
+    TokenCache,
+    account_fingerprint,
+    expires_soon,
+)
+from .cache import QueryCache, is_cacheable, write_targets
+from .encoding import ParquetOptions, resolve_parquet_options, update_bandwidth
+from .exceptions import ChakraAuthError
+from .inserts import insert_bodies, use_direct_insert
+from .instrumentation import Instrumentation
+from .journal import DEFAULT_JOB_MAX_AGE, PushJob, PushJournal
+from .lazy import lazy_import
+from .mirror import LocalMirror, MirroredTable
+from .progress import progress_bar
+from .protocol import BASE_URL, TOKEN_PREFIX
+from .reports import PushResult, StageTimer, SyncResult
+from .results import (
+    ARROW_STREAM_MEDIA_TYPE,
+    ResultOptions,
+    arrow_to_pandas,
+    build_result,
+    convert_result,
+    decode_json_result,
+    decode_json_rows,
+    iter_arrow_stream,
+    iter_json_result,
+    json_result_to_pandas,
+    memory_report,
+    read_arrow_response,
+    table_to_batch,
+)
+from .retry import RetryPolicy
+from .schemas import SchemaCache, changes_schema, validate_columns
+from .sources import PushData, to_record_batch_reader, write_parquet_parts
+from .statements import PreparedStatement, executemany_requests
+from .sync import (
+    SyncIndex,
+    delete_matching_sql,
+    diff_rows,
+    insert_from_sql,
+    staging_table_name,
+)
+from .transport import TransportConfig, configure_session
+from .typemap import column_types, null_columns
+from .writer import (
+    DEFAULT_WRITER_MAX_AGE_SECONDS,
+    DEFAULT_WRITER_MAX_BYTES,
+    DEFAULT_WRITER_MAX_ROWS,
+    BufferedWriter,
+)
+
+if TYPE_CHECKING:
+    from tqdm import tqdm
+
+pd = lazy_import("pandas")
+pa = lazy_import("pyarrow")
+
+DEFAULT_UPLOAD_WORKERS = 4
+DEFAULT_MAX_IMPORTS = 4
+DEFAULT_RESULT_CHUNK_SIZE = 100_000
+DEFAULT_QUERY_WORKERS = 8
+RESPONSE_READ_SIZE = 1024 * 1024
+
+# Presigned URLs carry their own credentials: the API token must not be sent
+# along, and requests drops headers set to None from the session defaults
+PRESIGNED_UPLOAD_HEADERS = {**protocol.PARQUET_HEADERS, "Authorization": None}
+JSON_HEADERS = {"Content-Type": "application/json"}
 
 
 __version__ = "1.0.24"
@@ -49,38 +128,36 @@ class ProgressFileWrapper:
 
 
 def ensure_authenticated(func):
-    """Decorator to ensure the client is authenticated before executing a method."""
+    """Decorator to ensure the client is authenticated before executing a method.
 
-    def wrapper(self, *args, **kwargs):
-        max_attempts = 3
-        attempt = 0
+    Tokens missing or about to expire are refreshed before the call is made.
+    Requests rejected with a 401 during the call log in again and are resent
+    one by one by `Chakra._request`, so the call itself never runs twice.
+    """
 
-        while attempt < max_attempts:
-            if not self.token:
-                self.login()
-            try:
-                return func(self, *args, **kwargs)
-            except Exception as e:
-                if (
-                    isinstance(e, requests.exceptions.HTTPError)
-                    and e.response.status_code == 401
-                ) or (isinstance(e, ChakraAPIError) and e.response.status_code == 401):
-                    attempt += 1
-                    print(
-                        f"Attempt {attempt} failed with 401. Stale token. Attempting login..."
-                    )
-                    self.login()
-                else:
-                    attempt += 1
-                    print(
-                        f"Attempt {attempt} failed with 401. Stale token. Attempting login..."
-                    )
-                    raise
-        raise ChakraAuthError("Failed to authenticate after 3 attempts.")
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        if not self.token or expires_soon(self._token_expires_at):
+            self._refresh_token(stale_token=self.token)
+        return func(self, *args, **kwargs)
 
     return wrapper
 
 
+def _refresh_in_background(client_ref: weakref.ref, token: str) -> None:
+    """Log in again for a client the refresh timer was scheduled for, if it is alive."""
+    client = client_ref()
+    if client is None:
+        return
+    try:
+        with client._auth_lock:
+            if client.token == token:
+                client._authenticate()
+    except Exception:
+        # The next call refreshes the token before it is sent instead
+        pass
+
+
 class Chakra:
     """Main client for interacting with the Chakra API.
 
@@ -97,21 +174,76 @@ class Chakra:
         self,
         db_session_key: str,
         quiet: bool = False,
+        cache: Optional[QueryCache] = None,
+        transport_config: Optional[TransportConfig] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        token_cache: Optional[TokenCache] = None,
+        auto_refresh: bool = True,
+        schema_cache: Optional[SchemaCache] = None,
+        instrumentation: Optional[Instrumentation] = None,
+        mirror: Optional[LocalMirror] = None,
     ):
         """Initialize the Chakra client.
 
         Args:
             db_session_key: The DB session key to use - can be found in the Chakra Settings page
             quiet: If True, suppresses all stdout messages (default: False)
+            cache: Optional QueryCache serving repeated read-only queries locally
+            transport_config: Connection pooling, timeout and compression
+                settings, see TransportConfig
+            retry_policy: How requests failing with transient errors are
+                retried, see RetryPolicy
+            token_cache: Optional TokenCache reusing tokens across processes
+            auto_refresh: Refresh tokens in a background thread shortly
+                before they expire, when their expiry is known
+            schema_cache: Optional SchemaCache letting repeated pushes to
+                the same table skip DDL round trips
+            instrumentation: Optional Instrumentation reporting each request
+                and processing step as a span to hooks
+            mirror: Optional LocalMirror answering queries over tables copied
+                locally without a round trip
         """
         self._db_session_key = db_session_key
+        # Scopes cached results to the account
+        self._account = account_fingerprint(db_session_key)
         self._token = None
+        self._token_expires_at: Optional[float] = None
+        self._token_cache = token_cache
+        self._auto_refresh = auto_refresh
+        self._refresh_timer: Optional[threading.Timer] = None
         self._session = requests.Session()
+        configure_session(self._session, transport_config or TransportConfig())
         self._quiet = quiet
+        self._auth_lock = threading.Lock()
+        self.cache = cache
+        self.schema_cache = schema_cache
+        self.mirror = mirror
+        self._retry_policy = retry_policy or RetryPolicy()
+        self.instrumentation = instrumentation or Instrumentation()
+        # Bytes per second of recent uploads, used by parquet_options="auto"
+        self._upload_bandwidth: Optional[float] = None
+        self._writers: weakref.WeakSet[BufferedWriter] = weakref.WeakSet()
 
         if not quiet:
             print(BANNER.format(version=__version__))
 
+    def __enter__(self) -> "Chakra":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Flush open writers, stop refreshing the token and close pooled connections."""
+        try:
+            for writer in list(self._writers):
+                writer.close()
+        finally:
+            if self._refresh_timer is not None:
+                self._refresh_timer.cancel()
+                self._refresh_timer = None
+            self._session.close()
+
     @property
     def token(self) -> Optional[str]:
         return self._token
@@ -124,103 +256,146 @@ class Chakra:
         else:
             self._session.headers.pop("Authorization", None)
 
-    def _fetch_token(self, db_session_key: str) -> str:
+    def _request(
+        self,
+        method: str,
+        url: str,
+        authenticated: bool = True,
+        idempotent: bool = True,
+        **kwargs,
+    ) -> requests.Response:
+        """Send a request through the session, retrying transient failures.
+
+        Requests rejected with a 401 log in again and are resent; threads
+        hitting a 401 with the same stale token share a single re-login.
+        Responses with other error statuses are returned as is, so callers
+        decide which ones to raise. Retries, body sizes and the status are
+        added to the current span.
+
+        Args:
+            method: "get", "post", "put" or "delete"
+            url: The URL to send the request to
+            authenticated: Whether to log in again when the token is rejected
+            idempotent: Whether the request can safely be processed twice
+            **kwargs: Passed on to the session
+
+        Raises:
+            ChakraAuthError: If the request is still rejected after logging in again
+        """
+        send = getattr(self._session, method)
+        span = self.instrumentation.current_span()
+        attempts = 0
+
+        def attempt() -> requests.Response:
+            nonlocal attempts
+            attempts += 1
+            response = send(url, **kwargs)
+            if protocol.is_retryable_status(response.status_code):
+                response.raise_for_status()
+            return response
+
+        try:
+            for login_attempt in range(1, protocol.MAX_LOGIN_ATTEMPTS + 1):
+                token = self.token
+                response = self._retry_policy.run(attempt, idempotent)
+                if not authenticated or response.status_code != 401:
+                    break
+                self._print(
+                    f"Attempt {login_attempt} failed with 401. Stale token. Attempting login..."
+                )
+                # A rejected request was not processed, so resending it is safe
+                self._refresh_token(stale_token=token)
+            else:
+                raise ChakraAuthError(
+                    f"Failed to authenticate after {protocol.MAX_LOGIN_ATTEMPTS} attempts."
+                )
+        finally:
+            span.retries += attempts - 1
+        span.record_response(response)
+        return response
+
+    def _fetch_token(self, db_session_key: str) -> tuple[str, Optional[float]]:
         """Fetch a token from the Chakra API.
 
         Args:
             db_session_key: The DB session key to use
 
         Returns:
-            The token to use for authentication
+            The token to use for authentication and its expiry, if known
         """
-        access_key_id, secret_access_key, username = db_session_key.split(":")
-
-        response = self._session.post(
-            f"{BASE_URL}/api/v1/servers",
-            json={
-                "accessKey": access_key_id,
-                "secretKey": secret_access_key,
-                "username": username,
-            },
+        response = self._request(
+            "post",
+            protocol.TOKEN_URL,
+            authenticated=False,
+            json=protocol.token_payload(db_session_key),
         )
         response.raise_for_status()
-        return response.json()["token"]
+        body = response.json()
+        return body["token"], protocol.token_expiry(body, body["token"])
+
+    def _is_known(self, name: str) -> bool:
+        """Whether the schema cache knows that a database, schema or table exists."""
+        return self.schema_cache is not None and self.schema_cache.exists(name)
 
     def _create_database_and_schema(self, table_name: str, pbar: tqdm) -> None:
         """Create database, schema, and table if they don't exist."""
-        pbar.set_description("Creating database if it doesn't exist...")
-        [database_name, schema_name, _] = table_name.split(".")
-        response = self._session.post(
-            f"{BASE_URL}/api/v1/databases",
-            json={"name": database_name, "insert_database": True},
-        )
-        if response.status_code != 409:
-            # only raise error if the database doesn't already exist
-            response.raise_for_status()
+        database_name, schema_name, _ = table_name.split(".")
+        if not self._is_known(database_name):
+            pbar.set_description("Creating database if it doesn't exist...")
+            with self.instrumentation.span(
+                "ddl", statement="create_database", table_name=table_name
+            ):
+                response = self._request(
+                    "post",
+                    protocol.DATABASES_URL,
+                    json=protocol.create_database_payload(table_name),
+                )
+                if response.status_code != 409:
+                    # only raise error if the database doesn't already exist
+                    response.raise_for_status()
 
         pbar.set_description(f"Creating schema {schema_name} if it doesn't exist...")
 
-        create_sql = f"CREATE SCHEMA IF NOT EXISTS {database_name}.{schema_name}"
-        response = self._session.post(
-            f"{BASE_URL}/api/v1/query", json={"sql": create_sql}
-        )
-        response.raise_for_status()
+        with self.instrumentation.span(
+            "ddl", statement="create_schema", table_name=table_name
+        ):
+            response = self._request(
+                "post",
+                protocol.QUERY_URL,
+                json={"sql": protocol.create_schema_sql(table_name)},
+            )
+            response.raise_for_status()
 
     def _create_table_schema(
-        self, table_name: str, data: pd.DataFrame, pbar: tqdm
+        self, table_name: str, columns: dict[str, str], pbar: tqdm
     ) -> None:
         """Create table schema if it doesn't exist."""
         pbar.set_description("Creating table schema...")
-        columns = [
-            {"name": col, "type": self._map_pandas_to_duckdb_type(dtype)}
-            for col, dtype in data.dtypes.items()
-        ]
-        create_sql = f"CREATE TABLE IF NOT EXISTS {table_name} ("
-        create_sql += ", ".join(f"{col['name']} {col['type']}" for col in columns)
-        create_sql += ")"
-
-        response = self._session.post(
-            f"{BASE_URL}/api/v1/query", json={"sql": create_sql}
-        )
-        response.raise_for_status()
+        create_sql = protocol.create_table_sql(table_name, columns)
+        with self.instrumentation.span(
+            "ddl", statement="create_table", table_name=table_name
+        ):
+            response = self._request(
+                "post", protocol.QUERY_URL, json={"sql": create_sql}
+            )
+            response.raise_for_status()
 
     def _replace_existing_table(self, table_name: str, pbar: tqdm) -> None:
         """Drop existing table if replace_if_exists is True."""
         pbar.set_description(f"Replacing table...")
-        response = self._session.post(
-            f"{BASE_URL}/api/v1/query",
-            json={"sql": f"DROP TABLE IF EXISTS {table_name}"},
-        )
-        response.raise_for_status()
-
-    def _process_batch(
-        self, table_name: str, batch: list, batch_number: int, pbar: tqdm
-    ) -> None:
-        """Process and upload a single batch of records."""
-        # Create placeholders for the batch
-        value_placeholders = "(" + ", ".join(["?" for _ in batch[0]]) + ")"
-        batch_placeholders = ", ".join([value_placeholders for _ in batch])
-        insert_sql = f"INSERT INTO {table_name} VALUES {batch_placeholders}"
-
-        # Flatten parameters for this batch
-        parameters = [
-            str(value) if pd.notna(value) else "NULL"
-            for record in batch
-            for value in record.values()
-        ]
-
-        pbar.set_description(f"Uploading batch {batch_number}...")
-        response = self._session.post(
-            f"{BASE_URL}/api/v1/query",
-            json={"sql": insert_sql, "parameters": parameters},
-        )
-        response.raise_for_status()
+        with self.instrumentation.span(
+            "ddl", statement="drop_table", table_name=table_name
+        ):
+            response = self._request(
+                "post",
+                protocol.QUERY_URL,
+                json={"sql": protocol.drop_table_sql(table_name)},
+            )
+            response.raise_for_status()
 
     def _request_presigned_url(self, file_name: str) -> dict:
         """Request a presigned URL for the upload."""
-        response = self._session.get(
-            f"{BASE_URL}/api/v1/presigned-upload?filename={file_name}",
-        )
+        response = self._request("get", protocol.presigned_upload_url(file_name))
         response.raise_for_status()
         return response.json()
 
@@ -231,259 +406,1683 @@ class Chakra:
         progress_wrapper = ProgressFileWrapper(file, file_size, pbar)
 
         pbar.set_description("Uploading data...")
-        response = requests.put(
+        response = self._session.put(
             presigned_url,
             data=progress_wrapper,
-            headers={"Content-Type": "application/parquet"},
+            headers=PRESIGNED_UPLOAD_HEADERS,
         )
+        self.instrumentation.current_span().record_response(response)
         response.raise_for_status()
 
+    def _upload_part_with_retries(
+        self, presigned_url: str, file: BinaryIO, file_size: int, pbar: tqdm
+    ) -> None:
+        """Upload a single parquet part, retrying transient failures.
+
+        Progress reported by a failed attempt is rolled back so the shared
+        progress bar only ever counts bytes that were actually delivered.
+        """
+
+        span = self.instrumentation.current_span()
+        attempts = 0
+
+        def attempt() -> None:
+            nonlocal attempts
+            attempts += 1
+            file.seek(0)
+            try:
+                self._upload_parquet_using_presigned_url(
+                    presigned_url, file, file_size, pbar
+                )
+            except Exception:
+                pbar.update(-file.tell())
+                raise
+
+        try:
+            self._retry_policy.run(attempt)
+        finally:
+            span.retries += attempts - 1
+
+    def _stage_part(
+        self,
+        filename: str,
+        file: BinaryIO,
+        file_size: int,
+        s3_keys: list[str],
+        timer: StageTimer,
+        pbar: tqdm,
+        job: Optional[PushJob] = None,
+    ) -> str:
+        """Request a presigned URL for a part and upload it, then close the part.
+
+        Returns:
+            The key of the staged file
+        """
+        try:
+            with timer.stage("presign"), self.instrumentation.span(
+                "presign", file_name=filename
+            ):
+                response = self._request_presigned_url(filename)
+            s3_keys.append(response["key"])
+            if job is not None:
+                job.update(
+                    filename, key=response["key"], uploaded=False, cleaned_up=False
+                )
+            started = time.perf_counter()
+            with timer.stage("upload"), self.instrumentation.span(
+                "upload", file_name=filename
+            ):
+                self._upload_part_with_retries(
+                    response["presignedUrl"], file, file_size, pbar
+                )
+            if job is not None:
+                job.update(filename, uploaded=True)
+            self._upload_bandwidth = update_bandwidth(
+                self._upload_bandwidth, file_size, time.perf_counter() - started
+            )
+        finally:
+            file.close()
+        return response["key"]
+
     def _import_data_from_presigned_url(self, table_name: str, s3_key: str) -> None:
         """Import data from a presigned URL into a table."""
-        response = self._session.post(
-            f"{BASE_URL}/api/v1/tables/s3_parquet_import",
-            json={"table_name": table_name, "s3_key": s3_key},
-        )
+        url, payload = protocol.import_request(table_name, s3_key)
+        response = self._request("post", url, idempotent=False, json=payload)
         response.raise_for_status()
 
     def _import_data_from_append_only_dedupe_presigned_url(
         self, table_name: str, s3_key: str, primary_key_columns: list[str]
     ) -> None:
         """Import data from a presigned URL into a table."""
-        response = self._session.post(
-            f"{BASE_URL}/api/v1/tables/s3_parquet_import_append_only_dedupe",
-            json={
-                "table_name": table_name,
-                "s3_key": s3_key,
-                "primary_key_columns": primary_key_columns,
-            },
+        url, payload = protocol.import_request(
+            table_name,
+            s3_key,
+            dedupe_on_append=True,
+            primary_key_columns=primary_key_columns,
         )
+        response = self._request("post", url, idempotent=False, json=payload)
         response.raise_for_status()
 
     def _delete_file_from_s3(self, s3_key: str) -> None:
         """Delete a file from S3."""
-        response = self._session.delete(
-            f"{BASE_URL}/api/v1/files",
-            json={"fileName": s3_key},
+        response = self._request(
+            "delete", protocol.FILES_URL, json=protocol.delete_file_payload(s3_key)
         )
         response.raise_for_status()
 
+    def _delete_staged_file(
+        self,
+        s3_key: str,
+        s3_keys: list[str],
+        timer: StageTimer,
+        pbar: tqdm,
+        job: Optional[PushJob] = None,
+    ) -> None:
+        """Delete an imported file and forget its key."""
+        with timer.stage("cleanup"), self.instrumentation.span("cleanup", key=s3_key):
+            self._delete_file_from_s3(s3_key)
+        s3_keys.remove(s3_key)
+        if job is not None:
+            job.update_key(s3_key, cleaned_up=True)
+        pbar.update(1)
+
+    def _prepare_table(
+        self,
+        table_name: str,
+        columns: dict[str, str],
+        create_if_missing: bool,
+        replace_if_exists: bool,
+        timer: StageTimer,
+        pbar: tqdm,
+        create_schema: bool = True,
+    ) -> dict[str, str]:
+        """Create the database, schema and table, replacing the table if asked.
+
+        Objects that the schema cache knows to exist are not created again,
+        nor the database and schema if create_schema is False.
+
+        Returns:
+            The columns of the table for the schema cache: the pushed columns
+            if the table was replaced, the columns read from the server if
+            the table was not known yet, and otherwise none
+        """
+        schema_name = table_name.rsplit(".", 1)[0]
+        with timer.stage("ddl"):
+            if (
+                create_schema
+                and (create_if_missing or replace_if_exists)
+                and not self._is_known(schema_name)
+            ):
+                self._create_database_and_schema(table_name, pbar)
+
+            if replace_if_exists:
+                self._replace_existing_table(table_name, pbar)
+
+            known = self._is_known(table_name)
+            if replace_if_exists or (create_if_missing and not known):
+                self._create_table_schema(table_name, columns, pbar)
+
+        if replace_if_exists:
+            return columns
+        if self.schema_cache is None or known:
+            return {}
+        # CREATE TABLE IF NOT EXISTS may have kept a table with wider columns
+        return self._table_columns(table_name)
+
+    def _table_columns(self, table_name: str) -> dict[str, str]:
+        """Read the column types of a table, or none if they cannot be read."""
+        try:
+            response = self._request(
+                "post",
+                protocol.QUERY_URL,
+                json=protocol.table_columns_payload(table_name),
+            )
+            response.raise_for_status()
+            return protocol.table_columns(response.json())
+        except Exception:
+            return {}
+
+    def _insert_rows(
+        self,
+        table_name: str,
+        table: pa.Table,
+        result: PushResult,
+        timer: StageTimer,
+        pbar: tqdm,
+    ) -> None:
+        """Insert rows with batched INSERT statements of about a megabyte each."""
+        pbar.set_description("Inserting data...")
+        bodies = insert_bodies(table_name, table)
+        while True:
+            with timer.stage("encode"):
+                batch = next(bodies, None)
+            if batch is None:
+                break
+            body, rows = batch
+            pbar.total += len(body)
+            pbar.refresh()
+            with timer.stage("insert"), self.instrumentation.span(
+                "insert", table_name=table_name
+            ) as span:
+                span.rows = rows
+                response = self._request(
+                    "post",
+                    protocol.QUERY_URL,
+                    idempotent=False,
+                    data=body,
+                    headers=JSON_HEADERS,
+                )
+                response.raise_for_status()
+            pbar.update(len(body))
+            result.rows += rows
+            result.parts += 1
+            result.bytes_sent += len(body)
+        result.raw_bytes = table.nbytes
+
+    def _upload_parts(
+        self,
+        table_name: str,
+        reader: pa.RecordBatchReader,
+        chunk_size: Optional[int],
+        max_workers: int,
+        executor: ThreadPoolExecutor,
+        s3_keys: list[str],
+        result: PushResult,
+        timer: StageTimer,
+        pbar: tqdm,
+        job: Optional[PushJob] = None,
+    ) -> list[Future]:
+        """Encode parquet parts and stage each one as soon as it is encoded.
+
+        Presigning and uploading a part overlap with encoding the next ones,
+        keeping at most max_workers encoded parts in flight at any time.
+        Staged keys are appended to s3_keys as soon as they are known.
+
+        With a job, parts are kept in its journal once encoded. Parts an
+        earlier run of the job imported are skipped, and those it uploaded
+        are imported from the same staged files.
+
+        Returns:
+            Futures of the staged keys, in part order
+        """
+        uuid_str = str(uuid.uuid4()) if job is None else job.upload_id
+        staged, in_flight = [], deque()
+
+        def encode():
+            return write_parquet_parts(
+                reader, chunk_size, options=result.parquet_options
+            )
+
+        parts = (
+            (part + (False,) for part in encode())
+            if job is None
+            else job.encoded_parts(encode)
+        )
+        for part_number in itertools.count():
+            with timer.stage("encode"):
+                part = next(parts, None)
+            if part is None:
+                break
+            file, file_size, rows, raw_bytes, kept = part
+            result.rows += rows
+            result.parts += 1
+            result.raw_bytes += raw_bytes
+
+            filename = protocol.staged_filename(
+                table_name, uuid_str, part_number, bool(chunk_size)
+            )
+            if job is not None:
+                recorded = job.part(filename) or {}
+                if recorded.get("imported"):
+                    result.resumed_parts += 1
+                    if file is not None:
+                        file.close()
+                    continue
+                if recorded.get("uploaded") and not recorded.get("cleaned_up"):
+                    if file is not None:
+                        file.close()
+                    s3_keys.append(recorded["key"])
+                    pbar.total += 2
+                    future = Future()
+                    future.set_result(recorded["key"])
+                    staged.append(future)
+                    continue
+                if not kept:
+                    job.update(
+                        filename,
+                        number=part_number,
+                        size=file_size,
+                        rows=rows,
+                        raw_bytes=raw_bytes,
+                    )
+                    job.keep_part(filename, file)
+
+            result.bytes_sent += file_size
+            pbar.total += file_size + 2
+            pbar.refresh()
+            if len(in_flight) >= max_workers:
+                in_flight.popleft().result()
+            future = executor.submit(
+                self.instrumentation.bind(self._stage_part),
+                filename,
+                file,
+                file_size,
+                s3_keys,
+                timer,
+                pbar,
+                job,
+            )
+            staged.append(future)
+            in_flight.append(future)
+        if job is not None:
+            job.finish_encoding()
+        return staged
+
+    def _import_and_clean_up(
+        self,
+        table_name: str,
+        staged: list[Future],
+        s3_keys: list[str],
+        dedupe_on_append: bool,
+        primary_key_columns: list[str],
+        executor: ThreadPoolExecutor,
+        timer: StageTimer,
+        pbar: tqdm,
+        job: Optional[PushJob] = None,
+    ) -> None:
+        """Import staged files in order, deleting each one in the background.
+
+        Deleted keys are removed from s3_keys, leaving only the files that
+        still have to be cleaned up. Failing to delete a file that was
+        imported does not fail the push.
+        """
+        # Import the data into the warehouse from the presigned URLs
+        pbar.set_description("Importing data into warehouse...")
+        deletions = []
+        for future in staged:
+            s3_key = future.result()
+            if job is not None:
+                job.update_key(s3_key, importing=True)
+            with timer.stage("import"), self.instrumentation.span(
+                "import", table_name=table_name, key=s3_key
+            ):
+                if dedupe_on_append:
+                    self._import_data_from_append_only_dedupe_presigned_url(
+                        table_name, s3_key, primary_key_columns
+                    )
+                else:
+                    self._import_data_from_presigned_url(table_name, s3_key)
+            if job is not None:
+                job.update_key(s3_key, imported=True)
+            pbar.update(1)
+            # Clean up while the next part is imported
+            deletions.append(
+                executor.submit(
+                    self.instrumentation.bind(self._delete_staged_file),
+                    s3_key,
+                    s3_keys,
+                    timer,
+                    pbar,
+                    job,
+                )
+            )
+
+        pbar.set_description("Cleaning up...")
+        for deletion in deletions:
+            deletion.exception()
+        self._discard_staged_files(s3_keys, job)
+
+    def _discard_staged_files(
+        self, s3_keys: list[str], job: Optional[PushJob] = None
+    ) -> None:
+        """Delete the staged files left behind by a push, warning about leftovers."""
+        for s3_key in list(s3_keys):
+            try:
+                with self.instrumentation.span("cleanup", key=s3_key):
+                    self._delete_file_from_s3(s3_key)
+                s3_keys.remove(s3_key)
+                if job is not None:
+                    job.update_key(s3_key, cleaned_up=True)
+            except Exception:
+                self._print(
+                    f"{Fore.YELLOW}Could not delete staged file {s3_key}{Style.RESET_ALL}"
+                )
+
+    def _finished_job_result(self, job: PushJob) -> PushResult:
+        """The result of a journaled push that an earlier run finished."""
+        result = PushResult(job.table_name, "parquet")
+        for part in job.parts.values():
+            result.rows += part.get("rows", 0)
+            result.raw_bytes += part.get("raw_bytes", 0)
+        result.parts = result.resumed_parts = len(job.parts)
+        self._print(
+            f"{Fore.GREEN}✓ Job {job.job_id} already pushed {result.rows} records to {job.table_name}!{Style.RESET_ALL}\n"
+        )
+        return result
+
+    @ensure_authenticated
+    def clean_up_jobs(
+        self,
+        journal: Optional[PushJournal] = None,
+        max_age: float = DEFAULT_JOB_MAX_AGE,
+    ) -> int:
+        """Delete the staged files and journal entries of abandoned push jobs.
+
+        Jobs that made no progress for max_age seconds are dropped from the
+        journal, finished or not, after deleting the files they staged and
+        never cleaned up. Jobs whose files cannot all be deleted are kept
+        for the next clean up.
+
+        Args:
+            journal: The journal of the jobs, by default in ~/.cache/chakra/journal
+            max_age: Seconds without progress after which a job is abandoned
+
+        Returns:
+            The number of staged files deleted
+        """
+        journal = journal or PushJournal()
+        deleted = 0
+        for job in journal.jobs():
+            if time.time() - job.updated_at < max_age:
+                continue
+            s3_keys = job.staged_keys()
+            staged = len(s3_keys)
+            self._discard_staged_files(s3_keys, job)
+            deleted += staged - len(s3_keys)
+            if not s3_keys:
+                journal.forget(job.job_id)
+        return deleted
+
     def _print(self, message: str) -> None:
         """Print a message if quiet mode is not enabled."""
         if not self._quiet:
             print(message)
 
-    @ensure_authenticated
     def push(
         self,
         table_name: str,
-        data: pd.DataFrame,
+        data: PushData,
         create_if_missing: bool = True,
         replace_if_exists: bool = False,
         dedupe_on_append: bool = False,
         primary_key_columns: list[str] = [],
-    ) -> None:
-        # Validate table name format
-        if table_name.count(".") != 0 and table_name.count(".") != 2:
-            raise ValueError(
-                "Table name must be either a simple table name (e.g., 'my_table') or fully qualified with database and schema (e.g., 'my_database.my_schema.my_table')"
+        chunk_size: Optional[int] = None,
+        max_workers: int = DEFAULT_UPLOAD_WORKERS,
+        method: str = "auto",
+        parquet_options: Union[ParquetOptions, str, None] = None,
+        job_id: Optional[str] = None,
+        journal: Optional[PushJournal] = None,
+        enum_columns: Optional[dict[str, list[str]]] = None,
+    ) -> PushResult:
+        """Push data to a table.
+
+        Besides in-memory DataFrames, data can be streamed from an iterable of
+        DataFrames, a pyarrow RecordBatchReader or a .parquet/.csv path. Streams
+        are encoded incrementally, so they can be larger than available memory;
+        combine them with chunk_size to upload parts while the rest is encoded.
+
+        Small in-memory data is sent with batched INSERT statements, which
+        takes fewer round trips than staging it as parquet files.
+
+        Pushes given a job_id record each stage of each part in a local
+        PushJournal. If the process dies part way, pushing the same data
+        again with the same job_id and chunk_size skips the parts that were
+        imported, imports the staged files that were uploaded, and reuses
+        the encoded parts kept in the journal. A part whose import was
+        interrupted is imported again, so combine it with dedupe_on_append
+        if rows must never be duplicated. Pushing a finished job again does
+        nothing.
+
+        Args:
+            table_name: Simple or fully qualified (database.schema.table) table name
+            data: The data to push
+            create_if_missing: Create the database, schema and table if needed
+            replace_if_exists: Drop and recreate the table before importing
+            dedupe_on_append: Skip rows whose primary key already exists
+            primary_key_columns: Columns identifying a row when deduping
+            chunk_size: If set, split the upload into parquet parts of at most
+                this many rows, uploaded concurrently and retried independently
+            max_workers: Maximum number of parts uploaded at the same time
+            method: "insert" to send INSERT statements, "parquet" to stage
+                parquet files, or "auto" to pick "insert" for in-memory data
+                up to DIRECT_INSERT_MAX_BYTES and "parquet" otherwise
+            parquet_options: How parquet files are encoded: a ParquetOptions,
+                None for zstd with pyarrow defaults, or "auto" to pick the
+                codec, row groups and encoding threads from the size of the
+                data and the upload bandwidth measured so far
+            job_id: Record the progress of the push under this id, so that it
+                can be resumed. Journaled pushes always stage parquet files
+            journal: Where the progress of jobs is kept, by default in
+                ~/.cache/chakra/journal
+            enum_columns: String columns to declare as ENUMs when the table is
+                created, with every value they may ever hold. Other columns,
+                categoricals included, are VARCHAR
+
+        Returns:
+            The number of rows and bytes sent, and the time spent per stage
+        """
+        table_name = protocol.qualify_table_name(table_name)
+        job = None
+        if job_id is not None:
+            if method == "insert":
+                raise ValueError("method='insert' cannot be resumed, use 'parquet'")
+            method = "parquet"
+            job = (journal or PushJournal()).open(job_id, table_name, chunk_size)
+            if job.done:
+                return self._finished_job_result(job)
+        direct_insert = use_direct_insert(data, method, dedupe_on_append, chunk_size)
+        options = resolve_parquet_options(parquet_options, data, self._upload_bandwidth)
+
+        with self.instrumentation.span("push", table_name=table_name) as span:
+            result = self._push(
+                table_name,
+                data,
+                direct_insert,
+                create_if_missing,
+                replace_if_exists,
+                dedupe_on_append,
+                primary_key_columns,
+                chunk_size,
+                max_workers,
+                options,
+                enum_columns,
+                job,
             )
+            span.set_attribute("method", result.method)
+            span.rows = result.rows
+        if self.mirror is not None:
+            if result.resumed_parts:
+                # Some rows were pushed by an earlier run
+                self.mirror.invalidate(table_name)
+            else:
+                self.mirror.record_push(
+                    table_name, data, replace_if_exists, dedupe_on_append
+                )
+        return result
 
-        if table_name.count(".") == 0:
-            table_name = f"duckdb.main.{table_name}"
+    def writer(
+        self,
+        table_name: str,
+        max_rows: int = DEFAULT_WRITER_MAX_ROWS,
+        max_bytes: int = DEFAULT_WRITER_MAX_BYTES,
+        max_age: float = DEFAULT_WRITER_MAX_AGE_SECONDS,
+        max_buffer_bytes: Optional[int] = None,
+        **push_options,
+    ) -> BufferedWriter:
+        """Open a writer coalescing many small writes into a few large pushes.
+
+        Rows are buffered in memory as Arrow tables and pushed from a
+        background thread once max_rows or max_bytes are buffered, or max_age
+        seconds after they were written. Writes block while max_buffer_bytes
+        are waiting to be pushed. Writers are flushed when closed, when the
+        client is closed and when the interpreter exits.
 
-        """Push data to a table."""
+        Args:
+            table_name: Simple or fully qualified (database.schema.table) table name
+            max_rows: Push once this many rows are buffered
+            max_bytes: Push once the buffered rows take this many bytes in memory
+            max_age: Push rows at the latest this many seconds after they were
+                written
+            max_buffer_bytes: Block writes while this many bytes are buffered
+                or being pushed, by default 4 times max_bytes
+            **push_options: Passed on to `push`, e.g. dedupe_on_append and
+                primary_key_columns
+
+        Returns:
+            The writer, to use as a context manager or close explicitly
+        """
+        writer = BufferedWriter(
+            self,
+            table_name,
+            max_rows=max_rows,
+            max_bytes=max_bytes,
+            max_age=max_age,
+            max_buffer_bytes=max_buffer_bytes,
+            **push_options,
+        )
+        self._writers.add(writer)
+        return writer
+
+    @ensure_authenticated
+    def _push(
+        self,
+        table_name: str,
+        data: PushData,
+        direct_insert: bool,
+        create_if_missing: bool,
+        replace_if_exists: bool,
+        dedupe_on_append: bool,
+        primary_key_columns: list[str],
+        chunk_size: Optional[int],
+        max_workers: int,
+        options: ParquetOptions,
+        enum_columns: Optional[dict[str, list[str]]] = None,
+        job: Optional[PushJob] = None,
+    ) -> PushResult:
+        """Create the table if needed, then insert or stage and import data.
+
+        The table is created in the background while the first parts are
+        encoded and uploaded; rows are only imported or inserted once it
+        exists.
+        """
         if not self.token:
             raise ValueError("Authentication required")
 
-        total_records = len(data)
+        result = PushResult(table_name, "insert" if direct_insert else "parquet")
+        if job is not None:
+            # Staged files the last run was uploading or had imported
+            self._discard_staged_files(job.orphaned_keys(), job)
+            if job.import_started:
+                # Dropping the table would lose the rows already imported
+                replace_if_exists = False
+
+        reader = to_record_batch_reader(data)
+        if not direct_insert:
+            result.parquet_options = options
+        timer = StageTimer()
+        # Staged files that still have to be deleted
+        s3_keys: list[str] = []
+
+        columns = column_types(reader.schema, enum_columns)
+        if self.schema_cache is not None:
+            if replace_if_exists:
+                self.schema_cache.invalidate(table_name)
+            else:
+                # Fail before uploading anything if the table cannot take the data
+                known_columns = self.schema_cache.columns(table_name)
+                if known_columns is not None:
+                    validate_columns(
+                        table_name,
+                        known_columns,
+                        columns,
+                        null_columns(
+                            reader.schema,
+                            (
+                                data
+                                if isinstance(data, (pd.DataFrame, pa.Table))
+                                else None
+                            ),
+                        ),
+                    )
 
-        with tempfile.NamedTemporaryFile() as temp_file:
-            data.to_parquet(
-                temp_file.name,
-                engine="pyarrow",
-                compression="zstd",
-                index=False,
-            )
-            file_size = os.path.getsize(temp_file.name)
+        with timer.stage("total"), progress_bar(
+            self._quiet,
+            total=0,
+            desc="Uploading data...",
+            bar_format="{desc}: {percentage:3.0f}%|{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}]",
+            colour="green",
+            unit="B",
+            unit_scale=True,
+        ) as pbar:
+            try:
+                # One extra worker runs the DDL while parts are staged
+                with ThreadPoolExecutor(max_workers=max_workers + 1) as executor:
+                    ddl = executor.submit(
+                        self.instrumentation.bind(self._prepare_table),
+                        table_name,
+                        columns,
+                        create_if_missing,
+                        replace_if_exists,
+                        timer,
+                        pbar,
+                    )
+                    if direct_insert:
+                        table_columns = ddl.result()
+                        self._insert_rows(
+                            table_name, reader.read_all(), result, timer, pbar
+                        )
+                    else:
+                        staged = self._upload_parts(
+                            table_name,
+                            reader,
+                            chunk_size,
+                            max_workers,
+                            executor,
+                            s3_keys,
+                            result,
+                            timer,
+                            pbar,
+                            job,
+                        )
+                        table_columns = ddl.result()
+                        self._import_and_clean_up(
+                            table_name,
+                            staged,
+                            s3_keys,
+                            dedupe_on_append,
+                            primary_key_columns,
+                            executor,
+                            timer,
+                            pbar,
+                            job,
+                        )
+                if job is not None:
+                    job.finish()
+                if self.cache is not None:
+                    self.cache.invalidate_table(table_name)
+                if self.schema_cache is not None:
+                    self.schema_cache.add(table_name, table_columns)
 
-            with tqdm(
-                total=file_size + 2,
-                desc="Uploading data...",
-                bar_format="{desc}: {percentage:3.0f}%|{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}]",
-                colour="green",
-                unit="B",
-                unit_scale=True,
-                disable=self._quiet,
-            ) as pbar:
-                try:
-                    if create_if_missing or replace_if_exists:
-                        self._create_database_and_schema(table_name, pbar)
-
-                    if replace_if_exists:
-                        self._replace_existing_table(table_name, pbar)
-
-                    if create_if_missing or replace_if_exists:
-                        self._create_table_schema(table_name, data, pbar)
-
-                    # Request a presigned URL for the upload
-                    uuid_str = str(uuid.uuid4())
-                    filename = f"{table_name}_{uuid_str}.parquet"
-                    response = self._request_presigned_url(filename)
-                    presigned_url = response["presignedUrl"]
-                    s3_key = response["key"]
-
-                    # Upload the data to the presigned URL
-                    temp_file.seek(0)
-                    self._upload_parquet_using_presigned_url(
-                        presigned_url, temp_file, file_size, pbar
+                pbar.set_description("Data import finished.")
+
+            except Exception as e:
+                if self.schema_cache is not None:
+                    self.schema_cache.invalidate(table_name, parents=True)
+                if job is None:
+                    self._discard_staged_files(s3_keys)
+                else:
+                    # Keep the uploaded files for the next run of the job
+                    resumable = set(job.resumable_keys())
+                    self._discard_staged_files(
+                        [key for key in s3_keys if key not in resumable], job
                     )
+                self._handle_api_error(e)
+
+        result.timings = dict(timer.timings)
+        self._print(
+            f"{Fore.GREEN}✓ Successfully pushed {result.rows} records to {table_name}!{Style.RESET_ALL}\n"
+        )
+        return result
+
+    def push_many(
+        self,
+        tables: dict[str, PushData],
+        create_if_missing: bool = True,
+        replace_if_exists: bool = False,
+        dedupe_on_append: bool = False,
+        primary_key_columns: dict[str, list[str]] = {},
+        chunk_size: Optional[int] = None,
+        max_workers: int = DEFAULT_UPLOAD_WORKERS,
+        max_encode_workers: Optional[int] = None,
+        max_imports: int = DEFAULT_MAX_IMPORTS,
+        parquet_options: Union[ParquetOptions, str, None] = None,
+    ) -> dict[str, PushResult]:
+        """Push several tables at once, such as the tables of a star schema.
+
+        Tables are encoded concurrently and their parts uploaded as soon as
+        they are encoded, while each database, schema and table is created.
+        Each table is imported as soon as it is staged, with at most
+        max_imports imports running at once. Data is always staged as parquet.
+
+        A failure stops the push and deletes the files staged so far, but
+        tables that were already imported keep their rows.
+
+        Args:
+            tables: The data to push, per simple or fully qualified table name
+            create_if_missing: Create the databases, schemas and tables if needed
+            replace_if_exists: Drop and recreate the tables before importing
+            dedupe_on_append: Skip rows whose primary key already exists
+            primary_key_columns: Columns identifying a row when deduping, per
+                table name
+            chunk_size: If set, split each table into parquet parts of at most
+                this many rows
+            max_workers: Maximum number of parts uploaded at the same time
+            max_encode_workers: Maximum number of tables encoded at the same
+                time, by default one per table up to the number of CPUs
+            max_imports: Maximum number of tables imported at the same time
+            parquet_options: How parquet files are encoded, see `push`
+
+        Returns:
+            The result of each table, keyed like tables
+        """
+        qualified = {name: protocol.qualify_table_name(name) for name in tables}
+        if len(set(qualified.values())) < len(qualified):
+            raise ValueError("Each table can only be pushed once per push_many")
+
+        sources = {}
+        for name, data in tables.items():
+            options = resolve_parquet_options(
+                parquet_options, data, self._upload_bandwidth
+            )
+            sources[name] = (qualified[name], data, options)
+
+        with self.instrumentation.span("push_many", tables=len(tables)) as span:
+            results = self._push_many(
+                sources,
+                create_if_missing,
+                replace_if_exists,
+                dedupe_on_append,
+                primary_key_columns,
+                chunk_size,
+                max_workers,
+                max_encode_workers or min(len(tables), os.cpu_count() or 1),
+                max_imports,
+            )
+            span.rows = sum(result.rows for result in results.values())
+        return results
+
+    @ensure_authenticated
+    def _push_many(
+        self,
+        sources: dict[str, tuple[str, PushData, ParquetOptions]],
+        create_if_missing: bool,
+        replace_if_exists: bool,
+        dedupe_on_append: bool,
+        primary_key_columns: dict[str, list[str]],
+        chunk_size: Optional[int],
+        max_workers: int,
+        max_encode_workers: int,
+        max_imports: int,
+    ) -> dict[str, PushResult]:
+        """Stage all tables concurrently, creating and importing each one meanwhile."""
+        if not self.token:
+            raise ValueError("Authentication required")
 
-                    # Import the data into the warehouse from the presigned URL
-                    pbar.set_description("Importing data into warehouse...")
-                    if dedupe_on_append:
-                        self._import_data_from_append_only_dedupe_presigned_url(
-                            table_name, s3_key, primary_key_columns
+        started = time.perf_counter()
+        readers, columns, results, timers = {}, {}, {}, {}
+        # Staged files that still have to be deleted, per table
+        s3_keys: dict[str, list[str]] = {}
+        for name, (table_name, data, options) in sources.items():
+            readers[name] = to_record_batch_reader(data)
+            columns[name] = column_types(readers[name].schema)
+            results[name] = PushResult(table_name, "parquet", parquet_options=options)
+            timers[name] = StageTimer()
+            s3_keys[name] = []
+            if self.schema_cache is not None:
+                if replace_if_exists:
+                    self.schema_cache.invalidate(table_name)
+                else:
+                    known_columns = self.schema_cache.columns(table_name)
+                    if known_columns is not None:
+                        validate_columns(
+                            table_name,
+                            known_columns,
+                            columns[name],
+                            null_columns(
+                                readers[name].schema,
+                                (
+                                    data
+                                    if isinstance(data, (pd.DataFrame, pa.Table))
+                                    else None
+                                ),
+                            ),
                         )
-                    else:
-                        self._import_data_from_presigned_url(table_name, s3_key)
-                    pbar.update(1)
 
-                    # Clean up the data that was previously uploaded
-                    pbar.set_description("Cleaning up...")
-                    self._delete_file_from_s3(s3_key)
-                    pbar.update(1)
+        with progress_bar(
+            self._quiet,
+            total=0,
+            desc="Uploading data...",
+            bar_format="{desc}: {percentage:3.0f}%|{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}]",
+            colour="green",
+            unit="B",
+            unit_scale=True,
+        ) as pbar:
+            try:
+                with ThreadPoolExecutor(
+                    max_workers=max_workers
+                ) as uploads, ThreadPoolExecutor(
+                    max_workers=max_encode_workers
+                ) as encoders, ThreadPoolExecutor(
+                    max_workers=max_imports
+                ) as imports:
+                    staged = {
+                        name: encoders.submit(
+                            self.instrumentation.bind(self._upload_parts),
+                            table_name,
+                            readers[name],
+                            chunk_size,
+                            max_workers,
+                            uploads,
+                            s3_keys[name],
+                            results[name],
+                            timers[name],
+                            pbar,
+                        )
+                        for name, (table_name, _, _) in sources.items()
+                    }
+
+                    # Create each database and schema once, and each table
+                    # while the others are staged, importing it once it exists
+                    imported = {}
+                    created_schemas = set()
+                    table_columns = {}
+                    for name, (table_name, _, _) in sources.items():
+                        schema_name = table_name.rsplit(".", 1)[0]
+                        table_columns[name] = self._prepare_table(
+                            table_name,
+                            columns[name],
+                            create_if_missing,
+                            replace_if_exists,
+                            timers[name],
+                            pbar,
+                            create_schema=schema_name not in created_schemas,
+                        )
+                        created_schemas.add(schema_name)
+                        imported[name] = imports.submit(
+                            self.instrumentation.bind(self._import_staged_table),
+                            table_name,
+                            staged[name],
+                            s3_keys[name],
+                            dedupe_on_append,
+                            primary_key_columns.get(name, []),
+                            uploads,
+                            timers[name],
+                            pbar,
+                        )
 
-                    pbar.set_description("Data import finished.")
+                    for name, future in imported.items():
+                        finished = future.result()
+                        results[name].timings = {
+                            **timers[name].timings,
+                            "total": finished - started,
+                        }
+
+                for name, (table_name, data, _) in sources.items():
+                    if self.cache is not None:
+                        self.cache.invalidate_table(table_name)
+                    if self.schema_cache is not None:
+                        self.schema_cache.add(table_name, table_columns[name])
+                    if self.mirror is not None:
+                        self.mirror.record_push(
+                            table_name, data, replace_if_exists, dedupe_on_append
+                        )
 
-                except Exception as e:
-                    self._handle_api_error(e)
+                pbar.set_description("Data import finished.")
+
+            except Exception as e:
+                for name, (table_name, _, _) in sources.items():
+                    if self.schema_cache is not None:
+                        self.schema_cache.invalidate(table_name, parents=True)
+                    self._discard_staged_files(s3_keys[name])
+                self._handle_api_error(e)
+
+        self._print(
+            f"{Fore.GREEN}✓ Successfully pushed "
+            f"{sum(result.rows for result in results.values())} records to "
+            f"{len(results)} tables!{Style.RESET_ALL}\n"
+        )
+        return results
+
+    def _import_staged_table(
+        self,
+        table_name: str,
+        staging: Future,
+        s3_keys: list[str],
+        dedupe_on_append: bool,
+        primary_key_columns: list[str],
+        executor: ThreadPoolExecutor,
+        timer: StageTimer,
+        pbar: tqdm,
+    ) -> float:
+        """Import the parts of a table once they are staged.
+
+        Returns:
+            When the table was imported, per time.perf_counter
+        """
+        self._import_and_clean_up(
+            table_name,
+            staging.result(),
+            s3_keys,
+            dedupe_on_append,
+            primary_key_columns,
+            executor,
+            timer,
+            pbar,
+        )
+        return time.perf_counter()
+
+    def sync(
+        self,
+        table_name: str,
+        data: Union[pd.DataFrame, pa.Table],
+        primary_key_columns: list[str],
+        index: Optional[SyncIndex] = None,
+        delete_missing: bool = False,
+        create_if_missing: bool = True,
+        max_workers: int = DEFAULT_UPLOAD_WORKERS,
+    ) -> SyncResult:
+        """Upsert data into a table, sending only rows changed since the last sync.
+
+        The primary keys and row hashes of synced data are kept in a local
+        SyncIndex. Each sync diffs data against it, pushes the inserted and
+        updated rows and the deleted keys to temporary staging tables, then
+        deletes the rows with those keys and inserts the staged rows. The
+        first sync of a table, or one with an empty index, sends every row.
+
+        The index is only updated once all changes are applied, so a sync
+        that fails part way is applied again by the next one.
+
+        Args:
+            table_name: Simple or fully qualified (database.schema.table) table name
+            data: The rows to upsert, unique by primary key
+            primary_key_columns: Columns identifying a row
+            index: Where the state of synced tables is kept, by default in
+                ~/.cache/chakra/sync
+            delete_missing: Treat data as a full snapshot of the table and
+                delete the previously synced rows that are missing from it
+            create_if_missing: Create the table on its first sync if needed
+            max_workers: Maximum number of parts uploaded at the same time
+
+        Returns:
+            The number of inserted, updated, deleted and unchanged rows
+        """
+        table_name = protocol.qualify_table_name(table_name)
+        if isinstance(data, pa.Table):
+            data = data.to_pandas()
+        if index is None:
+            index = SyncIndex()
+
+        timer = StageTimer()
+        with timer.stage("total"), self.instrumentation.span(
+            "sync", table_name=table_name
+        ) as span:
+            with timer.stage("diff"):
+                previous = index.load(table_name)
+                changes = diff_rows(data, primary_key_columns, previous, delete_missing)
+            result = SyncResult(
+                table_name,
+                inserted=changes.inserted,
+                updated=changes.updated,
+                deleted=changes.deleted,
+                unchanged=changes.unchanged,
+            )
+
+            if previous is None and create_if_missing:
+                self.push(table_name, data.iloc[:0], create_if_missing=True)
+
+            staged = []
+            try:
+                with timer.stage("push"):
+                    for kind, rows in (
+                        ("keys", changes.deleted_keys),
+                        ("rows", changes.changed),
+                    ):
+                        if len(rows):
+                            staged.append(staging_table_name(table_name, kind))
+                            pushed = self.push(
+                                staged[-1],
+                                rows,
+                                replace_if_exists=True,
+                                max_workers=max_workers,
+                            )
+                            result.bytes_sent += pushed.bytes_sent
+
+                with timer.stage("apply"):
+                    for staging_table in staged:
+                        self._send_query(
+                            delete_matching_sql(
+                                table_name, staging_table, primary_key_columns
+                            ),
+                            [],
+                        )
+                    if len(changes.changed):
+                        self._send_query(
+                            insert_from_sql(table_name, staged[-1], list(data.columns)),
+                            [],
+                        )
+            except Exception as e:
+                self._handle_api_error(e)
+            finally:
+                self._drop_staging_tables(staged)
+
+            index.store(table_name, changes.index)
+            if self.cache is not None:
+                self.cache.invalidate_table(table_name)
+            if self.mirror is not None:
+                self.mirror.invalidate(table_name)
+            span.rows = len(changes.changed) + changes.deleted
 
+        result.timings = dict(timer.timings)
         self._print(
-            f"{Fore.GREEN}✓ Successfully pushed {total_records} records to {table_name}!{Style.RESET_ALL}\n"
+            f"{Fore.GREEN}✓ Synced {table_name}: {result.inserted} inserted, "
+            f"{result.updated} updated, {result.deleted} deleted, "
+            f"{result.unchanged} unchanged{Style.RESET_ALL}\n"
         )
+        return result
+
+    def _drop_staging_tables(self, staging_tables: list[str]) -> None:
+        """Drop the staging tables of a sync, warning about leftovers."""
+        for staging_table in staging_tables:
+            try:
+                self._send_query(protocol.drop_table_sql(staging_table), [])
+            except Exception:
+                self._print(
+                    f"{Fore.YELLOW}Could not drop staging table {staging_table}{Style.RESET_ALL}"
+                )
 
     def login(self) -> None:
         """Set the authentication token for API requests."""
         self._print(f"\n{Fore.GREEN}Authenticating with Chakra DB...{Style.RESET_ALL}")
 
-        with tqdm(
+        with progress_bar(
+            self._quiet,
             total=100,
             desc="Authenticating",
             bar_format="{l_bar}{bar}| {n:.0f}%",
             colour="green",
-            disable=self._quiet,
         ) as pbar:
             pbar.update(30)
             pbar.set_description("Fetching token...")
-            self.token = self._fetch_token(self._db_session_key)
+            self._authenticate()
 
-            pbar.update(40)
-            pbar.set_description("Token fetched")
-            if not self.token.startswith(TOKEN_PREFIX):
-                raise ValueError(f"Token must start with '{TOKEN_PREFIX}'")
-
-            pbar.update(30)
+            pbar.update(70)
             pbar.set_description("Authentication complete")
 
         self._print(f"{Fore.GREEN}✓ Successfully authenticated!{Style.RESET_ALL}\n")
 
-    # HACK: this is a hack to get around the fact that the duckdb go doesn't support positional parameters
-    def __query_has_positional_parameters(self, query: str) -> bool:
-        """Check if the query has positional parameters."""
-        return "$1" in query
+    def _authenticate(self) -> None:
+        """Fetch a new token, use it and store it in the token cache."""
+        with self.instrumentation.span("login"):
+            token, expires_at = self._fetch_token(self._db_session_key)
+        protocol.check_token(token)
+        self._set_token(token, expires_at)
+        if self._token_cache is not None:
+            self._token_cache.store(self._db_session_key, token, expires_at)
 
-    def __replace_position_parameters_with_autoincrement(
-        self, query: str, parameters: list
-    ) -> str:
-        """Replace positional parameters with autoincrement."""
-        if len(parameters) > 9:
-            raise ValueError(
-                "Chakra DB does not support more than 8 positional parameters"
-            )
-        # find all $1, $2, $3, etc. and replace with ?, ?, ?, etc.
-        new_query = query
-        for i in range(len(parameters)):
-            new_query = new_query.replace(f"${i+1}", f"?")
-
-        # explode the parameters into a single list with duplicates aligned
-        new_parameters = []
-        # iterate over query, find the relevant index in parameters, then add the value to new_parameters
-        for i in range(len(query)):
-            if query[i] == "$":
-                index = int(query[i + 1])
-                # duckdb uses 1-indexed parameters, so we need to subtract 1
-                new_parameters.append(parameters[index - 1])
-
-        return new_query, new_parameters
+    def _set_token(self, token: str, expires_at: Optional[float]) -> None:
+        self.token = token
+        self._token_expires_at = expires_at
+        self._schedule_refresh()
+
+    def _refresh_token(self, stale_token: Optional[str]) -> None:
+        """Log in again unless another thread already replaced stale_token.
+
+        The first login reuses a token from the token cache if there is one.
+        """
+        with self._auth_lock:
+            if self.token != stale_token:
+                return
+            cached = None
+            if stale_token is None and self._token_cache is not None:
+                cached = self._token_cache.load(self._db_session_key)
+            if cached is not None:
+                self._set_token(*cached)
+            else:
+                self.login()
+
+    def _schedule_refresh(self) -> None:
+        """Refresh the token in the background shortly before it expires."""
+        if self._refresh_timer is not None:
+            self._refresh_timer.cancel()
+            self._refresh_timer = None
+        if not self._auto_refresh or self._token_expires_at is None:
+            return
+        # Wait at least a second so that very short-lived tokens cannot spin
+        delay = max(
+            1.0, self._token_expires_at - TOKEN_REFRESH_MARGIN_SECONDS - time.time()
+        )
+        # The timer only holds a weak reference, so that a client dropped
+        # without being closed can be garbage collected and stops logging in
+        self._refresh_timer = threading.Timer(
+            delay, _refresh_in_background, args=(weakref.ref(self), self.token)
+        )
+        self._refresh_timer.daemon = True
+        self._refresh_timer.start()
 
     @ensure_authenticated
-    def execute(self, query: str, parameters: list = []) -> pd.DataFrame:
-        """Execute a query and return results as a pandas DataFrame."""
-        if not self.token:
-            raise ValueError("Authentication required")
+    def _send_query(
+        self,
+        query: str,
+        parameters: list,
+        use_arrow: bool = False,
+        stream: bool = False,
+    ) -> requests.Response:
+        """Send a query to the API and return the raw response.
+
+        Args:
+            query: The SQL query to execute
+            parameters: Positional parameters referenced as $1, $2, ... in the query
+            use_arrow: Ask the server to answer in a columnar format if it can
+            stream: Return before the response body has been downloaded
+        """
+        request_kwargs = {}
+        if use_arrow:
+            request_kwargs["headers"] = protocol.query_headers(use_arrow)
+        if stream:
+            request_kwargs["stream"] = True
+        with self.instrumentation.span("query", query=query):
+            response = self._request(
+                "post",
+                protocol.QUERY_URL,
+                idempotent=protocol.is_read_only_query(query),
+                json=protocol.query_payload(query, parameters),
+                **request_kwargs,
+            )
+            response.raise_for_status()
+        if self.schema_cache is not None and changes_schema(query):
+            self.schema_cache.clear()
+        return response
+
+    def execute(
+        self,
+        query: str,
+        parameters: list = [],
+        return_type: str = "pandas",
+        dtype_backend: Optional[str] = None,
+        use_cache: bool = True,
+        use_mirror: bool = True,
+        result_options: Optional[ResultOptions] = None,
+    ) -> Union[pd.DataFrame, pa.Table]:
+        """Execute a query and return results as a pandas DataFrame.
+
+        Args:
+            query: The SQL query to execute
+            parameters: Positional parameters referenced as $1, $2, ... in the query
+            return_type: "pandas" for a DataFrame or "arrow" for a pyarrow Table
+            dtype_backend: Set to "pyarrow" to decode the result column-wise
+                into a DataFrame backed by Arrow dtypes instead of building it
+                row by row with inferred NumPy dtypes
+            use_cache: Set to False to skip the client's cache for this call.
+                The fresh result still replaces the cached one
+            use_mirror: Set to False to send the query to the server even if
+                the client's local mirror could answer it
+            result_options: Optional ResultOptions downcasting numeric columns
+                and encoding strings compactly. The memory taken by the
+                result is then reported as well
+
+        Returns:
+            The query results
+        """
+        protocol.validate_result_options(return_type, dtype_backend)
+
+        if self.cache is not None and use_cache:
+            result = self.cache.get(
+                query,
+                parameters,
+                return_type,
+                dtype_backend,
+                result_options,
+                self._account,
+            )
+            if result is not None:
+                self._print(
+                    f"{Fore.GREEN}✓ Query served from cache!{Style.RESET_ALL}\n"
+                )
+                return result
+
+        if self.mirror is not None and use_mirror:
+            with self.instrumentation.span("mirror") as span:
+                table = self.mirror.execute(query, parameters)
+                if table is not None:
+                    span.rows = table.num_rows
+            if table is not None:
+                self._print(
+                    f"{Fore.GREEN}✓ Query answered by the local mirror!{Style.RESET_ALL}\n"
+                )
+                return convert_result(table, return_type, dtype_backend, result_options)
 
-        with tqdm(
+        # Only log in once the query has to be sent to the server
+        if not self.token or expires_soon(self._token_expires_at):
+            self._refresh_token(stale_token=self.token)
+
+        use_arrow = return_type == "arrow" or dtype_backend == "pyarrow"
+
+        instrumentation = self.instrumentation
+        with progress_bar(
+            self._quiet,
             total=3,
             desc="Preparing query...",
             bar_format="{l_bar}{bar}| {n_fmt}/{total_fmt} steps",
             colour="green",
-            disable=self._quiet,
-        ) as pbar:
+        ) as pbar, instrumentation.span("execute") as span:
             try:
-                if self.__query_has_positional_parameters(query):
-                    query, parameters = (
-                        self.__replace_position_parameters_with_autoincrement(
-                            query, parameters
-                        )
-                    )
                 pbar.set_description("Executing query...")
-                response = self._session.post(
-                    f"{BASE_URL}/api/v1/query",
-                    json={"sql": query, "parameters": parameters},
-                )
-                response.raise_for_status()
+                response = self._send_query(query, parameters, use_arrow)
                 pbar.update(1)
 
                 pbar.set_description("Processing results...")
-                data = response.json()
-                pbar.update(1)
+                memory = None
+                if not use_arrow and result_options is None:
+                    with instrumentation.span("decode") as decode_span:
+                        data = response.json()
+                        decode_span.rows = len(data["rows"])
+                    pbar.update(1)
 
-                pbar.set_description("Building DataFrame...")
-                df = pd.DataFrame(data["rows"], columns=data["columns"])
-                pbar.update(1)
+                    pbar.set_description("Building DataFrame...")
+                    with instrumentation.span("build"):
+                        result = json_result_to_pandas(data)
+                    pbar.update(1)
+                else:
+                    with instrumentation.span("decode") as decode_span:
+                        result = (
+                            read_arrow_response(response)
+                            if use_arrow
+                            else decode_json_result(response.json())
+                        )
+                        decode_span.rows = result.num_rows
+                    pbar.update(1)
+
+                    if return_type == "pandas" or result_options is not None:
+                        pbar.set_description("Building DataFrame...")
+                        with instrumentation.span("build") as build_span:
+                            result = convert_result(
+                                result, return_type, dtype_backend, result_options
+                            )
+                            if result_options is not None:
+                                memory = memory_report(result)
+                                build_span.set_attribute(
+                                    "memory_bytes", memory.total_bytes
+                                )
+                    pbar.update(1)
+                span.rows = len(result)
 
                 pbar.set_description("Query execution finished.")
             except Exception as e:
                 self._handle_api_error(e)
 
-        self._print(f"{Fore.GREEN}✓ Query executed successfully!{Style.RESET_ALL}\n")
-        return df
+        if self.cache is not None:
+            self.cache.put(
+                query,
+                result,
+                parameters,
+                return_type,
+                dtype_backend,
+                result_options,
+                self._account,
+            )
+        if self.mirror is not None and not is_cacheable(query):
+            for table_name in write_targets(query):
+                self.mirror.invalidate(table_name)
+
+        details = f" ({memory})" if memory is not None else ""
+        self._print(
+            f"{Fore.GREEN}✓ Query executed successfully!{details}{Style.RESET_ALL}\n"
+        )
+        return result
+
+    def execute_arrow(self, query: str, parameters: list = []) -> pa.Table:
+        """Execute a query and return results as a pyarrow Table."""
+        return self.execute(query, parameters, return_type="arrow")
 
-    def _map_pandas_to_duckdb_type(self, dtype) -> str:
-        """Convert pandas dtype to DuckDB type.
+    def mirror_table(
+        self, table_name: str, query: Optional[str] = None
+    ) -> MirroredTable:
+        """Copy a table into the local mirror, so that queries reading it run locally.
 
         Args:
-            dtype: Pandas dtype object
+            table_name: Simple or fully qualified (database.schema.table) table name
+            query: The query returning the rows to copy, by default every row
+                of the table. It is run again when the copy is refreshed
 
         Returns:
-            str: Corresponding DuckDB type name
+            The copied table
         """
-        dtype_str = str(dtype)
-        if "int" in dtype_str:
-            return "BIGINT"
-        elif "float" in dtype_str:
-            return "DOUBLE"
-        elif "bool" in dtype_str:
-            return "BOOLEAN"
-        elif "datetime" in dtype_str:
-            return "TIMESTAMP"
-        elif "timedelta" in dtype_str:
-            return "INTERVAL"
-        elif "object" in dtype_str:
-            return "VARCHAR"
-        else:
-            return "VARCHAR"  # Default fallback
+        if self.mirror is None:
+            raise ValueError("mirror_table requires a client created with a mirror")
+        table_name = protocol.qualify_table_name(table_name)
+        query = query or f"SELECT * FROM {table_name}"
+        data = self.execute(
+            query, return_type="arrow", use_cache=False, use_mirror=False
+        )
+        return self.mirror.register(table_name, data, query)
+
+    def refresh_mirror(
+        self, table_names: Optional[list[str]] = None, stale_only: bool = False
+    ) -> list[MirroredTable]:
+        """Copy mirrored tables again, with the query that first copied them.
+
+        Args:
+            table_names: Simple or fully qualified names of the tables to
+                refresh, by default every mirrored table
+            stale_only: Only refresh tables older than the mirror's max_age
+
+        Returns:
+            The refreshed tables
+        """
+        if self.mirror is None:
+            raise ValueError("refresh_mirror requires a client created with a mirror")
+        mirrored = self.mirror.tables()
+        if table_names is not None:
+            names = {protocol.qualify_table_name(name).lower() for name in table_names}
+            mirrored = {
+                name: table for name, table in mirrored.items() if name in names
+            }
+        return [
+            self.mirror_table(table.table_name, table.query)
+            for table in mirrored.values()
+            if not (stale_only and self.mirror.is_fresh(table))
+        ]
+
+    def execute_many(
+        self,
+        queries: list[Union[str, tuple[str, list]]],
+        max_workers: int = DEFAULT_QUERY_WORKERS,
+        return_type: str = "pandas",
+        dtype_backend: Optional[str] = None,
+        result_options: Optional[ResultOptions] = None,
+        use_mirror: bool = True,
+    ) -> list[Union[pd.DataFrame, pa.Table, Exception]]:
+        """Execute independent queries concurrently.
+
+        A failing query does not abort the batch: its exception is returned in
+        its place, like asyncio.gather(..., return_exceptions=True). Like
+        `execute`, queries are answered from the cache or the local mirror
+        when they can be, and writes invalidate what they may have changed.
+
+        Args:
+            queries: SQL strings, or (query, parameters) tuples
+            max_workers: Maximum number of queries in flight at once
+            return_type: "pandas" for DataFrames or "arrow" for pyarrow Tables
+            dtype_backend: Set to "pyarrow" for DataFrames backed by Arrow dtypes
+            result_options: Optional ResultOptions applied to every result
+            use_mirror: Set to False to send every query to the server even if
+                the client's local mirror could answer it
+
+        Returns:
+            One result or exception per query, in the order of queries
+        """
+        protocol.validate_result_options(return_type, dtype_backend)
+        use_arrow = return_type == "arrow" or dtype_backend == "pyarrow"
+
+        def run(query_spec):
+            query, parameters = (
+                (query_spec, []) if isinstance(query_spec, str) else query_spec
+            )
+            try:
+                if self.cache is not None:
+                    result = self.cache.get(
+                        query,
+                        list(parameters),
+                        return_type,
+                        dtype_backend,
+                        result_options,
+                        self._account,
+                    )
+                    if result is not None:
+                        return result
+                if self.mirror is not None and use_mirror:
+                    table = self.mirror.execute(query, list(parameters))
+                    if table is not None:
+                        return convert_result(
+                            table, return_type, dtype_backend, result_options
+                        )
+                # Only log in once a query has to be sent to the server
+                if not self.token or expires_soon(self._token_expires_at):
+                    self._refresh_token(stale_token=self.token)
+                response = self._send_query(query, list(parameters), use_arrow)
+                result = build_result(
+                    response,
+                    return_type,
+                    use_arrow,
+                    self.instrumentation,
+                    result_options,
+                )
+                if self.cache is not None:
+                    self.cache.put(
+                        query,
+                        result,
+                        list(parameters),
+                        return_type,
+                        dtype_backend,
+                        result_options,
+                        self._account,
+                    )
+                if self.mirror is not None and not is_cacheable(query):
+                    for table_name in write_targets(query):
+                        self.mirror.invalidate(table_name)
+                return result
+            except Exception as e:
+                return protocol.to_api_error(e)
+            finally:
+                pbar.update(1)
+
+        with progress_bar(
+            self._quiet,
+            total=len(queries),
+            desc="Executing queries...",
+            bar_format="{l_bar}{bar}| {n_fmt}/{total_fmt} queries",
+            colour="green",
+        ) as pbar, ThreadPoolExecutor(
+            max_workers=max_workers
+        ) as executor, self.instrumentation.span(
+            "execute_many"
+        ) as span:
+            results = list(executor.map(self.instrumentation.bind(run), queries))
+            span.set_attribute("queries", len(queries))
+
+        failed = sum(isinstance(result, Exception) for result in results)
+        self._print(
+            f"{Fore.GREEN}✓ Executed {len(results) - failed} queries successfully"
+            f"{f', {failed} failed' if failed else ''}!{Style.RESET_ALL}\n"
+        )
+        return results
+
+    def prepare(self, query: str) -> PreparedStatement:
+        """Prepare a query to execute it repeatedly with different parameters.
+
+        Args:
+            query: The SQL query, with parameters referenced as $1, $2, ... or ?
+
+        Returns:
+            A statement whose execute and executemany methods run the query
+
+        Raises:
+            ValueError: If the query mixes $N and ? placeholders
+        """
+        return PreparedStatement(self, query)
+
+    def executemany(self, query: str, parameter_sets: Iterable[Sequence]) -> int:
+        """Execute a statement once per set of parameters.
+
+        A single-row INSERT ... VALUES statement is sent as multi-row INSERTs
+        binding up to 65,535 values each, so thousands of rows take a single
+        round trip. Other statements are sent once per set of parameters, in
+        order.
+
+        Args:
+            query: The statement, with parameters referenced as $1, $2, ... or ?
+            parameter_sets: One sequence of parameters per execution
+
+        Returns:
+            The number of executions
+        """
+        executions = 0
+        with progress_bar(
+            self._quiet,
+            desc="Executing statement...",
+            unit=" executions",
+            colour="green",
+        ) as pbar, self.instrumentation.span("executemany", query=query) as span:
+            try:
+                for sql, parameters, count in executemany_requests(
+                    query, parameter_sets
+                ):
+                    self._send_statement(query, sql, parameters)
+                    executions += count
+                    pbar.update(count)
+            except Exception as e:
+                self._handle_api_error(e)
+            finally:
+                span.rows = executions
+                if self.schema_cache is not None and changes_schema(query):
+                    self.schema_cache.clear()
+                for table_name in write_targets(query):
+                    if self.cache is not None:
+                        self.cache.invalidate_table(table_name)
+                    if self.mirror is not None:
+                        self.mirror.invalidate(table_name)
+
+        self._print(
+            f"{Fore.GREEN}✓ Executed statement {executions} times!{Style.RESET_ALL}\n"
+        )
+        return executions
+
+    @ensure_authenticated
+    def _send_statement(self, query: str, sql: str, parameters: list) -> None:
+        """Send one request of executemany, with placeholders already rewritten."""
+        with self.instrumentation.span("query", query=query):
+            response = self._request(
+                "post",
+                protocol.QUERY_URL,
+                idempotent=protocol.is_read_only_query(sql),
+                json={"sql": sql, "parameters": parameters},
+            )
+            response.raise_for_status()
+
+    def execute_iter(
+        self,
+        query: str,
+        parameters: list = [],
+        chunk_size: int = DEFAULT_RESULT_CHUNK_SIZE,
+        return_type: str = "pandas",
+        dtype_backend: Optional[str] = None,
+        paginate: bool = False,
+    ) -> Iterator[Union[pd.DataFrame, pa.RecordBatch]]:
+        """Execute a query and iterate over its results chunk by chunk.
+
+        The response body is parsed as it is downloaded, so results larger
+        than memory can be processed and the first chunk is available before
+        the last byte is received.
+
+        Args:
+            query: The SQL query to execute
+            parameters: Positional parameters referenced as $1, $2, ... in the query
+            chunk_size: Maximum number of rows per chunk. Arrow streams sent by
+                the server are yielded with the server's own batch sizes
+            return_type: "pandas" for DataFrames or "arrow" for pyarrow RecordBatches
+            dtype_backend: Set to "pyarrow" for DataFrames backed by Arrow dtypes
+            paginate: Fetch the result with one LIMIT/OFFSET query per chunk
+                instead of a single streamed response, which also bounds the
+                server-side result size. Pages are only consistent if the
+                query has a deterministic ORDER BY
+
+        Returns:
+            An iterator over the result chunks
+        """
+        protocol.validate_result_options(return_type, dtype_backend)
+        use_arrow = return_type == "arrow" or dtype_backend == "pyarrow"
+
+        if paginate:
+            return self._iter_result_pages(
+                query, parameters, chunk_size, return_type, use_arrow
+            )
+
+        try:
+            response = self._send_query(query, parameters, use_arrow, stream=True)
+        except Exception as e:
+            self._handle_api_error(e)
+        return self._iter_result_stream(response, chunk_size, return_type, use_arrow)
+
+    def _iter_result_stream(
+        self,
+        response: requests.Response,
+        chunk_size: int,
+        return_type: str,
+        use_arrow: bool,
+    ) -> Iterator[Union[pd.DataFrame, pa.RecordBatch]]:
+        """Yield result chunks from a streamed query response."""
+        try:
+            with progress_bar(
+                self._quiet,
+                desc="Streaming results...",
+                unit=" rows",
+                colour="green",
+            ) as pbar:
+                content_type = response.headers.get("Content-Type", "")
+                if content_type.startswith(ARROW_STREAM_MEDIA_TYPE):
+                    response.raw.decode_content = True
+                    for batch in iter_arrow_stream(response.raw):
+                        pbar.update(batch.num_rows)
+                        yield self._convert_result_chunk(batch, return_type)
+                    return
+
+                for columns, rows in iter_json_result(
+                    response.iter_content(chunk_size=RESPONSE_READ_SIZE), chunk_size
+                ):
+                    pbar.update(len(rows))
+                    if use_arrow:
+                        batch = decode_json_rows(columns, rows)
+                        yield self._convert_result_chunk(batch, return_type)
+                    else:
+                        yield pd.DataFrame(rows, columns=columns)
+        finally:
+            response.close()
+
+    def _iter_result_pages(
+        self,
+        query: str,
+        parameters: list,
+        chunk_size: int,
+        return_type: str,
+        use_arrow: bool,
+    ) -> Iterator[Union[pd.DataFrame, pa.RecordBatch]]:
+        """Yield result chunks by fetching one LIMIT/OFFSET page at a time."""
+        inner_query = query.strip().rstrip(";")
+        offset = 0
+        with progress_bar(
+            self._quiet,
+            desc="Fetching pages...",
+            unit=" rows",
+            colour="green",
+        ) as pbar:
+            while True:
+                page_query = (
+                    f"SELECT * FROM ({inner_query}) AS page "
+                    f"LIMIT {chunk_size} OFFSET {offset}"
+                )
+                try:
+                    response = self._send_query(page_query, parameters, use_arrow)
+                    with self.instrumentation.span("decode") as span:
+                        if use_arrow:
+                            page = table_to_batch(read_arrow_response(response))
+                            num_rows = page.num_rows
+                        else:
+                            data = response.json()
+                            num_rows = len(data["rows"])
+                        span.rows = num_rows
+                    if not use_arrow:
+                        with self.instrumentation.span("build"):
+                            page = json_result_to_pandas(data)
+                except Exception as e:
+                    self._handle_api_error(e)
+
+                if num_rows == 0:
+                    return
+                pbar.update(num_rows)
+                yield (
+                    self._convert_result_chunk(page, return_type) if use_arrow else page
+                )
+                if num_rows < chunk_size:
+                    return
+                offset += chunk_size
+
+    def _convert_result_chunk(
+        self, batch: pa.RecordBatch, return_type: str
+    ) -> Union[pd.DataFrame, pa.RecordBatch]:
+        """Convert an Arrow result chunk to the requested return type."""
+        if return_type == "arrow":
+            return batch
+        return arrow_to_pandas(batch)
 
     def _handle_api_error(self, e: Exception) -> None:
         """Handle API errors consistently.
@@ -494,10 +2093,4 @@ class Chakra:
         Raises:
             ChakraAPIError: Enhanced error with API response details
         """
-        if hasattr(e, "response") and hasattr(e.response, "json"):
-            try:
-                error_msg = e.response.json().get("error", str(e))
-                raise ChakraAPIError(error_msg, e.response) from e
-            except ValueError:  # JSON decoding failed
-                raise ChakraAPIError(str(e), e.response) from e
-        raise e  # Re-raise original exception if not an API error
+        protocol.raise_api_error(e)
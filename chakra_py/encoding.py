@@ -0,0 +1,142 @@
+import os
+from dataclasses import dataclass
+from typing import Optional, Sequence, Union
+
+from .inserts import estimated_size
+
+PARQUET_COMPRESSIONS = ("none", "snappy", "gzip", "brotli", "lz4", "zstd")
+
+# Upload bandwidths, in bytes per second, beyond which encoding rather than
+# the network bounds a push, and below which the network does
+FAST_UPLOAD_BANDWIDTH = 100 * 1024 * 1024
+SLOW_UPLOAD_BANDWIDTH = 10 * 1024 * 1024
+# Compression level used on slow links, where every byte saved pays off
+SLOW_UPLOAD_ZSTD_LEVEL = 9
+# Uncompressed size of the row groups written in auto mode
+TARGET_ROW_GROUP_BYTES = 128 * 1024 * 1024
+# In-memory data from this size on is encoded by several threads in auto mode
+PARALLEL_ENCODE_MIN_BYTES = 64 * 1024 * 1024
+MAX_AUTO_ENCODE_WORKERS = 4
+# Upload bandwidth is estimated from uploads of at least this size
+MIN_BANDWIDTH_SAMPLE_BYTES = 256 * 1024
+BANDWIDTH_SMOOTHING = 0.3
+
+
+@dataclass(frozen=True)
+class ParquetOptions:
+    """How pushed data is encoded into parquet files.
+
+    Attributes:
+        compression: One of PARQUET_COMPRESSIONS
+        compression_level: Codec-specific level, None for the codec default
+        row_group_size: Rows per row group, None to write each incoming
+            record batch as its own row group
+        use_dictionary: Dictionary-encode all columns, none of them, or only
+            the listed ones
+        write_statistics: Write min/max statistics for all columns, none of
+            them, or only the listed ones
+        encode_workers: Parts encoded at the same time by a thread pool.
+            Only chunked pushes have several parts, and each part in flight
+            holds its rows in memory until it is encoded; pushes without a
+            chunk_size stream their single part through one encoder
+    """
+
+    compression: str = "zstd"
+    compression_level: Optional[int] = None
+    row_group_size: Optional[int] = None
+    use_dictionary: Union[bool, Sequence[str]] = True
+    write_statistics: Union[bool, Sequence[str]] = True
+    encode_workers: int = 1
+
+    def __post_init__(self):
+        if self.compression not in PARQUET_COMPRESSIONS:
+            raise ValueError(
+                f"compression must be one of {', '.join(PARQUET_COMPRESSIONS)}"
+            )
+        if self.row_group_size is not None and self.row_group_size < 1:
+            raise ValueError("row_group_size must be positive")
+        if self.encode_workers < 1:
+            raise ValueError("encode_workers must be at least 1")
+
+    def writer_options(self) -> dict:
+        """Keyword arguments for pyarrow.parquet.ParquetWriter."""
+        return {
+            "compression": self.compression,
+            "compression_level": self.compression_level,
+            "use_dictionary": (
+                self.use_dictionary
+                if isinstance(self.use_dictionary, bool)
+                else list(self.use_dictionary)
+            ),
+            "write_statistics": (
+                self.write_statistics
+                if isinstance(self.write_statistics, bool)
+                else list(self.write_statistics)
+            ),
+        }
+
+
+def auto_parquet_options(
+    data, upload_bandwidth: Optional[float] = None
+) -> ParquetOptions:
+    """Pick encoding settings from the size of the data and the upload bandwidth.
+
+    Fast links get a cheap codec since encoding is the bottleneck, while
+    slow links get a higher compression level to send fewer bytes. Large
+    in-memory data is split into row groups of about TARGET_ROW_GROUP_BYTES
+    and encoded by several threads.
+
+    Args:
+        data: The data being pushed
+        upload_bandwidth: Bytes per second measured on previous uploads, if any
+    """
+    compression, level = "zstd", None
+    if upload_bandwidth is not None:
+        if upload_bandwidth >= FAST_UPLOAD_BANDWIDTH:
+            compression = "lz4"
+        elif upload_bandwidth <= SLOW_UPLOAD_BANDWIDTH:
+            level = SLOW_UPLOAD_ZSTD_LEVEL
+
+    size = estimated_size(data)
+    row_group_size, encode_workers = None, 1
+    if size > TARGET_ROW_GROUP_BYTES and len(data):
+        row_group_size = max(1, len(data) * TARGET_ROW_GROUP_BYTES // size)
+    if size >= PARALLEL_ENCODE_MIN_BYTES:
+        encode_workers = min(MAX_AUTO_ENCODE_WORKERS, os.cpu_count() or 1)
+    return ParquetOptions(
+        compression=compression,
+        compression_level=level,
+        row_group_size=row_group_size,
+        encode_workers=encode_workers,
+    )
+
+
+def resolve_parquet_options(
+    options: Union[ParquetOptions, str, None],
+    data,
+    upload_bandwidth: Optional[float],
+) -> ParquetOptions:
+    """The options to encode data with, given what was passed to `push`."""
+    if options is None:
+        return ParquetOptions()
+    if isinstance(options, ParquetOptions):
+        return options
+    if options == "auto":
+        return auto_parquet_options(data, upload_bandwidth)
+    raise ValueError("parquet_options must be a ParquetOptions, 'auto' or None")
+
+
+def update_bandwidth(
+    estimate: Optional[float], nbytes: int, seconds: float
+) -> Optional[float]:
+    """Fold the throughput of an upload into an exponentially weighted estimate.
+
+    Uploads smaller than MIN_BANDWIDTH_SAMPLE_BYTES are ignored, since their
+    duration is dominated by latency rather than bandwidth.
+    """
+    if nbytes < MIN_BANDWIDTH_SAMPLE_BYTES or seconds <= 0:
+        return estimate
+    sample = nbytes / seconds
+    if estimate is None:
+        return sample
+    return estimate + BANDWIDTH_SMOOTHING * (sample - estimate)
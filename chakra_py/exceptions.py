@@ -12,3 +12,10 @@ class ChakraAuthError(ChakraAPIError):
 
     def __init__(self, message: str, response=None):
         super().__init__(message, response)
+
+
+class ChakraSchemaError(ChakraAPIError):
+    """Raised when pushed data does not match the schema of its table."""
+
+    def __init__(self, message: str, response=None):
+        super().__init__(message, response)
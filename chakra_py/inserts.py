@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import itertools
+import json
+from typing import Iterator, Optional, Union
+
+from .lazy import lazy_import
+
+pd = lazy_import("pandas")
+pa = lazy_import("pyarrow")
+pc = lazy_import("pyarrow.compute")
+
+
+# Target size of the JSON body of each INSERT request
+DEFAULT_INSERT_BATCH_BYTES = 1024 * 1024
+# In-memory data up to this size is inserted directly rather than staged as parquet
+DIRECT_INSERT_MAX_BYTES = 1024 * 1024
+# Upper bound of the number of parameters bound by a single statement
+MAX_INSERT_PARAMETERS = 65_535
+# Rows used to estimate the size of the first batch
+_SAMPLE_ROWS = 100
+
+PUSH_METHODS = ("auto", "insert", "parquet")
+
+_INFINITIES = (float("inf"), float("-inf"))
+
+
+def estimated_size(data) -> int:
+    """In-memory size of a DataFrame or Arrow table, or -1 if it is a stream."""
+    if isinstance(data, pd.DataFrame):
+        return int(data.memory_usage(index=False, deep=True).sum())
+    if isinstance(data, pa.Table):
+        return data.nbytes
+    return -1
+
+
+def use_direct_insert(
+    data, method: str, dedupe_on_append: bool, chunk_size: Optional[int]
+) -> bool:
+    """Whether to push data with INSERT statements rather than staged parquet files.
+
+    In auto mode, small in-memory data is inserted directly: a few INSERT
+    requests are cheaper than staging a file, which takes four round trips.
+    """
+    if method not in PUSH_METHODS:
+        raise ValueError(f"method must be one of {', '.join(PUSH_METHODS)}")
+    if method == "insert":
+        if dedupe_on_append:
+            raise ValueError("dedupe_on_append is not supported with method='insert'")
+        return True
+    if method == "parquet" or dedupe_on_append or chunk_size:
+        return False
+    if not 0 <= estimated_size(data) <= DIRECT_INSERT_MAX_BYTES:
+        return False
+    # Lists, structs and maps are staged as parquet, which keeps their types
+    return not _has_nested_columns(data)
+
+
+def _has_nested_columns(data: Union[pd.DataFrame, pa.Table]) -> bool:
+    try:
+        schema = (
+            data.schema
+            if isinstance(data, pa.Table)
+            else pa.Schema.from_pandas(data, preserve_index=False)
+        )
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return False
+    return any(pa.types.is_nested(field.type) for field in schema)
+
+
+def _json_column(column: Union[pa.Array, pa.ChunkedArray]) -> list:
+    """Convert a column to JSON-serializable values in native code.
+
+    Numbers, booleans and strings keep their type and NaNs become nulls;
+    values JSON cannot represent, such as timestamps, decimals and
+    infinities, are sent as their string form, which DuckDB casts back.
+    """
+    column_type = column.type
+    if pa.types.is_dictionary(column_type):
+        column = column.cast(column_type.value_type)
+        column_type = column_type.value_type
+    if (
+        pa.types.is_temporal(column_type)
+        or pa.types.is_decimal(column_type)
+        or pa.types.is_binary(column_type)
+        or pa.types.is_large_binary(column_type)
+    ):
+        column = pc.cast(column, pa.string())
+    elif pa.types.is_floating(column_type):
+        column = pc.if_else(pc.is_nan(column), None, column)
+        if pc.any(pc.is_inf(column)).as_py():
+            return [
+                ("inf" if value > 0 else "-inf") if value in _INFINITIES else value
+                for value in column.to_pylist()
+            ]
+    return column.to_pylist()
+
+
+def _quote_identifier(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def insert_bodies(
+    table_name: str,
+    table: pa.Table,
+    max_bytes: int = DEFAULT_INSERT_BATCH_BYTES,
+) -> Iterator[tuple[bytes, int]]:
+    """Encode a table into query request bodies inserting it in batches.
+
+    Each column is converted in one pass and rows are interleaved with zip,
+    instead of building placeholders and checking values cell by cell.
+    Batches are sized so that each body is about max_bytes, adjusting the
+    number of rows after each batch to the size actually produced.
+
+    Args:
+        table_name: Fully qualified name of the table to insert into
+        table: The rows to insert
+        max_bytes: Target size of each request body
+
+    Yields:
+        (JSON request body, number of rows) for each batch
+    """
+    num_columns = table.num_columns
+    if table.num_rows == 0 or num_columns == 0:
+        return
+
+    columns = ", ".join(_quote_identifier(name) for name in table.column_names)
+    row_placeholder = "(" + ", ".join(["?"] * num_columns) + ")"
+    max_rows = max(1, MAX_INSERT_PARAMETERS // num_columns)
+
+    # Estimate the size of a row from the JSON encoding of a small sample
+    sample = table.slice(0, _SAMPLE_ROWS)
+    sample_bytes = len(json.dumps([_json_column(c) for c in sample.columns]))
+    sample_bytes += sample.num_rows * (len(row_placeholder) + 2)
+    rows = max(1, min(max_rows, max_bytes * sample.num_rows // max(sample_bytes, 1)))
+
+    offset = 0
+    while offset < table.num_rows:
+        batch = table.slice(offset, rows)
+        parameters = list(
+            itertools.chain.from_iterable(
+                zip(*(_json_column(column) for column in batch.columns))
+            )
+        )
+        sql = f"INSERT INTO {table_name} ({columns}) VALUES " + ", ".join(
+            [row_placeholder] * batch.num_rows
+        )
+        body = json.dumps({"sql": sql, "parameters": parameters}).encode()
+        yield body, batch.num_rows
+
+        offset += batch.num_rows
+        rows = max(1, min(max_rows, batch.num_rows * max_bytes // len(body)))
@@ -0,0 +1,358 @@
+import itertools
+import threading
+import time
+import warnings
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator, Optional, Union
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:  # pragma: no cover - optional dependency
+    otel_trace = None
+
+_span_ids = itertools.count(1)
+# The innermost span open in the current thread or task
+_current_span: ContextVar[Optional["Span"]] = ContextVar(
+    "chakra_current_span", default=None
+)
+
+
+def _size_of(body) -> int:
+    """Length of a request or response body, 0 if it is unknown."""
+    try:
+        return len(body)
+    except TypeError:
+        return 0
+
+
+@dataclass
+class Span:
+    """A timed operation of the client, such as a request or a decoding step.
+
+    Spans nest: a push span contains the DDL, presign, upload, import and
+    cleanup spans of the push, and requests sent within a span add their
+    bytes, retries and status code to it.
+
+    Attributes:
+        name: "login", "ddl", "presign", "upload", "import", "cleanup",
+            "insert", "query", "decode", "build", or the name of the client
+            method ("push", "push_many", "sync", "execute", "execute_many",
+            "executemany") for the span wrapping a whole call, or "mirror"
+            for a query looked up in the local mirror
+        attributes: Details such as the table name or DDL statement
+        parent: The span this one was opened in, None for a top-level call
+        span_id: Identifier of the span, unique within the process
+        start_time: When the span started, in seconds since the epoch
+        duration: Seconds the span lasted, None while it is open
+        bytes_sent: Size of the request bodies sent, after compression
+        bytes_received: Size of the response bodies received, if known
+        rows: Number of rows pushed, inserted or decoded, if relevant
+        retries: Requests repeated after a transient failure
+        status_code: HTTP status of the last response received
+        error: The exception the span failed with, if any
+    """
+
+    name: str
+    attributes: dict[str, Any] = field(default_factory=dict)
+    parent: Optional["Span"] = field(default=None, repr=False)
+    span_id: int = field(default_factory=lambda: next(_span_ids))
+    start_time: float = field(default_factory=time.time)
+    duration: Optional[float] = None
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    rows: Optional[int] = None
+    retries: int = 0
+    status_code: Optional[int] = None
+    error: Optional[BaseException] = None
+
+    # Lets callers skip computing values that a disabled span would drop
+    recording = True
+
+    @property
+    def end_time(self) -> Optional[float]:
+        """When the span ended, in seconds since the epoch."""
+        return None if self.duration is None else self.start_time + self.duration
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_response(self, response) -> None:
+        """Add the body sizes and status of a requests or httpx response."""
+        self.status_code = response.status_code
+        request = getattr(response, "request", None)
+        # requests keeps the prepared body, httpx the content of the request
+        body = getattr(request, "body", None)
+        if body is None:
+            try:
+                body = getattr(request, "content", None)
+            except Exception:  # a streamed httpx request body
+                body = None
+        self.bytes_sent += _size_of(body) if body is not None else 0
+
+        length = response.headers.get("Content-Length")
+        if isinstance(length, str) and length.isdigit():
+            received = int(length)
+        elif isinstance(getattr(response, "num_bytes_downloaded", None), int):
+            # Counted by httpx as chunked bodies are read
+            received = response.num_bytes_downloaded
+        else:
+            # requests sets _content once a non-streamed body has been read
+            content = getattr(response, "_content", None)
+            received = len(content) if isinstance(content, bytes) else 0
+        self.bytes_received += received
+
+
+class _NullSpan:
+    """Stands in for spans when instrumentation is disabled, ignoring writes."""
+
+    recording = False
+    attributes: dict[str, Any] = {}
+    bytes_sent = bytes_received = retries = 0
+    rows = status_code = error = None
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def record_response(self, response) -> None:
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class SpanHook:
+    """Base class for hooks notified when spans start and end.
+
+    Hooks are called synchronously in the thread or task running the span,
+    so they should be cheap; hand spans off to a queue for heavy exports.
+    """
+
+    def on_start(self, span: Span) -> None:
+        pass
+
+    def on_end(self, span: Span) -> None:
+        pass
+
+
+class _CallbackHook(SpanHook):
+    def __init__(self, callback: Callable[[Span], None]):
+        self._callback = callback
+
+    def on_end(self, span: Span) -> None:
+        self._callback(span)
+
+
+class SpanCollector(SpanHook):
+    """Keep every finished span in memory, e.g. for tests or ad hoc analysis.
+
+    Example:
+        >>> collector = SpanCollector()
+        >>> client = Chakra("DB_SESSION_KEY", instrumentation=Instrumentation(collector))
+        >>> client.push("events", df)
+        >>> collector.totals()["upload"]["duration"]
+    """
+
+    def __init__(self):
+        self.spans: list[Span] = []
+        self._lock = threading.Lock()
+
+    def on_end(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def named(self, name: str) -> list[Span]:
+        """The finished spans with the given name."""
+        with self._lock:
+            return [span for span in self.spans if span.name == name]
+
+    def totals(self) -> dict[str, dict[str, float]]:
+        """Count, duration, bytes, rows and retries summed per span name."""
+        totals: dict[str, dict[str, float]] = {}
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            total = totals.setdefault(
+                span.name,
+                {
+                    "count": 0,
+                    "duration": 0.0,
+                    "bytes_sent": 0,
+                    "bytes_received": 0,
+                    "rows": 0,
+                    "retries": 0,
+                    "errors": 0,
+                },
+            )
+            total["count"] += 1
+            total["duration"] += span.duration or 0.0
+            total["bytes_sent"] += span.bytes_sent
+            total["bytes_received"] += span.bytes_received
+            total["rows"] += span.rows or 0
+            total["retries"] += span.retries
+            total["errors"] += span.error is not None
+        return totals
+
+
+class OpenTelemetryExporter(SpanHook):
+    """Mirror spans as OpenTelemetry spans, nested like the client's spans.
+
+    Top-level spans are children of the OpenTelemetry span active when the
+    client method was called. Requires the `otel` extra
+    (`pip install "chakra-py[otel]"`) and a configured tracer provider.
+    """
+
+    def __init__(self, tracer=None):
+        """Initialize the exporter.
+
+        Args:
+            tracer: The OpenTelemetry tracer to create spans with, by default
+                the "chakra_py" tracer of the global tracer provider
+        """
+        if otel_trace is None:
+            raise ImportError(
+                'OpenTelemetryExporter requires opentelemetry-api, install it with: pip install "chakra-py[otel]"'
+            )
+        self._tracer = tracer or otel_trace.get_tracer("chakra_py")
+        # Open OpenTelemetry spans by span_id, to parent their children
+        self._open: dict[int, Any] = {}
+        self._lock = threading.Lock()
+
+    def on_start(self, span: Span) -> None:
+        with self._lock:
+            parent = self._open.get(span.parent.span_id) if span.parent else None
+        context = otel_trace.set_span_in_context(parent) if parent else None
+        otel_span = self._tracer.start_span(
+            f"chakra.{span.name}",
+            context=context,
+            start_time=int(span.start_time * 1e9),
+        )
+        with self._lock:
+            self._open[span.span_id] = otel_span
+
+    def on_end(self, span: Span) -> None:
+        with self._lock:
+            otel_span = self._open.pop(span.span_id, None)
+        if otel_span is None:
+            return
+        for key, value in span.attributes.items():
+            if isinstance(value, (str, bool, int, float)):
+                otel_span.set_attribute(f"chakra.{key}", value)
+        otel_span.set_attribute("chakra.bytes_sent", span.bytes_sent)
+        otel_span.set_attribute("chakra.bytes_received", span.bytes_received)
+        otel_span.set_attribute("chakra.retries", span.retries)
+        if span.rows is not None:
+            otel_span.set_attribute("chakra.rows", span.rows)
+        if span.status_code is not None:
+            otel_span.set_attribute("http.response.status_code", span.status_code)
+        if span.error is not None:
+            otel_span.record_exception(span.error)
+            otel_span.set_status(
+                otel_trace.Status(otel_trace.StatusCode.ERROR, str(span.error))
+            )
+        otel_span.end(end_time=int(span.end_time * 1e9))
+
+
+class Instrumentation:
+    """Report the requests and processing steps of a client as spans.
+
+    Hooks receive every span the client opens, with its duration, bytes sent
+    and received, rows, retries and status code. Without hooks, spans are
+    not even created, so instrumentation costs next to nothing when unused.
+
+    Example:
+        >>> def log_span(span):
+        ...     print(span.name, span.duration, span.status_code)
+        >>> client = Chakra("DB_SESSION_KEY", instrumentation=Instrumentation(log_span))
+    """
+
+    def __init__(self, *hooks: Union[SpanHook, Callable[[Span], None]]):
+        """Initialize the instrumentation.
+
+        Args:
+            *hooks: SpanHook instances, or callables called with each
+                finished span
+        """
+        self._hooks = [
+            hook if isinstance(hook, SpanHook) else _CallbackHook(hook)
+            for hook in hooks
+        ]
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._hooks)
+
+    def span(self, name: str, **attributes):
+        """Open a span around a block, as the child of the current span.
+
+        Returns:
+            A context manager yielding the Span, or a no-op stand-in when
+            there are no hooks
+        """
+        if not self._hooks:
+            return NULL_SPAN
+        return self._open(name, attributes)
+
+    @contextmanager
+    def _open(self, name: str, attributes: dict) -> Iterator[Span]:
+        span = Span(name, attributes, parent=_current_span.get())
+        token = _current_span.set(span)
+        self._notify("on_start", span)
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.error = e
+            raise
+        finally:
+            span.duration = time.perf_counter() - started
+            _current_span.reset(token)
+            self._notify("on_end", span)
+
+    def current_span(self) -> Union[Span, _NullSpan]:
+        """The innermost open span, which requests report to."""
+        if not self._hooks:
+            return NULL_SPAN
+        return _current_span.get() or NULL_SPAN
+
+    def bind(self, func: Callable) -> Callable:
+        """Make func open its spans under the current span in another thread.
+
+        Threads do not inherit the current span, so functions submitted to
+        a thread pool are bound first.
+        """
+        if not self._hooks:
+            return func
+        parent = _current_span.get()
+
+        def bound(*args, **kwargs):
+            token = _current_span.set(parent)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _current_span.reset(token)
+
+        return bound
+
+    def _notify(self, method: str, span: Span) -> None:
+        for hook in self._hooks:
+            try:
+                getattr(hook, method)(span)
+            except Exception as e:
+                # A broken hook must not fail the operation it observes
+                warnings.warn(
+                    f"Instrumentation hook {hook!r} failed: {e}", RuntimeWarning
+                )
+
+
+NO_INSTRUMENTATION = Instrumentation()
@@ -0,0 +1,313 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from typing import BinaryIO, Callable, Iterator, Optional, Union
+
+DEFAULT_PUSH_JOURNAL_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "chakra", "journal"
+)
+# Jobs left unfinished this long are considered abandoned
+DEFAULT_JOB_MAX_AGE = 7 * 24 * 3600.0
+
+_COPY_BUFFER_SIZE = 1024 * 1024
+
+
+def file_checksum(file: BinaryIO) -> str:
+    """SHA-256 of a file's content, read from its start."""
+    file.seek(0)
+    digest = hashlib.sha256()
+    for block in iter(lambda: file.read(_COPY_BUFFER_SIZE), b""):
+        digest.update(block)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+class PushJob:
+    """Progress of a journaled push, saved to disk after every stage.
+
+    Each part is tracked by its staged file name with the path and checksum
+    of its encoded copy, its staged key, and whether it was uploaded,
+    imported and cleaned up.
+
+    Attributes:
+        job_id: Identifier given to `Chakra.push`
+        table_name: The fully qualified table pushed to
+        chunk_size: Rows per part, which must stay the same across runs
+        upload_id: Part of the staged file names, kept across runs
+        encoded: Whether every part of the data was encoded
+        done: Whether every part was imported
+        parts: State of each part, by staged file name
+        updated_at: When the job last made progress, in seconds since the epoch
+    """
+
+    def __init__(self, journal: "PushJournal", state: dict):
+        self.job_id: str = state["job_id"]
+        self.table_name: str = state["table_name"]
+        self.chunk_size: Optional[int] = state.get("chunk_size")
+        self.upload_id: str = state["upload_id"]
+        self.encoded: bool = state.get("encoded", False)
+        self.done: bool = state.get("done", False)
+        self.parts: dict[str, dict] = state.get("parts", {})
+        self.updated_at: float = state.get("updated_at", time.time())
+        self._journal = journal
+        self._lock = threading.Lock()
+
+    @property
+    def directory(self) -> str:
+        """Where the encoded parts of the job are kept until they are imported."""
+        return self._journal.job_directory(self.job_id)
+
+    @property
+    def import_started(self) -> bool:
+        """Whether a part may already have been imported into the table."""
+        return any(part.get("importing") for part in self.parts.values())
+
+    def part(self, filename: str) -> Optional[dict]:
+        with self._lock:
+            part = self.parts.get(filename)
+            return dict(part) if part is not None else None
+
+    def update(self, filename: str, **fields) -> None:
+        """Record the progress of a part and save the journal."""
+        with self._lock:
+            self.parts.setdefault(filename, {}).update(fields)
+            self._save()
+
+    def update_key(self, key: str, **fields) -> None:
+        """Record the progress of the part staged under key."""
+        with self._lock:
+            for part in self.parts.values():
+                if part.get("key") == key:
+                    part.update(fields)
+            self._save()
+
+    def finish_encoding(self) -> None:
+        with self._lock:
+            self.encoded = True
+            self._save()
+
+    def finish(self) -> None:
+        """Mark the job as done and delete its encoded parts."""
+        with self._lock:
+            self.done = True
+            for part in self.parts.values():
+                part.pop("path", None)
+            self._save()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def keep_part(self, filename: str, file: BinaryIO) -> None:
+        """Copy an encoded part into the journal and record its checksum."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, filename)
+        digest = hashlib.sha256()
+        file.seek(0)
+        with open(f"{path}.tmp", "wb") as copy:
+            for block in iter(lambda: file.read(_COPY_BUFFER_SIZE), b""):
+                digest.update(block)
+                copy.write(block)
+        file.seek(0)
+        os.replace(f"{path}.tmp", path)
+        self.update(filename, path=path, checksum=digest.hexdigest())
+
+    def open_part(self, filename: str) -> Optional[BinaryIO]:
+        """The encoded copy of a part, or None if it is missing or corrupt."""
+        part = self.part(filename) or {}
+        try:
+            file = open(part["path"], "rb")
+        except (KeyError, TypeError, OSError):
+            return None
+        if file_checksum(file) != part.get("checksum"):
+            file.close()
+            return None
+        return file
+
+    def staged_keys(self) -> list[str]:
+        """Keys of the staged files that were not deleted yet."""
+        with self._lock:
+            return [
+                part["key"]
+                for part in self.parts.values()
+                if part.get("key") and not part.get("cleaned_up")
+            ]
+
+    def resumable_keys(self) -> list[str]:
+        """Keys of the files fully uploaded but not imported yet."""
+        with self._lock:
+            return [
+                part["key"]
+                for part in self.parts.values()
+                if part.get("key")
+                and part.get("uploaded")
+                and not part.get("imported")
+                and not part.get("cleaned_up")
+            ]
+
+    def orphaned_keys(self) -> list[str]:
+        """Keys of staged files of no further use: partial uploads and imported files."""
+        resumable = set(self.resumable_keys())
+        return [key for key in self.staged_keys() if key not in resumable]
+
+    def encoded_parts(self, encode: Callable[[], Iterator[tuple]]) -> Iterator[tuple]:
+        """The encoded parts of the job, read back from the journal when possible.
+
+        Parts are only read back once every part was encoded by an earlier
+        run, and each copy is checked against its checksum. Otherwise parts
+        are encoded again from the data, which splits it the same way.
+
+        Args:
+            encode: Returns the (file, size in bytes, rows, in-memory size)
+                of each part encoded from the data, see
+                `sources.write_parquet_parts`
+
+        Yields:
+            (file, size in bytes, rows, in-memory size, whether the file is
+            already kept in the journal) for each part in order. The file is
+            None for parts already uploaded or imported
+        """
+        with self._lock:
+            recorded = sorted(self.parts.items(), key=lambda item: item[1]["number"])
+        if not self.encoded:
+            recorded = []
+        for index, (filename, part) in enumerate(recorded):
+            sizes = part["size"], part["rows"], part["raw_bytes"]
+            if part.get("imported") or (
+                part.get("uploaded") and not part.get("cleaned_up")
+            ):
+                yield (None, *sizes, True)
+                continue
+            file = self.open_part(filename)
+            if file is None:
+                # Encode the data again, skipping the parts already yielded
+                parts = encode()
+                for _ in range(index):
+                    next(parts)[0].close()
+                for part in parts:
+                    yield (*part, False)
+                return
+            yield (file, *sizes, True)
+        if not recorded:
+            for part in encode():
+                yield (*part, False)
+
+    def _state(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "table_name": self.table_name,
+            "chunk_size": self.chunk_size,
+            "upload_id": self.upload_id,
+            "encoded": self.encoded,
+            "done": self.done,
+            "parts": self.parts,
+            "updated_at": self.updated_at,
+        }
+
+    def _save(self) -> None:
+        self.updated_at = time.time()
+        self._journal.save(self._state())
+
+
+class PushJournal:
+    """Local checkpoints of pushes, so that a push interrupted part way resumes.
+
+    Pushes given a job id record each stage of each part in a small JSON
+    file: the path and checksum of the encoded part, its staged key, and
+    whether it was uploaded, imported and cleaned up. Running the push again
+    with the same job id skips the parts that were already imported and
+    reuses the staged and encoded ones. Use a separate directory for each
+    account, since job ids are not scoped by account.
+
+    Example:
+        >>> client.push("events", "events.parquet", chunk_size=1_000_000,
+        ...             job_id="events-2024-06-01")
+    """
+
+    def __init__(self, directory: Union[str, os.PathLike] = DEFAULT_PUSH_JOURNAL_PATH):
+        """Initialize the journal.
+
+        Args:
+            directory: Directory holding one file per job, and the encoded
+                parts of unfinished jobs
+        """
+        self.directory = os.fspath(directory)
+
+    def path(self, job_id: str) -> str:
+        """The file recording the progress of a job."""
+        return os.path.join(self.directory, f"{self._file_name(job_id)}.json")
+
+    def job_directory(self, job_id: str) -> str:
+        """The directory holding the encoded parts of a job."""
+        return os.path.join(self.directory, self._file_name(job_id))
+
+    def open(self, job_id: str, table_name: str, chunk_size: Optional[int]) -> PushJob:
+        """The recorded progress of a job, or a new job if there is none.
+
+        Raises:
+            ValueError: If the job id was used for a different push
+        """
+        job = self.load(job_id)
+        if job is None:
+            return PushJob(
+                self,
+                {
+                    "job_id": job_id,
+                    "table_name": table_name,
+                    "chunk_size": chunk_size,
+                    "upload_id": str(uuid.uuid4()),
+                },
+            )
+        if (job.table_name, job.chunk_size) != (table_name, chunk_size):
+            raise ValueError(
+                f"Job {job_id} pushed to {job.table_name} with chunk_size "
+                f"{job.chunk_size}, it cannot be resumed with different ones"
+            )
+        return job
+
+    def load(self, job_id: str) -> Optional[PushJob]:
+        try:
+            with open(self.path(job_id)) as file:
+                state = json.load(file)
+        except (OSError, ValueError):
+            return None
+        return PushJob(self, state) if isinstance(state, dict) else None
+
+    def jobs(self) -> list[PushJob]:
+        """Every job in the journal, finished or not."""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        jobs = []
+        for name in sorted(names):
+            if name.endswith(".json"):
+                try:
+                    with open(os.path.join(self.directory, name)) as file:
+                        jobs.append(PushJob(self, json.load(file)))
+                except (OSError, ValueError, KeyError, TypeError):
+                    pass
+        return jobs
+
+    def save(self, state: dict) -> None:
+        """Replace the record of a job atomically."""
+        path = self.path(state["job_id"])
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(state, file)
+        os.replace(tmp_path, path)
+
+    def forget(self, job_id: str) -> None:
+        """Drop a job and its encoded parts, so that it starts over if run again."""
+        try:
+            os.remove(self.path(job_id))
+        except FileNotFoundError:
+            pass
+        shutil.rmtree(self.job_directory(job_id), ignore_errors=True)
+
+    @staticmethod
+    def _file_name(job_id: str) -> str:
+        return re.sub(r"[^\w.-]", "_", job_id)
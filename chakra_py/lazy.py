@@ -0,0 +1,27 @@
+import importlib
+import sys
+import types
+
+
+class LazyModule(types.ModuleType):
+    """Stands in for a module until one of its attributes is first used.
+
+    Attributes are copied over as they are looked up, so only the first
+    access to each one goes through the import machinery.
+    """
+
+    def __getattr__(self, attr: str):
+        value = getattr(importlib.import_module(self.__name__), attr)
+        setattr(self, attr, value)
+        return value
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """The module with the given absolute name, imported when first used.
+
+    Heavy dependencies such as pandas and pyarrow take most of a second to
+    import, so the clients only load them once data is actually pushed or a
+    result is built, keeping imports and logins fast in short-lived processes.
+    """
+    module = sys.modules.get(name)
+    return module if module is not None else LazyModule(name)
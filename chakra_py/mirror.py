@@ -0,0 +1,338 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterator, Optional, Union
+
+from .lazy import lazy_import
+
+pd = lazy_import("pandas")
+pa = lazy_import("pyarrow")
+
+# Unqualified table names resolve to this database and schema on the server
+DEFAULT_DATABASE = "duckdb"
+DEFAULT_SCHEMA = "main"
+
+MirrorData = Union["pd.DataFrame", "pa.Table"]
+
+
+@dataclass
+class MirroredTable:
+    """A table copied into a LocalMirror.
+
+    Attributes:
+        table_name: Fully qualified name of the table on the server
+        rows: Number of rows copied
+        mirrored_at: When the copy was made, in seconds since the epoch
+        query: The query fetching the table again on refresh
+    """
+
+    table_name: str
+    rows: int
+    mirrored_at: float
+    query: str
+
+    @property
+    def age(self) -> float:
+        """Seconds since the table was copied."""
+        return time.time() - self.mirrored_at
+
+
+def _import_duckdb():
+    try:
+        import duckdb
+    except ImportError as e:
+        raise ImportError(
+            'LocalMirror requires duckdb, install it with: pip install "chakra-py[local]"'
+        ) from e
+    return duckdb
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _quote_table(table_name: str) -> str:
+    return ".".join(_quote(part) for part in table_name.split("."))
+
+
+def _iter_nodes(node) -> Iterator[dict]:
+    """Every dict in a parsed statement, depth first."""
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            yield node
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+
+
+class LocalMirror:
+    """Embedded DuckDB copy of tables, answering follow-up queries locally.
+
+    Chakra is backed by DuckDB, so a query only reading tables that were
+    copied locally returns the same result without a round trip. Tables are
+    copied explicitly with `Chakra.mirror_table`, and pushes keep them up to
+    date: a push replacing a table copies the pushed data, a push appending
+    to a copied table appends it locally too, and other writes through the
+    client drop the copy.
+
+    Copies older than max_age seconds are stale: queries reading them go to
+    the server until `Chakra.refresh_mirror` fetches them again.
+
+    Requires the `local` extra (`pip install "chakra-py[local]"`).
+
+    Example:
+        >>> client = Chakra("DB_SESSION_KEY", mirror=LocalMirror(max_age=600))
+        >>> client.mirror_table("events")
+        >>> client.execute("SELECT kind, COUNT(*) FROM events GROUP BY kind")  # local
+    """
+
+    def __init__(
+        self, max_age: Optional[float] = None, memory_limit: Optional[str] = None
+    ):
+        """Initialize the mirror with an empty in-memory database.
+
+        Args:
+            max_age: Seconds after which copied tables are considered stale,
+                None to keep them until they are refreshed or written to
+            memory_limit: Optional DuckDB memory limit of the mirror, e.g. "2GB"
+        """
+        duckdb = _import_duckdb()
+        self._error_types = (duckdb.Error,)
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._tables: dict[str, MirroredTable] = {}
+        self._databases = {"memory"}
+        self._lock = threading.RLock()
+        config = {"memory_limit": memory_limit} if memory_limit else {}
+        self._connection = duckdb.connect(":memory:", config=config)
+        # Resolve unqualified names like the server does
+        self._create_schema(DEFAULT_DATABASE, DEFAULT_SCHEMA)
+        self._connection.execute(
+            f"USE {_quote(DEFAULT_DATABASE)}.{_quote(DEFAULT_SCHEMA)}"
+        )
+
+    @property
+    def stats(self) -> dict:
+        """Queries answered locally or not, and the tables copied."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "tables": len(self._tables),
+                "rows": sum(table.rows for table in self._tables.values()),
+            }
+
+    def tables(self) -> dict[str, MirroredTable]:
+        """The copied tables, fresh or stale, by lowercase fully qualified name."""
+        with self._lock:
+            return dict(self._tables)
+
+    def is_fresh(self, mirrored: MirroredTable) -> bool:
+        """Whether a copy is recent enough to answer queries."""
+        return self.max_age is None or mirrored.age <= self.max_age
+
+    def register(
+        self, table_name: str, data: MirrorData, query: Optional[str] = None
+    ) -> MirroredTable:
+        """Copy the full content of a table, replacing any earlier copy.
+
+        Args:
+            table_name: Fully qualified (database.schema.table) table name
+            data: Every row of the table
+            query: The query fetching the table again on refresh, by default
+                selecting all of its rows
+        """
+        table = self._to_table(data)
+        database, schema, _ = table_name.split(".")
+        with self._lock:
+            self._create_schema(database, schema)
+            self._connection.register("__chakra_mirror_data", table)
+            try:
+                self._connection.execute(
+                    f"CREATE OR REPLACE TABLE {_quote_table(table_name)} AS "
+                    "SELECT * FROM __chakra_mirror_data"
+                )
+            finally:
+                self._connection.unregister("__chakra_mirror_data")
+            mirrored = MirroredTable(
+                table_name,
+                table.num_rows,
+                time.time(),
+                query or f"SELECT * FROM {table_name}",
+            )
+            self._tables[table_name.lower()] = mirrored
+        return mirrored
+
+    def append(self, table_name: str, data: MirrorData) -> bool:
+        """Append rows to the copy of a table, if there is one.
+
+        A copy the rows cannot be appended to is dropped.
+
+        Returns:
+            Whether the rows were appended
+        """
+        table = self._to_table(data)
+        with self._lock:
+            mirrored = self._tables.get(table_name.lower())
+            if mirrored is None:
+                return False
+            self._connection.register("__chakra_mirror_data", table)
+            try:
+                self._connection.execute(
+                    f"INSERT INTO {_quote_table(table_name)} BY NAME "
+                    "SELECT * FROM __chakra_mirror_data"
+                )
+            except self._error_types:
+                self.invalidate(table_name)
+                return False
+            finally:
+                self._connection.unregister("__chakra_mirror_data")
+            mirrored.rows += table.num_rows
+        return True
+
+    def record_push(
+        self, table_name: str, data, replaced: bool, deduplicated: bool
+    ) -> None:
+        """Bring the copy of a table up to date with a successful push.
+
+        Args:
+            table_name: Fully qualified name of the table pushed to
+            data: The data pushed
+            replaced: Whether the push replaced the table
+            deduplicated: Whether the server skipped rows it already had
+        """
+        in_memory = isinstance(data, (pd.DataFrame, pa.Table))
+        if in_memory and replaced:
+            self.register(table_name, data)
+        elif not in_memory or deduplicated or not self.append(table_name, data):
+            self.invalidate(table_name)
+
+    def invalidate(self, table_name: str) -> bool:
+        """Drop the copy of a table, given by simple or qualified name.
+
+        Returns:
+            Whether a copy was dropped
+        """
+        with self._lock:
+            dropped = False
+            for qualified in self._candidates(table_name.replace('"', "").split(".")):
+                if self._tables.pop(qualified.lower(), None) is not None:
+                    self._connection.execute(
+                        f"DROP TABLE IF EXISTS {_quote_table(qualified)}"
+                    )
+                    dropped = True
+            return dropped
+
+    def clear(self) -> None:
+        """Drop every copy."""
+        with self._lock:
+            for mirrored in list(self._tables.values()):
+                self.invalidate(mirrored.table_name)
+
+    def execute(self, query: str, parameters: list = []) -> Optional[pa.Table]:
+        """Run a query locally if it only reads fresh copies.
+
+        Args:
+            query: The SQL query, with $1, $2, ... or ? parameters
+            parameters: Positional parameters of the query
+
+        Returns:
+            The result, or None if the query has to run on the server
+        """
+        with self._lock:
+            if not self.covers(query):
+                self.misses += 1
+                return None
+            try:
+                cursor = self._connection.execute(query, parameters)
+                # fetch_arrow_table is deprecated in recent DuckDB releases
+                fetch = (
+                    getattr(cursor, "to_arrow_table", None) or cursor.fetch_arrow_table
+                )
+                result = fetch()
+            except self._error_types:
+                # Let the server answer, or report the error in its own words
+                self.misses += 1
+                return None
+            self.hits += 1
+            return result
+
+    def covers(self, query: str) -> bool:
+        """Whether a query is a SELECT reading only fresh copies.
+
+        Queries calling table functions, which may read files or remote
+        data, are never answered locally.
+        """
+        with self._lock:
+            try:
+                parsed = json.loads(
+                    self._connection.execute(
+                        "SELECT json_serialize_sql(?)", [query]
+                    ).fetchone()[0]
+                )
+            except self._error_types:
+                return False
+            if parsed.get("error") or len(parsed.get("statements", [])) != 1:
+                return False
+
+            ctes, tables = set(), []
+            for node in _iter_nodes(parsed["statements"]):
+                if node.get("type") == "TABLE_FUNCTION":
+                    return False
+                if node.get("type") == "BASE_TABLE":
+                    tables.append(node)
+                for entry in (node.get("cte_map") or {}).get("map", []):
+                    ctes.add(entry["key"].lower())
+
+            referenced = [
+                [node["catalog_name"], node["schema_name"], node["table_name"]]
+                for node in tables
+                if node["catalog_name"]
+                or node["schema_name"]
+                or node["table_name"].lower() not in ctes
+            ]
+            return bool(referenced) and all(
+                any(
+                    qualified.lower() in self._tables
+                    and self.is_fresh(self._tables[qualified.lower()])
+                    for qualified in self._candidates(parts)
+                )
+                for parts in referenced
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def _candidates(self, parts: list[str]) -> list[str]:
+        """Fully qualified names a table reference may resolve to."""
+        parts = [part for part in parts if part]
+        if len(parts) == 3:
+            return [".".join(parts)]
+        if len(parts) == 2:
+            # Either schema.table in the default database or database.table
+            return [
+                f"{DEFAULT_DATABASE}.{parts[0]}.{parts[1]}",
+                f"{parts[0]}.{DEFAULT_SCHEMA}.{parts[1]}",
+            ]
+        return [f"{DEFAULT_DATABASE}.{DEFAULT_SCHEMA}.{parts[0]}"]
+
+    def _create_schema(self, database: str, schema: str) -> None:
+        if database.lower() not in self._databases:
+            self._connection.execute(f"ATTACH ':memory:' AS {_quote(database)}")
+            self._databases.add(database.lower())
+        self._connection.execute(
+            f"CREATE SCHEMA IF NOT EXISTS {_quote(database)}.{_quote(schema)}"
+        )
+
+    @staticmethod
+    def _to_table(data: MirrorData) -> pa.Table:
+        if isinstance(data, pd.DataFrame):
+            return pa.Table.from_pandas(data, preserve_index=False)
+        return data
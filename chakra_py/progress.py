@@ -0,0 +1,44 @@
+from typing import Optional
+
+
+class NullProgress:
+    """Progress bar used in quiet mode, doing nothing without importing tqdm.
+
+    Supports the subset of the tqdm interface used by the clients.
+    """
+
+    def __init__(self, total: Optional[float] = None, **kwargs):
+        self.total = total
+        self.n = 0
+
+    def __enter__(self) -> "NullProgress":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+    def update(self, n: float = 1) -> None:
+        pass
+
+    def set_description(self, desc: Optional[str] = None) -> None:
+        pass
+
+    def refresh(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+def progress_bar(quiet: bool, **kwargs):
+    """A tqdm progress bar, or a NullProgress in quiet mode.
+
+    Args:
+        quiet: Whether the client is quiet, in which case no bar is built
+        **kwargs: Passed on to tqdm
+    """
+    if quiet:
+        return NullProgress(**kwargs)
+    from tqdm import tqdm
+
+    return tqdm(**kwargs)
@@ -0,0 +1,329 @@
+"""Request building and response handling shared by Chakra and AsyncChakra.
+
+Everything here is independent of the HTTP library, so both clients send the
+same requests and surface failures the same way.
+"""
+
+import base64
+import functools
+import json
+import re
+import time
+from datetime import datetime
+from typing import NoReturn, Optional, Sequence
+
+from .exceptions import ChakraAPIError
+from .results import ARROW_STREAM_MEDIA_TYPE
+
+BASE_URL = "https://api.chakra.dev".rstrip("/")
+TOKEN_PREFIX = "DDB_"
+
+TOKEN_URL = f"{BASE_URL}/api/v1/servers"
+DATABASES_URL = f"{BASE_URL}/api/v1/databases"
+QUERY_URL = f"{BASE_URL}/api/v1/query"
+PRESIGNED_UPLOAD_URL = f"{BASE_URL}/api/v1/presigned-upload"
+IMPORT_URL = f"{BASE_URL}/api/v1/tables/s3_parquet_import"
+DEDUPE_IMPORT_URL = f"{BASE_URL}/api/v1/tables/s3_parquet_import_append_only_dedupe"
+FILES_URL = f"{BASE_URL}/api/v1/files"
+
+PARQUET_HEADERS = {"Content-Type": "application/parquet"}
+
+# Times a request rejected with a 401 is sent, logging in again before each resend
+MAX_LOGIN_ATTEMPTS = 3
+
+_READ_ONLY_QUERY = re.compile(
+    r"^\s*\(*\s*(select|with|from|values|table)\b", re.IGNORECASE
+)
+# Statements that common table expressions may precede
+_WRITE_KEYWORD = re.compile(
+    r"\b(?:insert|update|delete|merge|create|drop|alter|truncate|copy)\b",
+    re.IGNORECASE,
+)
+_QUOTED = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"")
+
+
+def qualify_table_name(table_name: str) -> str:
+    """Validate a table name and qualify it with the default database and schema."""
+    if table_name.count(".") != 0 and table_name.count(".") != 2:
+        raise ValueError(
+            "Table name must be either a simple table name (e.g., 'my_table') or fully qualified with database and schema (e.g., 'my_database.my_schema.my_table')"
+        )
+
+    if table_name.count(".") == 0:
+        table_name = f"duckdb.main.{table_name}"
+    return table_name
+
+
+def token_payload(db_session_key: str) -> dict:
+    """Build the body of the token request from a DB session key."""
+    access_key_id, secret_access_key, username = db_session_key.split(":")
+    return {
+        "accessKey": access_key_id,
+        "secretKey": secret_access_key,
+        "username": username,
+    }
+
+
+def check_token(token: str) -> None:
+    if not token.startswith(TOKEN_PREFIX):
+        raise ValueError(f"Token must start with '{TOKEN_PREFIX}'")
+
+
+def token_expiry(body: dict, token: str) -> Optional[float]:
+    """When a token expires, as a Unix timestamp, if it can be told.
+
+    The expiry is read from the token response ("expiresAt" or "expiresIn")
+    or from the "exp" claim when the token wraps a JWT.
+
+    Args:
+        body: The decoded body of the token response
+        token: The token it contains
+    """
+    expires_in = body.get("expiresIn", body.get("expires_in"))
+    if isinstance(expires_in, (int, float)):
+        return time.time() + expires_in
+
+    expires_at = body.get("expiresAt", body.get("expires_at"))
+    if isinstance(expires_at, (int, float)):
+        # Accept both seconds and milliseconds since the epoch
+        return expires_at / 1000 if expires_at > 1e11 else float(expires_at)
+    if isinstance(expires_at, str):
+        try:
+            return datetime.fromisoformat(expires_at.replace("Z", "+00:00")).timestamp()
+        except ValueError:
+            pass
+
+    parts = token[len(TOKEN_PREFIX) :].split(".")
+    if len(parts) == 3:
+        try:
+            payload = base64.urlsafe_b64decode(parts[1] + "=" * (-len(parts[1]) % 4))
+            exp = json.loads(payload).get("exp")
+        except (ValueError, AttributeError):
+            return None
+        if isinstance(exp, (int, float)):
+            return float(exp)
+    return None
+
+
+def create_database_payload(table_name: str) -> dict:
+    database_name = table_name.split(".")[0]
+    return {"name": database_name, "insert_database": True}
+
+
+def create_schema_sql(table_name: str) -> str:
+    [database_name, schema_name, _] = table_name.split(".")
+    return f"CREATE SCHEMA IF NOT EXISTS {database_name}.{schema_name}"
+
+
+def create_table_sql(table_name: str, columns: dict[str, str]) -> str:
+    """Build a CREATE TABLE statement from column name -> DuckDB type."""
+    create_sql = f"CREATE TABLE IF NOT EXISTS {table_name} ("
+    create_sql += ", ".join(f"{name} {type_}" for name, type_ in columns.items())
+    create_sql += ")"
+    return create_sql
+
+
+def drop_table_sql(table_name: str) -> str:
+    return f"DROP TABLE IF EXISTS {table_name}"
+
+
+def table_columns_payload(table_name: str) -> dict:
+    """Build a query for the column names and DuckDB types of a table."""
+    return query_payload(
+        "SELECT column_name, data_type FROM information_schema.columns "
+        "WHERE table_catalog = ? AND table_schema = ? AND table_name = ? "
+        "ORDER BY ordinal_position",
+        table_name.split("."),
+    )
+
+
+def table_columns(data: dict) -> dict[str, str]:
+    """Column name -> DuckDB type from the answer to `table_columns_payload`."""
+    return {name: type_ for name, type_ in data["rows"]}
+
+
+def staged_filename(
+    table_name: str, upload_id: str, part_number: int, chunked: bool
+) -> str:
+    """Name of a staged parquet file, unique per upload and part."""
+    suffix = f"_part{part_number:05d}" if chunked else ""
+    return f"{table_name}_{upload_id}{suffix}.parquet"
+
+
+def presigned_upload_url(file_name: str) -> str:
+    return f"{PRESIGNED_UPLOAD_URL}?filename={file_name}"
+
+
+def import_request(
+    table_name: str,
+    s3_key: str,
+    dedupe_on_append: bool = False,
+    primary_key_columns: list[str] = [],
+) -> tuple[str, dict]:
+    """Build the URL and body importing a staged file into a table."""
+    if dedupe_on_append:
+        return DEDUPE_IMPORT_URL, {
+            "table_name": table_name,
+            "s3_key": s3_key,
+            "primary_key_columns": primary_key_columns,
+        }
+    return IMPORT_URL, {"table_name": table_name, "s3_key": s3_key}
+
+
+def delete_file_payload(s3_key: str) -> dict:
+    return {"fileName": s3_key}
+
+
+# Literals, quoted identifiers and comments are matched whole so that `$` and
+# `?` inside them are not taken for placeholders
+_SQL_PLACEHOLDER = re.compile(
+    r"""
+    '(?:[^']|'')*'?
+    | "(?:[^"]|"")*"?
+    | --[^\n]*
+    | /\*.*?(?:\*/|$)
+    | \$(?P<tag>(?:[A-Za-z_]\w*)?)\$.*?(?:\$(?P=tag)\$|$)
+    | \$(?P<position>\d+)
+    | (?P<anonymous>\?)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+
+@functools.lru_cache(maxsize=1024)
+def rewrite_placeholders(query: str) -> tuple[str, Optional[tuple[int, ...]]]:
+    """Rewrite $1, $2, ... placeholders into the `?` placeholders the API binds.
+
+    Positional parameters may be repeated and referenced in any order, so the
+    rewrite also tells which parameter each `?` binds. Rewrites are cached, as
+    the same queries tend to be sent over and over with different parameters.
+
+    Returns:
+        The rewritten query and the 0-based index of the parameter bound by
+        each `?`, or None if the query has no $N placeholders and its
+        parameters are sent as they are
+
+    Raises:
+        ValueError: If the query mixes $N and ? placeholders or references $0
+    """
+    pieces, order = [], []
+    has_anonymous = False
+    last = 0
+    for match in _SQL_PLACEHOLDER.finditer(query):
+        if match.group("anonymous"):
+            has_anonymous = True
+        elif match.group("position") is not None:
+            position = int(match.group("position"))
+            if position == 0:
+                raise ValueError("Positional parameters are numbered from $1")
+            pieces.extend((query[last : match.start()], "?"))
+            order.append(position - 1)
+            last = match.end()
+
+    if not order:
+        return query, None
+    if has_anonymous:
+        raise ValueError("A query cannot mix $N and ? placeholders")
+    pieces.append(query[last:])
+    return "".join(pieces), tuple(order)
+
+
+def bind_parameters(order: Optional[tuple[int, ...]], parameters: Sequence) -> list:
+    """Arrange parameters in the order of the placeholders of a rewritten query.
+
+    Args:
+        order: The parameter indices returned by `rewrite_placeholders`
+        parameters: The positional parameters, $1 first
+    """
+    if order is None:
+        return list(parameters)
+    if order and max(order) >= len(parameters):
+        raise ValueError(
+            f"Query references ${max(order) + 1} but only {len(parameters)} "
+            "parameters were given"
+        )
+    return [parameters[index] for index in order]
+
+
+def is_read_only_query(query: str) -> bool:
+    """Whether a query only reads data, so that sending it twice is harmless.
+
+    Queries starting with WITH only count if no write keyword follows
+    outside of quoted text, since the CTEs may precede an INSERT, UPDATE or
+    DELETE.
+    """
+    match = _READ_ONLY_QUERY.match(query)
+    if match is None:
+        return False
+    if match.group(1).lower() != "with":
+        return True
+    return not _WRITE_KEYWORD.search(_QUOTED.sub("''", query))
+
+
+def query_payload(query: str, parameters: list) -> dict:
+    """Build the body of a query request, rewriting positional parameters."""
+    sql, order = rewrite_placeholders(query)
+    return {"sql": sql, "parameters": bind_parameters(order, parameters)}
+
+
+def query_headers(use_arrow: bool) -> Optional[dict]:
+    """Headers asking the server to answer in a columnar format if it can."""
+    if not use_arrow:
+        return None
+    return {"Accept": f"{ARROW_STREAM_MEDIA_TYPE}, application/json"}
+
+
+def validate_result_options(return_type: str, dtype_backend: Optional[str]) -> None:
+    if return_type not in ("pandas", "arrow"):
+        raise ValueError("return_type must be either 'pandas' or 'arrow'")
+    if dtype_backend not in (None, "pyarrow"):
+        raise ValueError("dtype_backend must be either None or 'pyarrow'")
+
+
+def status_code_of(e: Exception) -> Optional[int]:
+    """The HTTP status code of a failed request, if it got a response."""
+    status_code = getattr(getattr(e, "response", None), "status_code", None)
+    return status_code if isinstance(status_code, int) else None
+
+
+def is_unauthorized(e: Exception) -> bool:
+    """Whether a failed request was rejected because of a stale token."""
+    return status_code_of(e) == 401
+
+
+def is_retryable_status(status_code: Optional[int]) -> bool:
+    """Whether a response status is worth retrying (429s and 5xxs)."""
+    return isinstance(status_code, int) and (status_code == 429 or status_code >= 500)
+
+
+def to_api_error(e: Exception) -> Exception:
+    """Convert a failed request into a ChakraAPIError carrying the API's message.
+
+    Exceptions that are not API errors are returned unchanged.
+    """
+    if isinstance(e, ChakraAPIError):
+        return e
+    if hasattr(e, "response") and hasattr(e.response, "json"):
+        try:
+            error_msg = e.response.json().get("error", str(e))
+        except ValueError:  # JSON decoding failed
+            error_msg = str(e)
+        error = ChakraAPIError(error_msg, e.response)
+        error.__cause__ = e
+        return error
+    return e
+
+
+def raise_api_error(e: Exception) -> NoReturn:
+    """Handle API errors consistently.
+
+    Args:
+        e: The original exception
+
+    Raises:
+        ChakraAPIError: Enhanced error with API response details
+    """
+    error = to_api_error(e)
+    if error is e:
+        raise e  # Re-raise original exception if not an API error
+    raise error from e
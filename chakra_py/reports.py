@@ -0,0 +1,114 @@
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
+
+from .encoding import ParquetOptions
+
+
+class StageTimer:
+    """Accumulate the time spent in each stage of an operation across threads."""
+
+    def __init__(self):
+        self.timings: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.timings[name] = self.timings.get(name, 0.0) + elapsed
+
+
+@dataclass
+class PushResult:
+    """Summary of a push, returned by `Chakra.push`.
+
+    Stages run concurrently, so their timings overlap: each one is the time
+    spent in that stage summed over all parts, while "total" is the wall
+    clock time of the whole push.
+
+    Attributes:
+        table_name: The fully qualified table the data was pushed to
+        method: "insert" or "parquet", see `Chakra.push`
+        rows: Number of rows pushed
+        parts: Number of INSERT batches or parquet parts sent
+        bytes_sent: Size of the request bodies or parquet parts sent
+        raw_bytes: In-memory Arrow size of the rows before they were encoded
+        timings: Seconds spent per stage: "ddl", "encode", "presign",
+            "upload", "insert", "import", "cleanup" and "total"
+        parquet_options: The encoding settings used for parquet pushes
+        resumed_parts: Parts an earlier run of the same job already imported,
+            which were skipped. Their rows are counted in rows
+    """
+
+    table_name: str
+    method: str
+    rows: int = 0
+    parts: int = 0
+    bytes_sent: int = 0
+    raw_bytes: int = 0
+    timings: dict[str, float] = field(default_factory=dict)
+    parquet_options: Optional[ParquetOptions] = None
+    resumed_parts: int = 0
+
+    @property
+    def compression_ratio(self) -> Optional[float]:
+        """How many times smaller the data sent is than the rows in memory."""
+        return self.raw_bytes / self.bytes_sent if self.bytes_sent else None
+
+    @property
+    def encode_throughput(self) -> Optional[float]:
+        """Bytes of rows encoded per second spent encoding."""
+        seconds = self.timings.get("encode")
+        return self.raw_bytes / seconds if seconds else None
+
+
+@dataclass
+class SyncResult:
+    """Summary of a sync, returned by `Chakra.sync`.
+
+    Attributes:
+        table_name: The fully qualified table that was synced
+        inserted: Number of rows that were not in the table
+        updated: Number of rows whose values changed
+        deleted: Number of rows deleted from the table
+        unchanged: Number of rows that were not sent
+        bytes_sent: Size of the changes pushed to staging tables
+        timings: Seconds spent per stage: "diff" against the index, "push"
+            of the changes, "apply" to the table and "total"
+    """
+
+    table_name: str
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+    bytes_sent: int = 0
+    timings: dict[str, float] = field(default_factory=dict)
+
+
+@dataclass
+class MemoryReport:
+    """Memory taken by a query result, returned by `memory_report`.
+
+    Attributes:
+        rows: Number of rows of the result
+        total_bytes: Bytes taken by all columns, including the values of
+            object columns
+        columns: Bytes taken by each column
+        dtypes: The dtype or Arrow type of each column
+    """
+
+    rows: int
+    total_bytes: int
+    columns: dict[str, int] = field(default_factory=dict)
+    dtypes: dict[str, str] = field(default_factory=dict)
+
+    def __str__(self) -> str:
+        return f"{self.rows:,} rows, {self.total_bytes / 1024**2:,.1f} MiB in memory"
@@ -0,0 +1,426 @@
+from __future__ import annotations
+
+import codecs
+import json
+from dataclasses import dataclass
+from typing import BinaryIO, Iterable, Iterator, Optional, Union
+
+from .instrumentation import NO_INSTRUMENTATION, Instrumentation
+from .lazy import lazy_import
+from .reports import MemoryReport
+from .typemap import arrow_type
+
+pd = lazy_import("pandas")
+pa = lazy_import("pyarrow")
+pc = lazy_import("pyarrow.compute")
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+STRING_STORAGES = ("python", "pyarrow")
+
+_JSON_DECODER = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+# Signed and unsigned integer types, smallest first
+_INTEGER_LADDERS = (
+    ("int8", "int16", "int32", "int64"),
+    ("uint8", "uint16", "uint32", "uint64"),
+)
+_NULLABLE_INTEGERS = {
+    name: name.replace("u", "U").replace("i", "I", 1)
+    for ladder in _INTEGER_LADDERS
+    for name in ladder
+}
+
+
+@dataclass(frozen=True)
+class ResultOptions:
+    """How query results are typed to take less memory.
+
+    Columns are converted while the result is still an Arrow table, before
+    any DataFrame is built, so the wide intermediate columns are never
+    materialized in pandas.
+
+    Attributes:
+        downcast: Store integer columns in the smallest integer type holding
+            their values, and float64 columns as float32 when it is exact.
+            In NumPy-backed DataFrames, integer columns become nullable
+            integer dtypes, so that nulls do not turn them into float64
+        max_category_ratio: Dictionary-encode string columns with at most
+            this many distinct values per row, e.g. 0.5, into categoricals.
+            None keeps every string column as is
+        string_storage: Store the remaining string columns of NumPy-backed
+            DataFrames as pandas strings backed by "pyarrow" or "python"
+            objects, instead of object columns. Ignored for Arrow results
+    """
+
+    downcast: bool = False
+    max_category_ratio: Optional[float] = None
+    string_storage: Optional[str] = None
+
+    def __post_init__(self):
+        if self.max_category_ratio is not None and not (
+            0 < self.max_category_ratio <= 1
+        ):
+            raise ValueError("max_category_ratio must be between 0 and 1")
+        if self.string_storage not in (None, *STRING_STORAGES):
+            raise ValueError(
+                f"string_storage must be None or one of {', '.join(STRING_STORAGES)}"
+            )
+
+    def apply(self, table: pa.Table) -> pa.Table:
+        """Convert the columns of an Arrow result as configured."""
+        columns = [self._convert(column) for column in table.columns]
+        return pa.Table.from_arrays(
+            columns, names=table.column_names
+        ).replace_schema_metadata(table.schema.metadata)
+
+    def types_mapper(self, type_: pa.DataType):
+        """The pandas dtype of an Arrow column in NumPy-backed DataFrames."""
+        if self.downcast and pa.types.is_integer(type_):
+            return pd.api.types.pandas_dtype(_NULLABLE_INTEGERS[str(type_)])
+        if self.string_storage and (
+            pa.types.is_string(type_) or pa.types.is_large_string(type_)
+        ):
+            return pd.StringDtype(self.string_storage)
+        return None
+
+    def _convert(self, column: pa.ChunkedArray) -> pa.ChunkedArray:
+        type_ = column.type
+        if self.downcast and pa.types.is_integer(type_):
+            return column.cast(_smallest_integer_type(column))
+        if self.downcast and pa.types.is_float64(type_) and _fits_float32(column):
+            return column.cast(pa.float32())
+        if (
+            self.max_category_ratio is None
+            or not (pa.types.is_string(type_) or pa.types.is_large_string(type_))
+            or not len(column)
+        ):
+            return column
+        distinct = pc.count_distinct(column).as_py()
+        if distinct > self.max_category_ratio * len(column):
+            return column
+        # Index with the narrowest integers, which become the pandas codes
+        index_type = next(
+            getattr(pa, name)()
+            for name in _INTEGER_LADDERS[0]
+            if distinct < 2 ** (getattr(pa, name)().bit_width - 1)
+        )
+        return column.dictionary_encode().cast(pa.dictionary(index_type, type_))
+
+
+def decode_arrow_stream(content: bytes) -> pa.Table:
+    """Decode a query result sent in the Arrow IPC streaming format."""
+    return pa.ipc.open_stream(content).read_all()
+
+
+def read_arrow_response(response) -> pa.Table:
+    """Decode a query response into an Arrow table, whichever format it is in."""
+    content_type = response.headers.get("Content-Type", "")
+    if content_type.startswith(ARROW_STREAM_MEDIA_TYPE):
+        return decode_arrow_stream(response.content)
+    return decode_json_result(response.json())
+
+
+def build_result(
+    response,
+    return_type: str,
+    use_arrow: bool,
+    instrumentation: Instrumentation = NO_INSTRUMENTATION,
+    options: Optional[ResultOptions] = None,
+) -> Union[pd.DataFrame, pa.Table]:
+    """Build the result of a query response in the requested return type.
+
+    Decoding the body and building the DataFrame are reported as the
+    "decode" and "build" spans of instrumentation. With options, the build
+    span also reports the memory taken by the result as "memory_bytes".
+    """
+    with instrumentation.span("decode") as span:
+        if use_arrow:
+            data = read_arrow_response(response)
+            span.rows = data.num_rows
+        elif options is not None:
+            data = decode_json_result(response.json())
+            span.rows = data.num_rows
+        else:
+            data = response.json()
+            span.rows = len(data["rows"])
+    if options is None:
+        if use_arrow and return_type == "arrow":
+            return data
+        with instrumentation.span("build"):
+            return arrow_to_pandas(data) if use_arrow else json_result_to_pandas(data)
+    with instrumentation.span("build") as span:
+        result = convert_result(
+            data, return_type, "pyarrow" if use_arrow else None, options
+        )
+        span.set_attribute("memory_bytes", memory_report(result).total_bytes)
+    return result
+
+
+def convert_result(
+    table: pa.Table,
+    return_type: str,
+    dtype_backend: Optional[str],
+    options: Optional[ResultOptions] = None,
+) -> Union[pd.DataFrame, pa.Table]:
+    """Convert an Arrow result into the requested return type.
+
+    Args:
+        table: The result
+        return_type: "pandas" or "arrow"
+        dtype_backend: None or "pyarrow", see `Chakra.execute`
+        options: Optional conversions of the columns, applied first
+    """
+    if options is not None:
+        table = options.apply(table)
+    if return_type == "arrow":
+        return table
+    if dtype_backend == "pyarrow":
+        return arrow_to_pandas(table)
+    return table.to_pandas(types_mapper=options.types_mapper if options else None)
+
+
+def memory_report(result: Union[pd.DataFrame, pa.Table]) -> MemoryReport:
+    """Measure the memory taken by a query result, column by column.
+
+    The values of object columns are counted too, which takes a pass over
+    them.
+    """
+    if isinstance(result, pd.DataFrame):
+        usage = result.memory_usage(deep=True, index=False)
+        columns = {str(name): int(usage[name]) for name in result.columns}
+        dtypes = {str(name): str(dtype) for name, dtype in result.dtypes.items()}
+    else:
+        columns = {
+            name: column.nbytes
+            for name, column in zip(result.column_names, result.columns)
+        }
+        dtypes = {field.name: str(field.type) for field in result.schema}
+    return MemoryReport(len(result), sum(columns.values()), columns, dtypes)
+
+
+def decode_json_result(data: dict) -> pa.Table:
+    """Decode a row-oriented JSON query result into an Arrow table.
+
+    Each column is gathered from the rows and converted by Arrow in native
+    code. Columns are gathered one at a time rather than with zip(*rows),
+    whose large temporary tuples trigger repeated garbage collection passes
+    on big results. Parsing the body itself still takes most of the time,
+    so this is about as fast as building a DataFrame row by row; only Arrow
+    streams avoid that cost.
+
+    Args:
+        data: The decoded response body, with "columns" and "rows" keys and
+            optionally the DuckDB type of each column under "types"
+
+    Returns:
+        The result as an Arrow table
+    """
+    return pa.Table.from_batches(
+        [decode_json_rows(data["columns"], data["rows"], data.get("types"))]
+    )
+
+
+def json_result_to_pandas(data: dict) -> pd.DataFrame:
+    """Build a DataFrame from a row-oriented JSON query result.
+
+    When the response reports the DuckDB type of each column, values are
+    decoded into the matching compact dtypes, such as int8 for TINYINT or
+    categoricals for ENUMs, rather than inferred.
+    """
+    if data.get("types"):
+        return decode_json_result(data).to_pandas()
+    return pd.DataFrame(data["rows"], columns=data["columns"])
+
+
+def decode_json_rows(
+    columns: list[str], rows: list[list], types: Optional[list[str]] = None
+) -> pa.RecordBatch:
+    """Decode rows of JSON values into an Arrow record batch, column by column.
+
+    Args:
+        columns: The column names
+        rows: The rows, as lists of JSON values
+        types: Optional DuckDB type of each column, see `typemap.arrow_type`
+    """
+    arrays = [
+        _to_arrow_array(
+            [row[index] for row in rows], arrow_type(types[index]) if types else None
+        )
+        for index in range(len(columns))
+    ]
+    return pa.RecordBatch.from_arrays(arrays, names=columns)
+
+
+def table_to_batch(table: pa.Table) -> pa.RecordBatch:
+    """Combine all chunks of a table into a single record batch."""
+    return pa.RecordBatch.from_arrays(
+        [column.combine_chunks() for column in table.columns], schema=table.schema
+    )
+
+
+def _smallest_integer_type(column: pa.ChunkedArray) -> pa.DataType:
+    """The smallest integer type of the same signedness holding every value."""
+    signed = pa.types.is_signed_integer(column.type)
+    bounds = pc.min_max(column)
+    low, high = bounds["min"].as_py(), bounds["max"].as_py()
+    for name in _INTEGER_LADDERS[not signed]:
+        candidate = getattr(pa, name)()
+        if low is None:
+            return candidate
+        bits = candidate.bit_width - signed
+        if low >= (-(2**bits) if signed else 0) and high < 2**bits:
+            return candidate
+    return column.type
+
+
+def _fits_float32(column: pa.ChunkedArray) -> bool:
+    """Whether every value of a float64 column is exactly representable as float32."""
+    narrowed = column.cast(pa.float32()).cast(pa.float64())
+    same = pc.or_(pc.equal(narrowed, column), pc.is_nan(column))
+    return pc.all(same).as_py() is not False
+
+
+def _to_arrow_array(values, type_: Optional[pa.DataType] = None) -> pa.Array:
+    """Convert a column of JSON values, falling back to strings for mixed types.
+
+    If the column type is known, values are converted to it when possible,
+    and otherwise keep the inferred type.
+    """
+    try:
+        array = pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        array = pa.array(
+            [None if value is None else str(value) for value in values],
+            type=pa.string(),
+        )
+    if type_ is None or array.type == type_:
+        return array
+    try:
+        return array.cast(type_)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        pass
+    try:
+        return pa.array(values, type=type_)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        return array
+
+
+def arrow_to_pandas(table: Union[pa.Table, pa.RecordBatch]) -> pd.DataFrame:
+    """Convert an Arrow table to a DataFrame backed by Arrow dtypes without copying."""
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+
+def iter_arrow_stream(source: BinaryIO) -> Iterator[pa.RecordBatch]:
+    """Yield record batches from an Arrow IPC stream as they are received."""
+    yield from pa.ipc.open_stream(source)
+
+
+def iter_json_result(
+    chunks: Iterable[bytes], chunk_size: int
+) -> Iterator[tuple[list[str], list[list]]]:
+    """Incrementally parse a JSON query result as its bytes arrive.
+
+    Only the rows of the current chunk and the unparsed tail of the body are
+    kept in memory, so arbitrarily large results can be consumed with
+    constant memory.
+
+    Args:
+        chunks: The response body, in pieces of any size
+        chunk_size: Number of rows to collect before yielding them
+
+    Yields:
+        (columns, rows) with at most chunk_size rows at a time
+    """
+    parser = _JsonStreamParser(chunks)
+    columns: Optional[list[str]] = None
+    rows: list[list] = []
+
+    parser.expect("{")
+    while not parser.consume("}"):
+        parser.consume(",")
+        key = parser.value()
+        parser.expect(":")
+        if key != "rows":
+            value = parser.value()
+            if key == "columns":
+                columns = value
+            continue
+
+        parser.expect("[")
+        while not parser.consume("]"):
+            parser.consume(",")
+            rows.append(parser.value())
+            # Rows can only be yielded once their column names are known
+            if columns is not None and len(rows) >= chunk_size:
+                yield columns, rows
+                rows = []
+
+    if rows:
+        yield columns or [], rows
+
+
+class _JsonStreamParser:
+    """Minimal pull parser over a JSON document split across byte chunks."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        """Read the next chunk into the buffer, returning False at the end of the body."""
+        if self._eof:
+            return False
+        # Drop everything that was already parsed so the buffer stays small
+        self._buffer = self._buffer[self._pos :]
+        self._pos = 0
+        for chunk in self._chunks:
+            text = self._decoder.decode(chunk)
+            if text:
+                self._buffer += text
+                return True
+        self._buffer += self._decoder.decode(b"", final=True)
+        self._eof = True
+        return False
+
+    def _peek(self) -> str:
+        """Return the next non-whitespace character, or "" at the end of the body."""
+        while True:
+            while (
+                self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE
+            ):
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ""
+
+    def consume(self, char: str) -> bool:
+        """Skip the next token if it is char."""
+        if self._peek() == char:
+            self._pos += 1
+            return True
+        return False
+
+    def expect(self, char: str) -> None:
+        if not self.consume(char):
+            raise ValueError(f"Malformed query result: expected '{char}'")
+
+    def value(self):
+        """Parse the next complete JSON value."""
+        self._peek()
+        while True:
+            try:
+                value, end = _JSON_DECODER.raw_decode(self._buffer, self._pos)
+                # A number at the very end of the buffer may continue in the next chunk
+                if end < len(self._buffer) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._fill()
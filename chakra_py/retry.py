@@ -0,0 +1,151 @@
+import asyncio
+import email.utils
+import random
+import sys
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional, TypeVar
+
+import requests
+
+from . import protocol
+
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_BACKOFF_SECONDS = 0.5
+DEFAULT_MAX_BACKOFF_SECONDS = 30.0
+
+
+def _network_errors() -> tuple:
+    """Failures after which a request may or may not have been processed."""
+    errors = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+    # httpx is only imported by AsyncChakra, and cannot have failed otherwise
+    httpx = sys.modules.get("httpx")
+    if httpx is not None:
+        errors += (httpx.TransportError,)
+    return errors
+
+
+def _connect_errors() -> tuple:
+    """Failures guaranteeing that the request never reached the server."""
+    errors = (requests.exceptions.ConnectTimeout,)
+    httpx = sys.modules.get("httpx")
+    if httpx is not None:
+        errors += (httpx.ConnectError, httpx.ConnectTimeout)
+    return errors
+
+
+# Statuses with which the server refuses a request without processing it
+_REJECTED_STATUSES = (429, 503)
+
+T = TypeVar("T")
+
+
+def is_transient(e: Exception) -> bool:
+    """Whether a failed request is worth retrying (network errors, 429s and 5xxs)."""
+    if isinstance(e, _network_errors()):
+        return True
+    return protocol.is_retryable_status(protocol.status_code_of(e))
+
+
+def retry_after(e: Exception) -> Optional[float]:
+    """Seconds to wait according to the Retry-After header of a failed request."""
+    headers = getattr(getattr(e, "response", None), "headers", None)
+    value = headers.get("Retry-After") if headers is not None else None
+    if not isinstance(value, str):
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, date.timestamp() - time.time())
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """How requests failing with transient errors are retried.
+
+    Requests that are not idempotent, such as imports or INSERT statements,
+    are only retried when the failure guarantees they were not processed:
+    connection timeouts, 429s and 503s.
+
+    Attributes:
+        max_attempts: Attempts per request, including the first one
+        backoff: Delay before the first retry, doubled after each attempt
+        max_backoff: Upper bound of the delay between two attempts
+        jitter: Draw each delay uniformly up to its backoff so that
+            concurrent clients do not retry in lockstep
+        respect_retry_after: Wait as long as a Retry-After header asks for,
+            up to max_backoff
+        deadline: Stop retrying once this many seconds have passed since the
+            first attempt, None for no limit. Delays never extend past it
+    """
+
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS
+    backoff: float = DEFAULT_BACKOFF_SECONDS
+    max_backoff: float = DEFAULT_MAX_BACKOFF_SECONDS
+    jitter: bool = True
+    respect_retry_after: bool = True
+    deadline: Optional[float] = None
+
+    def should_retry(self, e: Exception, idempotent: bool) -> bool:
+        if idempotent:
+            return is_transient(e)
+        return isinstance(e, _connect_errors()) or (
+            protocol.status_code_of(e) in _REJECTED_STATUSES
+        )
+
+    def delay(self, attempt: int, e: Exception) -> float:
+        """Seconds to wait after the given failed attempt, at most max_backoff."""
+        if self.respect_retry_after:
+            requested = retry_after(e)
+            if requested is not None:
+                return min(self.max_backoff, requested)
+        delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        return random.uniform(0, delay) if self.jitter else delay
+
+    def _next_delay(
+        self, attempt: int, e: Exception, idempotent: bool, started: float
+    ) -> Optional[float]:
+        """The delay before the next attempt, or None to give up."""
+        if attempt >= self.max_attempts or not self.should_retry(e, idempotent):
+            return None
+        delay = self.delay(attempt, e)
+        if self.deadline is not None:
+            remaining = self.deadline - (time.monotonic() - started)
+            if remaining <= 0:
+                return None
+            # Retry one last time at the deadline rather than giving up early
+            delay = min(delay, remaining)
+        return delay
+
+    def run(self, func: Callable[[], T], idempotent: bool = True) -> T:
+        """Call func, retrying it while it fails with transient errors."""
+        started = time.monotonic()
+        attempt = 1
+        while True:
+            try:
+                return func()
+            except Exception as e:
+                delay = self._next_delay(attempt, e, idempotent, started)
+                if delay is None:
+                    raise
+            time.sleep(delay)
+            attempt += 1
+
+    async def run_async(
+        self, func: Callable[[], Awaitable[T]], idempotent: bool = True
+    ) -> T:
+        """Async version of `run`."""
+        started = time.monotonic()
+        attempt = 1
+        while True:
+            try:
+                return await func()
+            except Exception as e:
+                delay = self._next_delay(attempt, e, idempotent, started)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
@@ -0,0 +1,254 @@
+import re
+import threading
+import time
+from typing import Collection, Optional
+
+from .exceptions import ChakraSchemaError
+
+DEFAULT_SCHEMA_TTL = 300.0
+
+# Statements after which cached databases, schemas and tables may be stale
+_SCHEMA_CHANGE = re.compile(
+    r"^\s*(?:drop|alter|create\s+or\s+replace|comment\s+on)\b", re.IGNORECASE
+)
+
+
+def changes_schema(query: str) -> bool:
+    """Whether a statement may drop or alter databases, schemas or tables."""
+    return bool(_SCHEMA_CHANGE.match(query))
+
+
+# Integer types -> (whether signed, bits)
+_INTEGERS = {
+    "TINYINT": (True, 8),
+    "SMALLINT": (True, 16),
+    "INTEGER": (True, 32),
+    "BIGINT": (True, 64),
+    "HUGEINT": (True, 128),
+    "UTINYINT": (False, 8),
+    "USMALLINT": (False, 16),
+    "UINTEGER": (False, 32),
+    "UBIGINT": (False, 64),
+    "UHUGEINT": (False, 128),
+}
+_INTEGER_ALIASES = {
+    "INT1": "TINYINT",
+    "INT2": "SMALLINT",
+    "SHORT": "SMALLINT",
+    "INT4": "INTEGER",
+    "INT": "INTEGER",
+    "SIGNED": "INTEGER",
+    "INT8": "BIGINT",
+    "LONG": "BIGINT",
+}
+# Other spellings of types, such as those of information_schema
+_TYPE_ALIASES = {
+    **_INTEGER_ALIASES,
+    "TIMESTAMP WITH TIME ZONE": "TIMESTAMPTZ",
+    "TIMESTAMP WITHOUT TIME ZONE": "TIMESTAMP",
+    "DATETIME": "TIMESTAMP",
+    "CHARACTER VARYING": "VARCHAR",
+    "BOOL": "BOOLEAN",
+}
+_FLOATS = {"FLOAT": 32, "FLOAT4": 32, "REAL": 32, "DOUBLE": 64, "FLOAT8": 64}
+_STRINGS = {"VARCHAR", "TEXT", "STRING", "CHAR", "BPCHAR"}
+# Timestamp types, from coarsest to finest
+_TIMESTAMPS = ["TIMESTAMP_S", "TIMESTAMP_MS", "TIMESTAMP", "TIMESTAMP_NS"]
+_TIMESTAMPS_WITH_TIME_ZONE = {"TIMESTAMPTZ"}
+_DECIMAL = re.compile(r"^(?:DECIMAL|NUMERIC)\s*\(\s*(\d+)\s*(?:,\s*(\d+)\s*)?\)$")
+
+
+def _decimal(type_: str) -> Optional[tuple[int, int]]:
+    """The (precision, scale) of a DECIMAL type, or None."""
+    if type_ in ("DECIMAL", "NUMERIC"):
+        return 18, 3
+    match = _DECIMAL.match(type_)
+    if match is None:
+        return None
+    return int(match.group(1)), int(match.group(2) or 0)
+
+
+def can_cast(source: str, target: str) -> bool:
+    """Whether DuckDB implicitly converts values of one column type to another.
+
+    Besides equal types, this covers widening integers, floats, decimals and
+    timestamps, integers into floats and wide enough decimals, dates into
+    timestamps, strings into ENUMs and back, and lists of such types.
+
+    Args:
+        source: DuckDB type of the data being pushed
+        target: DuckDB type of the table column
+    """
+    source = " ".join(source.upper().split())
+    target = " ".join(target.upper().split())
+    if source == target:
+        return True
+    if source.endswith("[]") and target.endswith("[]"):
+        return can_cast(source[:-2], target[:-2])
+    source = _TYPE_ALIASES.get(source, source)
+    target = _TYPE_ALIASES.get(target, target)
+    if source == target:
+        return True
+
+    if source in _INTEGERS:
+        signed, bits = _INTEGERS[source]
+        if target in _INTEGERS:
+            target_signed, target_bits = _INTEGERS[target]
+            if signed == target_signed:
+                return target_bits >= bits
+            return target_signed and target_bits > bits
+        if target in _FLOATS:
+            return True
+        decimal = _decimal(target)
+        # Digits of the largest value of the integer type
+        digits = len(str(2 ** (bits - signed) - 1))
+        return decimal is not None and decimal[0] - decimal[1] >= digits
+    if source in _FLOATS:
+        return target in _FLOATS and _FLOATS[target] >= _FLOATS[source]
+    source_decimal = _decimal(source)
+    if source_decimal is not None:
+        if target in _FLOATS:
+            return True
+        decimal = _decimal(target)
+        return (
+            decimal is not None
+            and decimal[1] >= source_decimal[1]
+            and decimal[0] - decimal[1] >= source_decimal[0] - source_decimal[1]
+        )
+    if source == "DATE" or source in _TIMESTAMPS:
+        if target in _TIMESTAMPS_WITH_TIME_ZONE:
+            return True
+        if target not in _TIMESTAMPS:
+            return False
+        return source == "DATE" or _TIMESTAMPS.index(target) >= _TIMESTAMPS.index(
+            source
+        )
+    if source in _STRINGS:
+        return target in _STRINGS or target.startswith("ENUM")
+    if source.startswith("ENUM"):
+        return target in _STRINGS
+    return False
+
+
+def validate_columns(
+    table_name: str,
+    expected: dict[str, str],
+    actual: dict[str, str],
+    null_columns: Collection[str] = (),
+) -> None:
+    """Check that pushed columns fit the known columns of a table.
+
+    Column names are compared case-insensitively, like DuckDB identifiers.
+    Columns may be of narrower types that DuckDB converts implicitly, see
+    `can_cast`.
+
+    Args:
+        table_name: The fully qualified table name, for the error message
+        expected: Column name -> DuckDB type of the table
+        actual: Column name -> DuckDB type of the data being pushed
+        null_columns: Columns of the data holding only nulls, which fit
+            columns of any type
+
+    Raises:
+        ChakraSchemaError: If a column is missing, unexpected or of a type
+            that does not fit
+    """
+    expected_types = {name.lower(): (name, type_) for name, type_ in expected.items()}
+    actual_types = {name.lower(): (name, type_) for name, type_ in actual.items()}
+    null_keys = {name.lower() for name in null_columns}
+    problems = []
+    for key, (name, type_) in actual_types.items():
+        if key not in expected_types:
+            problems.append(f"unexpected column {name!r}")
+        elif key not in null_keys and not can_cast(type_, expected_types[key][1]):
+            problems.append(
+                f"column {name!r} is {expected_types[key][1]} but got {type_}"
+            )
+    for key, (name, _) in expected_types.items():
+        if key not in actual_types:
+            problems.append(f"missing column {name!r}")
+    if problems:
+        raise ChakraSchemaError(
+            f"Data does not match the schema of {table_name}: " + "; ".join(problems)
+        )
+
+
+class SchemaCache:
+    """Databases, schemas and tables known to exist, with the columns of tables.
+
+    Pushes skip the DDL round trips for anything cached, and data whose
+    columns do not match a cached table fails before it is uploaded. Entries
+    expire after ttl seconds, a table is forgotten when it is replaced, and
+    a failed push forgets the table along with its schema and database.
+    Statements run through `execute` that drop or alter objects clear the
+    whole cache.
+
+    Example:
+        >>> client = Chakra("DB_SESSION_KEY", schema_cache=SchemaCache())
+        >>> client.push("events", batch)  # creates the table
+        >>> client.push("events", next_batch)  # no DDL round trips
+    """
+
+    def __init__(self, ttl: float = DEFAULT_SCHEMA_TTL):
+        """Initialize the cache.
+
+        Args:
+            ttl: Seconds after which an entry is considered stale
+        """
+        self.ttl = ttl
+        # lowercased name -> (column name -> DuckDB type for tables, expiry)
+        self._entries: dict[str, tuple[Optional[dict[str, str]], float]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _names(table_name: str) -> list[str]:
+        """The database, schema and table keys of a fully qualified table."""
+        parts = table_name.lower().split(".")
+        return [".".join(parts[: i + 1]) for i in range(len(parts))]
+
+    def _get(self, name: str) -> Optional[tuple[Optional[dict[str, str]], float]]:
+        entry = self._entries.get(name.lower())
+        if entry is not None and time.monotonic() >= entry[1]:
+            del self._entries[name.lower()]
+            return None
+        return entry
+
+    def exists(self, name: str) -> bool:
+        """Whether a database, database.schema or database.schema.table is known."""
+        with self._lock:
+            return self._get(name) is not None
+
+    def columns(self, table_name: str) -> Optional[dict[str, str]]:
+        """The known column name -> DuckDB type of a table, or None."""
+        with self._lock:
+            entry = self._get(table_name)
+        return dict(entry[0]) if entry is not None and entry[0] else None
+
+    def add(self, table_name: str, columns: dict[str, str]) -> None:
+        """Record that a table, its schema and its database exist.
+
+        The columns of a table already known are kept, since data pushed to
+        it may have narrower types than the table itself. Empty columns
+        record only that the table exists, and pushes to it are not checked.
+        """
+        expiry = time.monotonic() + self.ttl
+        database, schema, table = self._names(table_name)
+        with self._lock:
+            known = self._get(table)
+            if known is not None and known[0]:
+                columns = known[0]
+            self._entries[database] = (None, expiry)
+            self._entries[schema] = (None, expiry)
+            self._entries[table] = (dict(columns), expiry)
+
+    def invalidate(self, table_name: str, parents: bool = False) -> None:
+        """Forget a table and, with parents, its schema and database."""
+        names = self._names(table_name)
+        with self._lock:
+            for name in names if parents else names[-1:]:
+                self._entries.pop(name, None)
+
+    def clear(self) -> None:
+        """Forget everything."""
+        with self._lock:
+            self._entries.clear()
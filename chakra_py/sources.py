@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import itertools
+import os
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Iterable, Iterator, Optional, Union
+
+from .encoding import ParquetOptions
+from .lazy import lazy_import
+
+pd = lazy_import("pandas")
+pa = lazy_import("pyarrow")
+pq = lazy_import("pyarrow.parquet")
+pa_csv = lazy_import("pyarrow.csv")
+
+# Parquet parts are kept in memory up to this size before spilling to disk
+PART_SPOOL_BYTES = 64 * 1024 * 1024
+
+PushData = Union[
+    "pd.DataFrame",
+    "pa.Table",
+    "pa.RecordBatchReader",
+    Iterable["pd.DataFrame"],
+    str,
+    os.PathLike,
+]
+
+
+def to_record_batch_reader(data: PushData) -> pa.RecordBatchReader:
+    """Normalize anything accepted by `Chakra.push` into a RecordBatchReader.
+
+    Streaming sources (iterators, readers and files on disk) are never fully
+    materialized, so they can be larger than available memory.
+
+    Args:
+        data: A DataFrame, Arrow table, RecordBatchReader, iterable of
+            DataFrames sharing the same columns, or a path to a .parquet or
+            .csv file
+
+    Returns:
+        A reader yielding the data as Arrow record batches
+    """
+    if isinstance(data, pd.DataFrame):
+        return pa.Table.from_pandas(data, preserve_index=False).to_reader()
+    if isinstance(data, pa.Table):
+        return data.to_reader()
+    if isinstance(data, pa.RecordBatchReader):
+        return data
+    if isinstance(data, (str, os.PathLike)):
+        return _read_file(os.fspath(data))
+    if isinstance(data, Iterable):
+        return _read_dataframes(data)
+    raise TypeError(f"Cannot push data of type {type(data).__name__}")
+
+
+def _read_file(path: str) -> pa.RecordBatchReader:
+    """Stream a parquet or CSV file from disk."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".parquet":
+        parquet_file = pq.ParquetFile(path)
+        return pa.RecordBatchReader.from_batches(
+            parquet_file.schema_arrow, parquet_file.iter_batches()
+        )
+    if extension == ".csv":
+        return pa_csv.open_csv(path)
+    raise ValueError(f"Unsupported file type '{extension}', expected .parquet or .csv")
+
+
+def _read_dataframes(frames: Iterable[pd.DataFrame]) -> pa.RecordBatchReader:
+    """Stream an iterable of DataFrames, using the first one to fix the schema."""
+    frames = iter(frames)
+    try:
+        first = next(frames)
+    except StopIteration:
+        raise ValueError("Cannot push an empty iterable of DataFrames")
+
+    schema = pa.Schema.from_pandas(first, preserve_index=False)
+    batches = (
+        pa.RecordBatch.from_pandas(frame, schema=schema, preserve_index=False)
+        for frame in itertools.chain([first], frames)
+    )
+    return pa.RecordBatchReader.from_batches(schema, batches)
+
+
+class _PartWriter:
+    """A parquet part being encoded into a spooled temporary file."""
+
+    def __init__(self, schema: pa.Schema, options: ParquetOptions, spool_size: int):
+        self.file = tempfile.SpooledTemporaryFile(max_size=spool_size)
+        self.rows = 0
+        self.raw_bytes = 0
+        self._writer = pq.ParquetWriter(self.file, schema, **options.writer_options())
+        self._row_group_size = options.row_group_size
+        # Rows waiting to fill a row group
+        self._pending: list[pa.RecordBatch] = []
+        self._pending_rows = 0
+
+    def write(self, batch: pa.RecordBatch) -> None:
+        self.rows += batch.num_rows
+        self.raw_bytes += batch.nbytes
+        if not self._row_group_size:
+            self._writer.write_batch(batch)
+            return
+        self._pending.append(batch)
+        self._pending_rows += batch.num_rows
+        if self._pending_rows >= self._row_group_size:
+            self._flush(final=False)
+
+    def _flush(self, final: bool) -> None:
+        """Write the pending rows as full row groups, keeping the remainder."""
+        if not self._pending:
+            return
+        table = pa.Table.from_batches(self._pending)
+        rows = table.num_rows
+        if not final:
+            rows -= rows % self._row_group_size
+        self._writer.write_table(
+            table.slice(0, rows), row_group_size=self._row_group_size
+        )
+        self._pending = table.slice(rows).to_batches()
+        self._pending_rows = table.num_rows - rows
+
+    def close(self) -> tuple[BinaryIO, int, int, int]:
+        self._flush(final=True)
+        self._writer.close()
+        size = self.file.tell()
+        self.file.seek(0)
+        return self.file, size, self.rows, self.raw_bytes
+
+
+def _part_slices(
+    reader: pa.RecordBatchReader, chunk_size: Optional[int]
+) -> Iterator[tuple[pa.RecordBatch, bool]]:
+    """Slice record batches at part boundaries, flagging the last slice of each part."""
+    rows_in_part = 0
+    for batch in reader:
+        offset = 0
+        while offset < batch.num_rows:
+            rows = batch.num_rows - offset
+            if chunk_size:
+                rows = min(rows, chunk_size - rows_in_part)
+            rows_in_part += rows
+            ends_part = bool(chunk_size) and rows_in_part >= chunk_size
+            yield batch.slice(offset, rows), ends_part
+            offset += rows
+            if ends_part:
+                rows_in_part = 0
+
+
+def _encode_part(
+    schema: pa.Schema,
+    batches: list[pa.RecordBatch],
+    options: ParquetOptions,
+    spool_size: int,
+) -> tuple[BinaryIO, int, int, int]:
+    part = _PartWriter(schema, options, spool_size)
+    for batch in batches:
+        part.write(batch)
+    return part.close()
+
+
+def write_parquet_parts(
+    reader: pa.RecordBatchReader,
+    chunk_size: Optional[int],
+    spool_size: int = PART_SPOOL_BYTES,
+    options: ParquetOptions = ParquetOptions(),
+) -> Iterator[tuple[BinaryIO, int, int, int]]:
+    """Encode record batches into parquet parts of at most chunk_size rows.
+
+    Batches are written as row groups as soon as they are read, and each
+    part is yielded as soon as it is complete so it can be uploaded while
+    the next one is being encoded. Each part is a standalone parquet file
+    so it can be uploaded and imported independently of the others.
+
+    Parts are encoded in memory and only spill to a temporary file beyond
+    spool_size bytes. The caller owns each part and must close it.
+
+    With several options.encode_workers and a chunk_size, the rows of each
+    part are collected first and parts are encoded concurrently; pyarrow
+    releases the GIL while encoding. Without a chunk_size there is a single
+    part, which is always streamed into the encoder rather than collected.
+
+    Yields:
+        (file positioned at its start, size in bytes, number of rows,
+        in-memory size of the rows before encoding) for each part, in row
+        order
+    """
+    if options.encode_workers > 1 and chunk_size is not None:
+        yield from _write_parts_concurrently(reader, chunk_size, spool_size, options)
+        return
+
+    part = None
+    produced = False
+    for batch, ends_part in _part_slices(reader, chunk_size):
+        if part is None:
+            part = _PartWriter(reader.schema, options, spool_size)
+        part.write(batch)
+        if ends_part:
+            yield part.close()
+            part, produced = None, True
+
+    if part is None and not produced:
+        # Always produce at least one (possibly empty) part
+        part = _PartWriter(reader.schema, options, spool_size)
+    if part is not None:
+        yield part.close()
+
+
+def _write_parts_concurrently(
+    reader: pa.RecordBatchReader,
+    chunk_size: Optional[int],
+    spool_size: int,
+    options: ParquetOptions,
+) -> Iterator[tuple[BinaryIO, int, int, int]]:
+    """`write_parquet_parts` encoding up to options.encode_workers parts at a time."""
+    in_flight = deque()
+    batches: list[pa.RecordBatch] = []
+    produced = False
+    with ThreadPoolExecutor(max_workers=options.encode_workers) as executor:
+
+        def submit():
+            in_flight.append(
+                executor.submit(
+                    _encode_part, reader.schema, batches, options, spool_size
+                )
+            )
+
+        for batch, ends_part in _part_slices(reader, chunk_size):
+            batches.append(batch)
+            if ends_part:
+                if len(in_flight) >= options.encode_workers:
+                    yield in_flight.popleft().result()
+                submit()
+                batches, produced = [], True
+        if batches or not produced:
+            submit()
+        while in_flight:
+            yield in_flight.popleft().result()
@@ -0,0 +1,114 @@
+import itertools
+import re
+from typing import Iterable, Iterator, Optional, Sequence
+
+from .inserts import MAX_INSERT_PARAMETERS
+from .protocol import bind_parameters, rewrite_placeholders
+
+# An INSERT whose VALUES clause is a single row, which can be repeated to
+# insert many rows with one statement
+_SINGLE_ROW_INSERT = re.compile(
+    r"^(?P<head>\s*insert\s.*?\bvalues\s*)(?P<row>\([^()]*\))\s*;?\s*$",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+class PreparedStatement:
+    """A query prepared once to be executed with different parameters.
+
+    Returned by `Chakra.prepare` and `AsyncChakra.prepare`. The placeholders
+    of the query are checked and rewritten when it is prepared, and later
+    executions reuse the rewrite. The API has no server-side statements, so
+    the query text is still sent with each execution.
+
+    Methods return what the client's methods do: with AsyncChakra, they
+    return coroutines to await.
+
+    Example:
+        >>> by_id = client.prepare("SELECT * FROM users WHERE id = $1")
+        >>> by_id.execute([42])
+        >>> client.prepare("INSERT INTO users VALUES ($1, $2)").executemany(rows)
+    """
+
+    def __init__(self, client, query: str):
+        """Initialize the statement.
+
+        Args:
+            client: The Chakra or AsyncChakra client executing the statement
+            query: The SQL query, with parameters referenced as $1, $2, ... or ?
+
+        Raises:
+            ValueError: If the query mixes $N and ? placeholders
+        """
+        self.query = query
+        self.sql, self._order = rewrite_placeholders(query)
+        self._client = client
+
+    @property
+    def parameter_count(self) -> Optional[int]:
+        """Number of parameters the statement takes, None if it uses `?`."""
+        return None if self._order is None else max(self._order, default=-1) + 1
+
+    def execute(self, parameters: Sequence = (), **kwargs):
+        """Execute the statement. See `Chakra.execute` for the arguments."""
+        return self._client.execute(self.query, list(parameters), **kwargs)
+
+    def execute_arrow(self, parameters: Sequence = ()):
+        """Execute the statement and return results as a pyarrow Table."""
+        return self._client.execute_arrow(self.query, list(parameters))
+
+    def executemany(self, parameter_sets: Iterable[Sequence]):
+        """Execute the statement once per set of parameters.
+
+        See `Chakra.executemany`.
+        """
+        return self._client.executemany(self.query, parameter_sets)
+
+    def __repr__(self) -> str:
+        return f"PreparedStatement({self.query!r})"
+
+
+def executemany_requests(
+    query: str,
+    parameter_sets: Iterable[Sequence],
+    max_parameters: int = MAX_INSERT_PARAMETERS,
+) -> Iterator[tuple[str, list, int]]:
+    """Split the executions of a statement into as few query requests as possible.
+
+    A single-row INSERT ... VALUES statement is repeated into multi-row
+    INSERTs binding up to max_parameters values each. Other statements may
+    depend on the effects of the previous execution, so they are sent one
+    execution per request.
+
+    Args:
+        query: The statement, with parameters referenced as $1, $2, ... or ?
+        parameter_sets: One sequence of parameters per execution
+        max_parameters: Maximum number of values bound by one request
+
+    Yields:
+        (SQL, bound parameters, number of executions) for each request
+    """
+    sql, order = rewrite_placeholders(query)
+    match = _SINGLE_ROW_INSERT.match(sql)
+    if match is None:
+        for parameters in parameter_sets:
+            yield sql, bind_parameters(order, parameters), 1
+        return
+
+    head, row = match.group("head"), match.group("row")
+    rows: list[list] = []
+    size = 0
+    for parameters in parameter_sets:
+        bound = bind_parameters(order, parameters)
+        if rows and size + len(bound) > max_parameters:
+            yield _multi_row_insert(head, row, rows)
+            rows, size = [], 0
+        rows.append(bound)
+        size += len(bound)
+    if rows:
+        yield _multi_row_insert(head, row, rows)
+
+
+def _multi_row_insert(head: str, row: str, rows: list[list]) -> tuple[str, list, int]:
+    sql = head + ", ".join([row] * len(rows))
+    return sql, list(itertools.chain.from_iterable(rows)), len(rows)
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import os
+import re
+import uuid
+from dataclasses import dataclass
+from typing import Optional, Union
+
+from .inserts import _quote_identifier
+from .lazy import lazy_import
+
+pd = lazy_import("pandas")
+pa = lazy_import("pyarrow")
+pq = lazy_import("pyarrow.parquet")
+
+DEFAULT_SYNC_INDEX_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "chakra", "sync"
+)
+# Name of the column holding the hash of each row in the index
+ROW_HASH_COLUMN = "__chakra_row_hash"
+
+
+def row_hashes(data: pd.DataFrame) -> pd.Series:
+    """A 64-bit hash of each row, computed column-wise in native code."""
+    return pd.util.hash_pandas_object(data, index=False)
+
+
+@dataclass
+class RowChanges:
+    """The difference between the rows of a table and its last synced state.
+
+    Attributes:
+        changed: Rows that were inserted or updated since the last sync
+        deleted_keys: Primary keys of the rows that were deleted
+        inserted: Number of new rows
+        updated: Number of rows whose values changed
+        unchanged: Number of rows that were left out
+        index: Primary keys and row hashes to store once the changes are applied
+    """
+
+    changed: pd.DataFrame
+    deleted_keys: pd.DataFrame
+    inserted: int
+    updated: int
+    unchanged: int
+    index: pd.DataFrame
+
+    @property
+    def deleted(self) -> int:
+        return len(self.deleted_keys)
+
+
+def diff_rows(
+    data: pd.DataFrame,
+    primary_key_columns: list[str],
+    previous: Optional[pd.DataFrame],
+    delete_missing: bool,
+) -> RowChanges:
+    """Compare data with the index of its last sync.
+
+    Args:
+        data: The rows the table should contain
+        primary_key_columns: Columns identifying a row, unique within data
+        previous: The index stored by the last sync, None if there was none
+        delete_missing: Whether data is a full snapshot, so that indexed
+            rows missing from it were deleted
+
+    Raises:
+        ValueError: If primary key columns are missing or not unique
+    """
+    missing = [column for column in primary_key_columns if column not in data]
+    if not primary_key_columns or missing:
+        raise ValueError(
+            f"primary_key_columns must name columns of the data, missing: {missing}"
+        )
+    keys = data[primary_key_columns].reset_index(drop=True)
+    if keys.duplicated().any():
+        raise ValueError("primary_key_columns must be unique within the data")
+
+    current = keys.assign(**{ROW_HASH_COLUMN: row_hashes(data).to_numpy()})
+    columns = primary_key_columns + [ROW_HASH_COLUMN]
+    if previous is None or not set(columns) <= set(previous.columns):
+        previous = current.iloc[:0]
+    previous = previous[columns]
+
+    try:
+        merged = current.merge(
+            previous,
+            on=primary_key_columns,
+            how="left",
+            suffixes=("", "_previous"),
+            indicator=True,
+        )
+        absent = (
+            previous.merge(keys, on=primary_key_columns, how="left", indicator=True)[
+                "_merge"
+            ]
+            == "left_only"
+        ).to_numpy()
+    except (ValueError, TypeError):
+        # Key types changed since the last sync, which cannot be compared
+        return diff_rows(data, primary_key_columns, None, delete_missing)
+
+    new = (merged["_merge"] == "left_only").to_numpy()
+    updated = (
+        (merged["_merge"] == "both")
+        & (merged[ROW_HASH_COLUMN] != merged[ROW_HASH_COLUMN + "_previous"])
+    ).to_numpy()
+
+    if delete_missing:
+        deleted_keys = previous.loc[absent, primary_key_columns]
+        index = current
+    else:
+        # Keep indexed rows that this partial sync did not mention
+        deleted_keys = previous.loc[[], primary_key_columns]
+        index = pd.concat([previous[absent], current], ignore_index=True)
+
+    return RowChanges(
+        changed=data[new | updated],
+        deleted_keys=deleted_keys.reset_index(drop=True),
+        inserted=int(new.sum()),
+        updated=int(updated.sum()),
+        unchanged=len(data) - int(new.sum()) - int(updated.sum()),
+        index=index,
+    )
+
+
+class SyncIndex:
+    """Primary keys and row hashes of the data last synced to each table.
+
+    Each table has its own parquet file in the index directory. Use a
+    separate directory for each account, since files are keyed by table name.
+
+    Example:
+        >>> client.sync("users", users_df, ["id"], index=SyncIndex("./sync-index"))
+    """
+
+    def __init__(self, directory: Union[str, os.PathLike] = DEFAULT_SYNC_INDEX_PATH):
+        """Initialize the index.
+
+        Args:
+            directory: Directory holding one file per synced table
+        """
+        self.directory = os.fspath(directory)
+
+    def path(self, table_name: str) -> str:
+        """The file holding the index of a table."""
+        file_name = re.sub(r"[^\w.-]", "_", table_name.lower())
+        return os.path.join(self.directory, f"{file_name}.parquet")
+
+    def load(self, table_name: str) -> Optional[pd.DataFrame]:
+        """The index stored by the last sync of a table, or None."""
+        try:
+            return pq.read_table(self.path(table_name)).to_pandas()
+        except (OSError, pa.ArrowInvalid):
+            return None
+
+    def store(self, table_name: str, index: pd.DataFrame) -> None:
+        """Replace the index of a table atomically."""
+        path = self.path(table_name)
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        pq.write_table(
+            pa.Table.from_pandas(index, preserve_index=False),
+            tmp_path,
+            compression="zstd",
+        )
+        os.replace(tmp_path, path)
+
+    def forget(self, table_name: str) -> None:
+        """Drop the index of a table, so that its next sync sends every row."""
+        try:
+            os.remove(self.path(table_name))
+        except FileNotFoundError:
+            pass
+
+
+def staging_table_name(table_name: str, kind: str) -> str:
+    """A unique name for a staging table next to the synced table."""
+    return f"{table_name}__chakra_sync_{kind}_{uuid.uuid4().hex[:12]}"
+
+
+def delete_matching_sql(
+    table_name: str, staging_table: str, primary_key_columns: list[str]
+) -> str:
+    """Delete the rows of a table whose primary key appears in a staging table."""
+    condition = " AND ".join(
+        f"target.{column} = staged.{column}"
+        for column in map(_quote_identifier, primary_key_columns)
+    )
+    return (
+        f"DELETE FROM {table_name} AS target USING {staging_table} AS staged "
+        f"WHERE {condition}"
+    )
+
+
+def insert_from_sql(table_name: str, staging_table: str, columns: list[str]) -> str:
+    """Copy every row of a staging table into a table."""
+    column_list = ", ".join(map(_quote_identifier, columns))
+    return (
+        f"INSERT INTO {table_name} ({column_list}) "
+        f"SELECT {column_list} FROM {staging_table}"
+    )
@@ -0,0 +1,131 @@
+import gzip
+from dataclasses import dataclass
+from typing import Optional
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from urllib3.util import make_headers
+
+from . import protocol
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 32
+DEFAULT_CONNECT_TIMEOUT = 10.0
+COMPRESSION_MIN_BYTES = 1024
+REQUEST_COMPRESSIONS = ("gzip", "zstd")
+
+
+@dataclass(frozen=True)
+class TransportConfig:
+    """HTTP settings applied to every request sent by the client.
+
+    Attributes:
+        pool_connections: Number of hosts to keep a connection pool for
+        pool_maxsize: Connections kept alive per host, which should cover the
+            number of concurrent uploads or queries
+        connect_timeout: Seconds to wait for a connection, None to wait forever
+        read_timeout: Seconds to wait for the server to send data, None to
+            wait forever since analytical queries may legitimately run long
+        request_compression: "gzip" or "zstd" to compress query request
+            bodies of at least COMPRESSION_MIN_BYTES, if the server accepts it
+        response_compression: Ask for compressed responses, which are
+            transparently decompressed
+        base_url: Send API requests to this URL instead, e.g. a local mock server
+        adapter: A requests transport adapter sending every request instead of
+            the default pooled HTTP adapter
+    """
+
+    pool_connections: int = DEFAULT_POOL_CONNECTIONS
+    pool_maxsize: int = DEFAULT_POOL_MAXSIZE
+    connect_timeout: Optional[float] = DEFAULT_CONNECT_TIMEOUT
+    read_timeout: Optional[float] = None
+    request_compression: Optional[str] = None
+    response_compression: bool = True
+    base_url: Optional[str] = None
+    adapter: Optional[BaseAdapter] = None
+
+    def __post_init__(self):
+        if self.request_compression not in (None, *REQUEST_COMPRESSIONS):
+            raise ValueError("request_compression must be None, 'gzip' or 'zstd'")
+        if self.request_compression == "zstd" and zstandard is None:
+            raise ImportError(
+                'zstd compression requires zstandard, install it with: pip install "chakra-py[zstd]"'
+            )
+
+    @property
+    def timeout(self) -> tuple[Optional[float], Optional[float]]:
+        """The (connect, read) timeout passed to requests."""
+        return self.connect_timeout, self.read_timeout
+
+    def api_url(self, url: str) -> str:
+        """Point an API URL at base_url, leaving other URLs untouched."""
+        if self.base_url and url.startswith(protocol.BASE_URL):
+            return self.base_url.rstrip("/") + url[len(protocol.BASE_URL) :]
+        return url
+
+
+def compress_body(body: bytes, encoding: str) -> bytes:
+    """Compress a request body with the given content encoding."""
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor().compress(body)
+    return gzip.compress(body, compresslevel=6)
+
+
+class _ConfiguredAdapter(BaseAdapter):
+    """Apply a TransportConfig to each request before handing it to a transport."""
+
+    def __init__(self, config: TransportConfig, transport: BaseAdapter, compress: bool):
+        super().__init__()
+        self._config = config
+        self._transport = transport
+        self._compress = compress
+
+    def send(self, request: requests.PreparedRequest, timeout=None, **kwargs):
+        request.url = self._config.api_url(request.url)
+        body = request.body
+        if (
+            self._compress
+            and isinstance(body, bytes)
+            and len(body) >= COMPRESSION_MIN_BYTES
+            and "Content-Encoding" not in request.headers
+        ):
+            encoding = self._config.request_compression
+            request.body = compress_body(body, encoding)
+            request.headers["Content-Encoding"] = encoding
+            request.headers["Content-Length"] = str(len(request.body))
+        if timeout is None:
+            timeout = self._config.timeout
+        return self._transport.send(request, timeout=timeout, **kwargs)
+
+    def close(self) -> None:
+        self._transport.close()
+
+
+def configure_session(session: requests.Session, config: TransportConfig) -> None:
+    """Mount adapters applying the config on a session.
+
+    A single pooled transport is shared by all hosts, so connections to the
+    API and to the presigned upload targets are kept alive across requests.
+    """
+    transport = config.adapter or HTTPAdapter(
+        pool_connections=config.pool_connections, pool_maxsize=config.pool_maxsize
+    )
+    adapter = _ConfiguredAdapter(config, transport, compress=False)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if config.request_compression:
+        # requests picks the adapter with the longest matching prefix
+        session.mount(
+            protocol.QUERY_URL, _ConfiguredAdapter(config, transport, compress=True)
+        )
+
+    session.headers["Accept-Encoding"] = (
+        make_headers(accept_encoding=True)["accept-encoding"]
+        if config.response_compression
+        else "identity"
+    )
@@ -0,0 +1,280 @@
+from __future__ import annotations
+
+import functools
+import re
+from typing import Optional
+
+from .lazy import lazy_import
+
+pd = lazy_import("pandas")
+pa = lazy_import("pyarrow")
+
+
+# DuckDB supports decimals with up to 38 digits
+MAX_DECIMAL_PRECISION = 38
+
+# Keyed by the names of the Arrow types, so that pyarrow is not needed to build them
+_INTEGER_TYPES = {
+    "int8": "TINYINT",
+    "int16": "SMALLINT",
+    "int32": "INTEGER",
+    "int64": "BIGINT",
+    "uint8": "UTINYINT",
+    "uint16": "USMALLINT",
+    "uint32": "UINTEGER",
+    "uint64": "UBIGINT",
+}
+_TIMESTAMP_TYPES = {
+    "s": "TIMESTAMP_S",
+    "ms": "TIMESTAMP_MS",
+    "us": "TIMESTAMP",
+    "ns": "TIMESTAMP_NS",
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _simple_arrow_types() -> dict:
+    """DuckDB type names without parameters -> Arrow type."""
+    return {
+        **{
+            name: getattr(pa, type_name)() for type_name, name in _INTEGER_TYPES.items()
+        },
+        **{name: pa.timestamp(unit) for unit, name in _TIMESTAMP_TYPES.items()},
+        "BOOLEAN": pa.bool_(),
+        "BOOL": pa.bool_(),
+        "INT1": pa.int8(),
+        "INT2": pa.int16(),
+        "SHORT": pa.int16(),
+        "INT4": pa.int32(),
+        "INT": pa.int32(),
+        "SIGNED": pa.int32(),
+        "INT8": pa.int64(),
+        "LONG": pa.int64(),
+        "HUGEINT": pa.decimal128(38, 0),
+        "UHUGEINT": pa.decimal128(38, 0),
+        "FLOAT": pa.float32(),
+        "FLOAT4": pa.float32(),
+        "REAL": pa.float32(),
+        "DOUBLE": pa.float64(),
+        "FLOAT8": pa.float64(),
+        "DECIMAL": pa.decimal128(18, 3),
+        "NUMERIC": pa.decimal128(18, 3),
+        "VARCHAR": pa.string(),
+        "TEXT": pa.string(),
+        "STRING": pa.string(),
+        "CHAR": pa.string(),
+        "BPCHAR": pa.string(),
+        "UUID": pa.string(),
+        "JSON": pa.string(),
+        "BLOB": pa.binary(),
+        "BYTEA": pa.binary(),
+        "VARBINARY": pa.binary(),
+        "DATE": pa.date32(),
+        "TIME": pa.time64("us"),
+        "DATETIME": pa.timestamp("us"),
+        "TIMESTAMPTZ": pa.timestamp("us", tz="UTC"),
+        "TIMESTAMP WITH TIME ZONE": pa.timestamp("us", tz="UTC"),
+        "INTERVAL": pa.month_day_nano_interval(),
+    }
+
+
+_PARAMETERIZED = re.compile(r"^(\w+)\s*\((.*)\)$", re.DOTALL)
+
+
+def _quote_literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _quote_identifier(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def duckdb_type(arrow_type: pa.DataType, enum_values: Optional[list] = None) -> str:
+    """The narrowest DuckDB column type holding values of an Arrow type.
+
+    Args:
+        arrow_type: The Arrow type of the column
+        enum_values: Every value the string column may ever hold, to declare
+            it as an ENUM
+
+    Returns:
+        The DuckDB type name, VARCHAR for types without a counterpart
+    """
+    if pa.types.is_dictionary(arrow_type):
+        return duckdb_type(arrow_type.value_type, enum_values)
+    if (
+        enum_values
+        and (pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type))
+        and all(isinstance(value, str) for value in enum_values)
+    ):
+        return "ENUM(" + ", ".join(_quote_literal(v) for v in enum_values) + ")"
+    if pa.types.is_integer(arrow_type):
+        return _INTEGER_TYPES[str(arrow_type)]
+    if pa.types.is_boolean(arrow_type):
+        return "BOOLEAN"
+    if pa.types.is_float16(arrow_type) or pa.types.is_float32(arrow_type):
+        return "FLOAT"
+    if pa.types.is_float64(arrow_type):
+        return "DOUBLE"
+    if pa.types.is_decimal(arrow_type):
+        if arrow_type.precision > MAX_DECIMAL_PRECISION:
+            # Keep every digit rather than rounding to a double
+            return "VARCHAR"
+        return f"DECIMAL({arrow_type.precision}, {arrow_type.scale})"
+    if pa.types.is_timestamp(arrow_type):
+        if arrow_type.tz:
+            return "TIMESTAMPTZ"
+        # Nanosecond timestamps, the pandas default, keep DuckDB's standard
+        # microsecond TIMESTAMP rather than TIMESTAMP_NS
+        if arrow_type.unit == "ns":
+            return "TIMESTAMP"
+        return _TIMESTAMP_TYPES[arrow_type.unit]
+    if pa.types.is_date(arrow_type):
+        return "DATE"
+    if pa.types.is_time(arrow_type):
+        return "TIME"
+    if pa.types.is_duration(arrow_type) or pa.types.is_interval(arrow_type):
+        return "INTERVAL"
+    if (
+        pa.types.is_binary(arrow_type)
+        or pa.types.is_large_binary(arrow_type)
+        or pa.types.is_fixed_size_binary(arrow_type)
+    ):
+        return "BLOB"
+    if pa.types.is_map(arrow_type):
+        return (
+            f"MAP({duckdb_type(arrow_type.key_type)}, "
+            f"{duckdb_type(arrow_type.item_type)})"
+        )
+    if (
+        pa.types.is_list(arrow_type)
+        or pa.types.is_large_list(arrow_type)
+        or pa.types.is_fixed_size_list(arrow_type)
+    ):
+        return f"{duckdb_type(arrow_type.value_type)}[]"
+    if pa.types.is_struct(arrow_type):
+        fields = ", ".join(
+            f"{_quote_identifier(field.name)} {duckdb_type(field.type)}"
+            for field in arrow_type
+        )
+        return f"STRUCT({fields})"
+    return "VARCHAR"
+
+
+def column_types(
+    schema: pa.Schema, enum_columns: Optional[dict[str, list]] = None
+) -> dict[str, str]:
+    """Map the columns of an Arrow schema to DuckDB types.
+
+    Categorical and dictionary-encoded columns are VARCHAR, since later
+    pushes may hold categories that the data being pushed does not.
+
+    Args:
+        schema: The schema of the data being pushed
+        enum_columns: String columns to declare as ENUMs, with every value
+            they may ever hold
+
+    Returns:
+        Column name -> DuckDB type
+    """
+    enum_columns = enum_columns or {}
+    return {
+        field.name: duckdb_type(field.type, enum_columns.get(field.name))
+        for field in schema
+    }
+
+
+def null_columns(schema: pa.Schema, data=None) -> set[str]:
+    """Columns holding only nulls, which fit table columns of any type.
+
+    Args:
+        schema: The schema of the data being pushed
+        data: The data itself if it is in memory, to find the columns whose
+            type was inferred but whose values are all missing
+
+    Returns:
+        Names of the columns of the null type, or entirely null in data
+    """
+    names = {field.name for field in schema if pa.types.is_null(field.type)}
+    if isinstance(data, pd.DataFrame):
+        names.update(str(name) for name in data.columns[data.isna().all().to_numpy()])
+    elif isinstance(data, pa.Table):
+        names.update(
+            name
+            for name, column in zip(data.column_names, data.columns)
+            if column.null_count == len(column)
+        )
+    return names
+
+
+def _split_top_level(text: str) -> list[str]:
+    """Split on commas that are not nested in parentheses or quotes."""
+    parts, depth, quote, start = [], 0, None, 0
+    for i, char in enumerate(text):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "'\"":
+            quote = char
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            parts.append(text[start:i].strip())
+            start = i + 1
+    parts.append(text[start:].strip())
+    return [part for part in parts if part]
+
+
+def _split_field(text: str) -> tuple[str, str]:
+    """Split a STRUCT field into its (unquoted) name and its type."""
+    if text[0] == '"':
+        end = 1
+        while True:
+            end = text.index('"', end)
+            if text[end + 1 : end + 2] != '"':
+                break
+            end += 2
+        return text[1:end].replace('""', '"'), text[end + 1 :].strip()
+    name, _, type_name = text.partition(" ")
+    return name, type_name.strip()
+
+
+def arrow_type(duckdb_type_name: str) -> pa.DataType:
+    """The Arrow type holding values of a DuckDB column type, the reverse of `duckdb_type`.
+
+    Unknown types map to strings, which any value can be decoded into.
+    """
+    name = duckdb_type_name.strip()
+    if name.endswith("[]"):
+        return pa.list_(arrow_type(name[:-2]))
+    if re.fullmatch(r".+\[\d+\]", name):
+        inner, size = name[:-1].rsplit("[", 1)
+        return pa.list_(arrow_type(inner), int(size))
+
+    match = _PARAMETERIZED.match(name)
+    if match is None:
+        return _simple_arrow_types().get(name.upper(), pa.string())
+
+    kind, arguments = match.group(1).upper(), _split_top_level(match.group(2))
+    if kind in ("DECIMAL", "NUMERIC"):
+        precision = int(arguments[0])
+        scale = int(arguments[1]) if len(arguments) > 1 else 0
+        return pa.decimal128(precision, scale)
+    if kind == "ENUM":
+        return pa.dictionary(pa.int32(), pa.string())
+    if kind == "LIST":
+        return pa.list_(arrow_type(arguments[0]))
+    if kind == "MAP" and len(arguments) == 2:
+        return pa.map_(arrow_type(arguments[0]), arrow_type(arguments[1]))
+    if kind == "STRUCT":
+        fields = [_split_field(argument) for argument in arguments]
+        return pa.struct(
+            [
+                pa.field(field_name, arrow_type(type_name))
+                for field_name, type_name in fields
+            ]
+        )
+    # VARCHAR(n), CHAR(n) and other parameterized names
+    return _simple_arrow_types().get(kind, pa.string())
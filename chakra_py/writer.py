@@ -0,0 +1,276 @@
+from __future__ import annotations
+
+import atexit
+import threading
+import time
+import weakref
+from typing import Optional, Union
+
+from .lazy import lazy_import
+from .reports import PushResult
+
+pd = lazy_import("pandas")
+pa = lazy_import("pyarrow")
+
+DEFAULT_WRITER_MAX_ROWS = 500_000
+DEFAULT_WRITER_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_WRITER_MAX_AGE_SECONDS = 5.0
+# Writes block once this many times max_bytes are buffered or being pushed
+_BUFFER_FLUSHES = 4
+
+WriterData = Union["pd.DataFrame", "pa.Table", "pa.RecordBatch"]
+
+
+class BufferedWriter:
+    """Coalesce many small writes to a table into a few large pushes.
+
+    Rows are converted to Arrow when written and buffered in memory. A
+    background thread pushes the buffer as one table once it holds max_rows
+    rows or max_bytes bytes, or when its oldest rows are max_age seconds old,
+    so each push pays for its DDL, upload and import round trips once for
+    many writes. Writes block while the buffer is full, until a push drains
+    it.
+
+    A failed push keeps its rows in the buffer and pauses the background
+    thread: the error is raised by the next write, flush or close, after
+    which the rows are pushed again with the next flush.
+
+    Returned by `Chakra.writer`, which also closes its writers when the
+    client is closed. Writers still open when the interpreter exits are
+    flushed then.
+
+    Example:
+        >>> with client.writer("events", max_age=10) as writer:
+        ...     for batch in consume():
+        ...         writer.write(batch)
+    """
+
+    def __init__(
+        self,
+        client,
+        table_name: str,
+        max_rows: int = DEFAULT_WRITER_MAX_ROWS,
+        max_bytes: int = DEFAULT_WRITER_MAX_BYTES,
+        max_age: float = DEFAULT_WRITER_MAX_AGE_SECONDS,
+        max_buffer_bytes: Optional[int] = None,
+        **push_options,
+    ):
+        """Initialize the writer and start its background thread.
+
+        Args:
+            client: The Chakra client pushing the rows
+            table_name: Simple or fully qualified (database.schema.table) table name
+            max_rows: Push once this many rows are buffered
+            max_bytes: Push once the buffered rows take this many bytes in memory
+            max_age: Push rows at the latest this many seconds after they were
+                written
+            max_buffer_bytes: Block writes while this many bytes are buffered
+                or being pushed, by default 4 times max_bytes
+            **push_options: Passed on to `Chakra.push`, e.g. dedupe_on_append
+                and primary_key_columns
+        """
+        if push_options.get("replace_if_exists"):
+            raise ValueError(
+                "replace_if_exists is not supported by writers, each push would drop the last"
+            )
+        if max_rows <= 0 or max_bytes <= 0 or max_age <= 0:
+            raise ValueError("max_rows, max_bytes and max_age must be positive")
+        self.table_name = table_name
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.max_buffer_bytes = max_buffer_bytes or _BUFFER_FLUSHES * max_bytes
+        self.rows_written = 0
+        self.results: list[PushResult] = []
+        self._client = client
+        self._push_options = push_options
+
+        self._condition = threading.Condition()
+        self._buffer: list[pa.Table] = []
+        self._buffered_rows = 0
+        self._buffered_bytes = 0
+        self._pushing = False
+        self._pushing_bytes = 0
+        self._schema: Optional[pa.Schema] = None
+        # When the oldest buffered rows were written, per time.monotonic
+        self._oldest: Optional[float] = None
+        self._flush_requested = False
+        self._closed = False
+        self._error: Optional[Exception] = None
+
+        self._thread = threading.Thread(
+            target=self._run, name=f"chakra-writer-{table_name}", daemon=True
+        )
+        self._thread.start()
+        _open_writers.add(self)
+
+    def __enter__(self) -> "BufferedWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def buffered_rows(self) -> int:
+        """Rows written and waiting for a push, not counting those being pushed."""
+        with self._condition:
+            return self._buffered_rows
+
+    def write(self, data: WriterData) -> None:
+        """Add rows to the buffer, blocking while it is full.
+
+        Args:
+            data: A DataFrame, pyarrow Table or RecordBatch whose columns
+                match the rows written before
+
+        Raises:
+            ValueError: If the columns cannot be combined with earlier rows
+            Exception: The error of a failed background push
+        """
+        table = _to_table(data)
+        if table.num_rows == 0:
+            return
+        with self._condition:
+            self._raise_error()
+            if self._closed:
+                raise ValueError("Cannot write to a closed writer")
+            self._schema = _unify(self._schema, table.schema)
+            while (
+                self._buffered_bytes + self._pushing_bytes >= self.max_buffer_bytes
+                and self._error is None
+            ):
+                self._condition.wait()
+            self._raise_error()
+
+            self._buffer.append(table)
+            self._buffered_rows += table.num_rows
+            self._buffered_bytes += table.nbytes
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            self._condition.notify_all()
+
+    def flush(self) -> None:
+        """Push the rows written so far and wait until they are imported.
+
+        Raises:
+            Exception: The error of a failed push
+        """
+        with self._condition:
+            self._raise_error()
+            self._flush_requested = True
+            self._condition.notify_all()
+            while (self._buffer or self._pushing) and self._error is None:
+                self._condition.wait()
+            self._flush_requested = False
+            self._raise_error()
+
+    def close(self) -> None:
+        """Push the remaining rows and stop the background thread.
+
+        Raises:
+            Exception: The error of the last failed push, after which the
+                rows it could not push are dropped
+        """
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            # Retry rows left by an earlier failure one last time
+            self._error = None
+            self._condition.notify_all()
+        self._thread.join()
+        _open_writers.discard(self)
+        with self._condition:
+            self._raise_error()
+
+    def _raise_error(self) -> None:
+        """Raise the error of a failed push once, letting its rows be retried."""
+        error, self._error = self._error, None
+        if error is not None:
+            self._condition.notify_all()
+            raise error
+
+    def _due(self) -> bool:
+        """Whether the buffer should be pushed now. Called with the lock held."""
+        if not self._buffer or self._error is not None:
+            return False
+        return (
+            self._closed
+            or self._flush_requested
+            or self._buffered_rows >= self.max_rows
+            or self._buffered_bytes >= self.max_bytes
+            or time.monotonic() - self._oldest >= self.max_age
+        )
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._due():
+                    if self._closed and (not self._buffer or self._error):
+                        return
+                    timeout = None
+                    if self._oldest is not None and self._error is None:
+                        timeout = max(self._oldest + self.max_age - time.monotonic(), 0)
+                    self._condition.wait(timeout)
+                tables, self._buffer = self._buffer, []
+                rows, self._buffered_rows = self._buffered_rows, 0
+                self._pushing_bytes, self._buffered_bytes = self._buffered_bytes, 0
+                self._oldest = None
+                self._pushing = True
+
+            try:
+                table = pa.concat_tables(tables, promote_options="permissive")
+                result = self._client.push(self.table_name, table, **self._push_options)
+            except Exception as e:
+                with self._condition:
+                    # Put the rows back in front of those written meanwhile
+                    self._buffer[:0] = tables
+                    self._buffered_rows += rows
+                    self._buffered_bytes += self._pushing_bytes
+                    self._oldest = time.monotonic()
+                    self._error = e
+            else:
+                with self._condition:
+                    self.rows_written += rows
+                    self.results.append(result)
+            finally:
+                with self._condition:
+                    self._pushing = False
+                    self._pushing_bytes = 0
+                    self._condition.notify_all()
+
+
+# Writer threads are daemons, so that a writer left open cannot keep the
+# interpreter alive, and their rows are flushed at exit instead
+_open_writers: weakref.WeakSet[BufferedWriter] = weakref.WeakSet()
+
+
+@atexit.register
+def _close_open_writers() -> None:
+    for writer in list(_open_writers):
+        try:
+            writer.close()
+        except Exception:
+            pass
+
+
+def _to_table(data: WriterData) -> pa.Table:
+    if isinstance(data, pa.Table):
+        return data
+    if isinstance(data, pa.RecordBatch):
+        return pa.Table.from_batches([data])
+    if isinstance(data, pd.DataFrame):
+        return pa.Table.from_pandas(data, preserve_index=False)
+    raise TypeError(
+        f"Writers accept DataFrames, pyarrow Tables and RecordBatches, not {type(data).__name__}"
+    )
+
+
+def _unify(schema: Optional[pa.Schema], other: pa.Schema) -> pa.Schema:
+    """The schema of the rows buffered so far once other rows are added."""
+    if schema is None or schema.equals(other):
+        return other
+    try:
+        return pa.unify_schemas([schema, other], promote_options="permissive")
+    except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+        raise ValueError(f"Rows do not match the columns written before: {e}") from e
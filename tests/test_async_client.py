@@ -0,0 +1,176 @@
+import asyncio
+import io
+import json
+
+import pandas as pd
+import pytest
+
+from chakra_py import AsyncChakra, RetryPolicy
+
+httpx = pytest.importorskip("httpx")
+
+
+class MockChakraServer:
+    """In-process stand-in for the Chakra API and the presigned upload target."""
+
+    def __init__(self):
+        self.requests = []
+        self.uploads = {}
+        self.token_fetches = 0
+        self.valid_token = "DDB_token1"
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        path = request.url.path
+
+        if path == "/api/v1/servers":
+            self.token_fetches += 1
+            return httpx.Response(200, json={"token": self.valid_token})
+        if request.url.host == "uploads.test":
+            assert "Authorization" not in request.headers
+            self.uploads[path] = request.content
+            return httpx.Response(200)
+        if request.headers.get("Authorization") != f"Bearer {self.valid_token}":
+            return httpx.Response(401, json={"error": "stale token"})
+        if path == "/api/v1/query":
+            body = json.loads(request.content)
+            if body["sql"].startswith("SELECT"):
+                return httpx.Response(
+                    200,
+                    json={"columns": ["id", "sql"], "rows": [[1, body["sql"]]]},
+                )
+            return httpx.Response(200, json={})
+        if path == "/api/v1/presigned-upload":
+            name = request.url.params["filename"]
+            return httpx.Response(
+                200,
+                json={"presignedUrl": f"https://uploads.test/{name}", "key": name},
+            )
+        return httpx.Response(200, json={})
+
+    def client(self) -> AsyncChakra:
+        return AsyncChakra(
+            "access:secret:username",
+            quiet=True,
+            transport=httpx.MockTransport(self.handler),
+        )
+
+
+def test_async_execute_logs_in_and_builds_dataframe():
+    """Test that execute logs in lazily and returns a DataFrame."""
+    server = MockChakraServer()
+
+    async def run():
+        async with server.client() as client:
+            return await client.execute("SELECT $1, $1", [5])
+
+    df = asyncio.run(run())
+    assert list(df.columns) == ["id", "sql"]
+    assert df["sql"][0] == "SELECT ?, ?"
+    assert server.token_fetches == 1
+    query = json.loads(server.requests[-1].content)
+    assert query == {"sql": "SELECT ?, ?", "parameters": [5, 5]}
+
+
+def test_async_executemany_reuses_prepared_statement():
+    """Test a prepared UPDATE runs once per parameter set, in order."""
+    server = MockChakraServer()
+
+    async def run():
+        async with server.client() as client:
+            update = client.prepare("UPDATE t SET v = $2 WHERE id = $1")
+            return await update.executemany([(1, "a"), (2, "b")])
+
+    assert asyncio.run(run()) == 2
+    queries = [json.loads(request.content) for request in server.requests[1:]]
+    assert queries == [
+        {"sql": "UPDATE t SET v = ? WHERE id = ?", "parameters": ["a", 1]},
+        {"sql": "UPDATE t SET v = ? WHERE id = ?", "parameters": ["b", 2]},
+    ]
+
+
+def test_async_concurrent_401s_share_one_login():
+    """Test that concurrent queries with a stale token trigger a single re-login."""
+    server = MockChakraServer()
+
+    async def run():
+        async with server.client() as client:
+            await client.login()
+            server.valid_token = "DDB_token2"
+            return await asyncio.gather(
+                *(client.execute(f"SELECT {i}") for i in range(10))
+            )
+
+    frames = asyncio.run(run())
+    assert [df["sql"][0] for df in frames] == [f"SELECT {i}" for i in range(10)]
+    assert server.token_fetches == 2
+
+
+def test_async_push_uploads_parts_and_imports():
+    """Test that push creates the table, uploads every part and imports them in order."""
+    server = MockChakraServer()
+    df = pd.DataFrame({"id": range(5), "name": list("abcde")})
+
+    async def run():
+        async with server.client() as client:
+            await client.push("db.schema.table", df, chunk_size=2)
+
+    asyncio.run(run())
+
+    sql = [
+        json.loads(r.content)["sql"]
+        for r in server.requests
+        if r.url.path == "/api/v1/query"
+    ]
+    assert sql == [
+        "CREATE SCHEMA IF NOT EXISTS db.schema",
+        "CREATE TABLE IF NOT EXISTS db.schema.table (id BIGINT, name VARCHAR)",
+    ]
+
+    assert len(server.uploads) == 3
+    uploaded = pd.concat(
+        pd.read_parquet(io.BytesIO(server.uploads[path]))
+        for path in sorted(server.uploads)
+    )
+    pd.testing.assert_frame_equal(uploaded.reset_index(drop=True), df)
+
+    imported = [
+        json.loads(r.content)["s3_key"]
+        for r in server.requests
+        if r.url.path == "/api/v1/tables/s3_parquet_import"
+    ]
+    assert imported == sorted(imported) and len(imported) == 3
+    deleted = [r for r in server.requests if r.method == "DELETE"]
+    assert len(deleted) == 3
+
+
+def test_async_push_streams_parts_and_resends_them_on_retry():
+    """Test that parts are streamed with their length and resent whole on retry."""
+    server = MockChakraServer()
+    handler = server.handler
+    failures = []
+
+    def flaky_handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host == "uploads.test" and not failures:
+            failures.append(request.content)
+            return httpx.Response(503)
+        return handler(request)
+
+    df = pd.DataFrame({"id": range(5)})
+
+    async def run():
+        async with AsyncChakra(
+            "access:secret:username",
+            quiet=True,
+            transport=httpx.MockTransport(flaky_handler),
+            retry_policy=RetryPolicy(backoff=0, jitter=False),
+        ) as client:
+            await client.push("db.schema.table", df, method="parquet")
+
+    asyncio.run(run())
+
+    [upload] = [r for r in server.requests if r.url.host == "uploads.test"]
+    assert "Transfer-Encoding" not in upload.headers
+    assert upload.headers["Content-Length"] == str(len(upload.content))
+    assert failures == [upload.content]
+    pd.testing.assert_frame_equal(pd.read_parquet(io.BytesIO(upload.content)), df)
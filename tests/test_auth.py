@@ -0,0 +1,127 @@
+import base64
+import gc
+import json
+import os
+import stat
+import time
+import weakref
+from unittest.mock import Mock, patch
+
+import pytest
+
+from chakra_py import Chakra, TokenCache
+from chakra_py.protocol import token_expiry
+
+
+def test_token_expiry():
+    """Test expiry is read from the token response or a JWT token."""
+    now = time.time()
+    assert token_expiry({"expiresIn": 60}, "DDB_x") == pytest.approx(now + 60, abs=5)
+    assert token_expiry({"expiresAt": "2030-01-01T00:00:00Z"}, "DDB_x") == 1893456000
+    assert token_expiry({"expiresAt": 1893456000000}, "DDB_x") == 1893456000
+
+    claims = base64.urlsafe_b64encode(json.dumps({"exp": 1893456000}).encode())
+    jwt = f"DDB_header.{claims.decode().rstrip('=')}.signature"
+    assert token_expiry({}, jwt) == 1893456000
+    assert token_expiry({}, "DDB_opaque") is None
+
+
+def test_token_cache_roundtrip(tmp_path):
+    """Test tokens are shared through the file until they expire."""
+    path = tmp_path / "tokens.json"
+    TokenCache(path).store("access:secret:user", "DDB_a", time.time() + 3600)
+    TokenCache(path).store("access:other:user", "DDB_b", time.time() + 30)
+    TokenCache(path).store("access:opaque:user", "DDB_c", None)
+
+    cache = TokenCache(path, max_age=0)
+    assert cache.load("access:secret:user")[0] == "DDB_a"
+    # Expiring within the refresh margin, or of unknown age beyond max_age
+    assert cache.load("access:other:user") is None
+    assert cache.load("access:opaque:user") is None
+    assert TokenCache(path).load("access:opaque:user") == ("DDB_c", None)
+
+    assert "secret" not in path.read_text()
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+
+def mock_api(mock_session, token_bodies):
+    """Answer token requests with token_bodies in turn, and queries with a row."""
+    session = mock_session.return_value
+    session.headers = {}
+    token_bodies = iter(token_bodies)
+    sent = []
+
+    def post(url, json=None, **kwargs):
+        response = Mock(status_code=200)
+        if url.endswith("/servers"):
+            sent.append("login")
+            response.json.return_value = next(token_bodies)
+        else:
+            sent.append(session.headers["Authorization"])
+            response.json.return_value = {"columns": ["a"], "rows": [[1]]}
+        return response
+
+    session.post.side_effect = post
+    return sent
+
+
+@patch("requests.Session")
+def test_token_cache_skips_login(mock_session, tmp_path):
+    """Test a process reuses a cached token instead of logging in."""
+    sent = mock_api(mock_session, [{"token": "DDB_fresh", "expiresIn": 3600}])
+    cache = TokenCache(tmp_path / "tokens.json")
+    cache.store("access:secret:username", "DDB_cached", time.time() + 3600)
+
+    client = Chakra("access:secret:username", quiet=True, token_cache=cache)
+    client.execute("SELECT 1")
+    client.close()
+
+    assert sent == ["Bearer DDB_cached"]
+
+
+@patch("requests.Session")
+def test_expiring_token_refreshed_before_call(mock_session):
+    """Test a token about to expire is replaced before sending the next call."""
+    sent = mock_api(
+        mock_session,
+        [
+            {"token": "DDB_old", "expiresIn": 30},
+            {"token": "DDB_new", "expiresIn": 3600},
+        ],
+    )
+
+    with patch("chakra_py.client.threading.Timer") as mock_timer:
+        with Chakra("access:secret:username", quiet=True) as client:
+            client.login()
+            client.execute("SELECT 1")
+
+    assert sent == ["login", "login", "Bearer DDB_new"]
+    # The background refresh is scheduled a margin ahead of the expiry
+    delay = mock_timer.call_args[0][0]
+    assert delay == pytest.approx(3600 - 60, abs=5)
+    mock_timer.return_value.cancel.assert_called()
+
+
+@patch("requests.Session")
+def test_background_refresh_lets_unclosed_client_be_collected(mock_session):
+    """Test the refresh timer neither keeps a client alive nor logs in for it."""
+    sent = mock_api(
+        mock_session,
+        [
+            {"token": "DDB_old", "expiresIn": 3600},
+            {"token": "DDB_new", "expiresIn": 3600},
+        ],
+    )
+
+    with patch("chakra_py.client.threading.Timer") as mock_timer:
+        client = Chakra("access:secret:username", quiet=True)
+        client.login()
+        callback, args = mock_timer.call_args[0][1], mock_timer.call_args[1]["args"]
+        client_ref = weakref.ref(client)
+        del client
+        gc.collect()
+
+        assert client_ref() is None
+        callback(*args)
+
+    assert sent == ["login"]
@@ -0,0 +1,56 @@
+from unittest.mock import patch
+
+import pandas as pd
+import pyarrow as pa
+
+from chakra_py.cache import QueryCache, is_cacheable, normalize_sql, write_targets
+
+
+def test_normalize_sql_keeps_literals():
+    """Test whitespace is collapsed everywhere but inside quotes."""
+    assert normalize_sql("SELECT  *\n FROM t ;") == "select * from t"
+    assert normalize_sql("SELECT 'A  b' FROM \"T\"") == "select 'A  b' from \"T\""
+    assert is_cacheable("  with x AS (SELECT 1) SELECT * FROM x")
+    assert not is_cacheable("INSERT INTO t SELECT * FROM s")
+    assert not is_cacheable("WITH x AS (SELECT 1) INSERT INTO t SELECT * FROM x")
+    assert not is_cacheable("with x as (select 1) delete from t using x")
+    assert is_cacheable("WITH x AS (SELECT 'update' AS \"delete\") SELECT * FROM x")
+    assert write_targets('DROP TABLE IF EXISTS "db".main.t') == ["db.main.t"]
+
+
+def test_lru_eviction_and_ttl():
+    """Test entries are evicted least recently used first and expire after the TTL."""
+    frame = pd.DataFrame({"id": range(100)})
+    nbytes = int(frame.memory_usage(index=True, deep=True).sum())
+    cache = QueryCache(ttl=10, max_bytes=2 * nbytes)
+
+    with patch("chakra_py.cache.time.monotonic", return_value=0):
+        cache.put("SELECT 1", frame)
+        cache.put("SELECT 2", frame)
+        assert cache.get("SELECT 1") is not None
+        cache.put("SELECT 3", frame)
+
+        assert cache.get("SELECT 2") is None
+        assert cache.get("SELECT 1") is not None
+        assert cache.stats["evictions"] == 1
+
+    with patch("chakra_py.cache.time.monotonic", return_value=11):
+        assert cache.get("SELECT 1") is None
+    assert cache.stats["entries"] == 1
+
+
+def test_disk_tier_and_invalidation(tmp_path):
+    """Test results survive a new cache instance and writes invalidate them."""
+    table = pa.table({"id": [1, 2]})
+    QueryCache(directory=str(tmp_path)).put(
+        "SELECT * FROM db.main.users", table, return_type="arrow"
+    )
+
+    cache = QueryCache(directory=str(tmp_path))
+    assert cache.get("SELECT * FROM db.main.users", return_type="arrow") == table
+    # Results are keyed by return type as well
+    assert cache.get("SELECT * FROM db.main.users") is None
+
+    cache.put("DELETE FROM users WHERE id = 1", None)
+    assert cache.get("SELECT * FROM db.main.users", return_type="arrow") is None
+    assert not list(tmp_path.glob("*.parquet"))
@@ -1,10 +1,27 @@
+import io
+import json
+import os
+import subprocess
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest.mock import Mock, patch
 
 import pandas as pd
+import pyarrow as pa
 import pytest
 import requests
 
-from chakra_py import Chakra
+from chakra_py import (
+    Chakra,
+    Instrumentation,
+    ParquetOptions,
+    PushJournal,
+    QueryCache,
+    ResultOptions,
+    SpanCollector,
+)
+from chakra_py.exceptions import ChakraAPIError
 
 
 def test_client_initialization():
@@ -14,6 +31,24 @@ def test_client_initialization():
     assert isinstance(client._session, requests.Session)
 
 
+def test_quiet_client_skips_heavy_imports():
+    """Test that importing and constructing a quiet client loads no data libraries."""
+    script = (
+        "import sys\n"
+        "from chakra_py import Chakra\n"
+        "Chakra('access:secret:username', quiet=True)\n"
+        "print(sorted(m for m in ('pandas', 'pyarrow', 'tqdm', 'httpx') if m in sys.modules))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        check=True,
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    ).stdout
+    assert output.strip() == "[]"
+
+
 @patch("requests.Session")
 def test_auth_login(mock_session):
     """Test authentication login."""
@@ -72,9 +107,8 @@ def test_query_execution(mock_session):
 
 
 @patch("uuid.uuid4")
-@patch("requests.put")
 @patch("requests.Session")
-def test_data_push(mock_session, mock_requests_put, mock_uuid4):
+def test_data_push(mock_session, mock_uuid4):
     """Test data push functionality."""
     mock_uuid = "fake-uuid-1234"
     mock_uuid4.return_value = mock_uuid
@@ -105,7 +139,7 @@ def test_data_push(mock_session, mock_requests_put, mock_uuid4):
         Mock(status_code=200),  # For delete
     ]
 
-    mock_requests_put.return_value = Mock(status_code=200)
+    mock_session.return_value.put.return_value = Mock(status_code=200)
 
     # Create test DataFrame
     df = pd.DataFrame({"id": [1, 2], "name": ["test1", "test2"]})
@@ -115,7 +149,7 @@ def test_data_push(mock_session, mock_requests_put, mock_uuid4):
     client.login()  # This will consume the first mock response
 
     # Now test pushing data
-    client.push("test_database.test_schema.test_table", df)
+    client.push("test_database.test_schema.test_table", df, method="parquet")
 
     # 1. Verify the presigned URL GET request
     presigned_get_call = mock_session.return_value.get.call_args
@@ -126,10 +160,14 @@ def test_data_push(mock_session, mock_requests_put, mock_uuid4):
     )
 
     # 2. Verify the S3 upload was called with correct parameters
-    mock_requests_put.assert_called_once()
-    put_args = mock_requests_put.call_args
+    mock_session.return_value.put.assert_called_once()
+    put_args = mock_session.return_value.put.call_args
     assert put_args[0][0] == "https://fake-s3-url.com"
-    assert put_args[1]["headers"] == {"Content-Type": "application/parquet"}
+    # The upload reuses the session's connections but not its API token
+    assert put_args[1]["headers"] == {
+        "Content-Type": "application/parquet",
+        "Authorization": None,
+    }
     assert "data" in put_args[1]
 
     # 3. Verify the create database request
@@ -166,3 +204,785 @@ def test_data_push(mock_session, mock_requests_put, mock_uuid4):
     delete_call = mock_session.return_value.delete.call_args
     assert delete_call[0][0] == "https://api.chakra.dev/api/v1/files"
     assert delete_call[1]["json"] == {"fileName": "fake-s3-key"}
+
+
+@pytest.fixture
+def upload_server():
+    """Local stand-in for the presigned upload target.
+
+    Stores every PUT body by path and fails the first attempt for any path
+    listed in ``fail_once`` with a 503.
+    """
+    uploads, attempts, fail_once = {}, {}, set()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_PUT(self):
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            attempts[self.path] = attempts.get(self.path, 0) + 1
+            if self.path in fail_once and attempts[self.path] == 1:
+                self.send_response(503)
+            else:
+                uploads[self.path] = body
+                self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.uploads, server.attempts, server.fail_once = uploads, attempts, fail_once
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@patch("chakra_py.retry.time.sleep")
+@patch("requests.Session")
+def test_chunked_push_uploads_parts_in_parallel(
+    mock_session, mock_sleep, upload_server
+):
+    """Test that a chunked push uploads, retries and imports every part."""
+    mock_session.return_value.headers = {}
+    mock_auth_response = Mock()
+    mock_auth_response.json.return_value = {"token": "DDB_test123"}
+    mock_session.return_value.post.return_value = mock_auth_response
+
+    def presigned_response(url):
+        part = url.rsplit("_part", 1)[1].split(".")[0]
+        response = Mock()
+        response.json.return_value = {
+            "presignedUrl": f"{upload_server.url}/part-{part}",
+            "key": f"key-{part}",
+        }
+        return response
+
+    mock_session.return_value.get.side_effect = presigned_response
+    # Send the uploads for real, to the local server
+    mock_session.return_value.put.side_effect = requests.put
+    upload_server.fail_once.add("/part-00001")
+
+    df = pd.DataFrame({"id": range(10), "name": [f"name{i}" for i in range(10)]})
+
+    client = Chakra("access:secret:username", quiet=True)
+    client.login()
+    client.push("db.schema.table", df, chunk_size=4, max_workers=2)
+
+    # Three parts of 4, 4 and 2 rows, the second one retried once
+    assert sorted(upload_server.uploads) == [
+        "/part-00000",
+        "/part-00001",
+        "/part-00002",
+    ]
+    assert upload_server.attempts["/part-00001"] == 2
+    mock_sleep.assert_called_once()
+
+    uploaded = pd.concat(
+        pd.read_parquet(io.BytesIO(upload_server.uploads[path]))
+        for path in sorted(upload_server.uploads)
+    )
+    pd.testing.assert_frame_equal(uploaded.reset_index(drop=True), df)
+
+    # Parts are imported and cleaned up in order
+    import_calls = [
+        c
+        for c in mock_session.return_value.post.call_args_list
+        if c[0][0].endswith("/tables/s3_parquet_import")
+    ]
+    assert [c[1]["json"]["s3_key"] for c in import_calls] == [
+        "key-00000",
+        "key-00001",
+        "key-00002",
+    ]
+    delete_calls = mock_session.return_value.delete.call_args_list
+    assert [c[1]["json"]["fileName"] for c in delete_calls] == [
+        "key-00000",
+        "key-00001",
+        "key-00002",
+    ]
+
+
+@patch("requests.Session")
+def test_streaming_push_from_dataframe_iterator(mock_session, upload_server):
+    """Test that an iterator of DataFrames is encoded and uploaded part by part."""
+    mock_session.return_value.headers = {}
+    mock_auth_response = Mock()
+    mock_auth_response.json.return_value = {"token": "DDB_test123"}
+    mock_session.return_value.post.return_value = mock_auth_response
+
+    def presigned_response(url):
+        part = url.rsplit("_part", 1)[1].split(".")[0]
+        response = Mock()
+        response.json.return_value = {
+            "presignedUrl": f"{upload_server.url}/part-{part}",
+            "key": f"key-{part}",
+        }
+        return response
+
+    mock_session.return_value.get.side_effect = presigned_response
+    # Send the uploads for real, to the local server
+    mock_session.return_value.put.side_effect = requests.put
+
+    def frames():
+        for start in range(0, 9, 3):
+            yield pd.DataFrame(
+                {"id": range(start, start + 3), "score": [0.5] * 3},
+            )
+
+    client = Chakra("access:secret:username", quiet=True)
+    client.login()
+    client.push("db.schema.table", frames(), chunk_size=5)
+
+    # The table schema is inferred from the first frame of the stream
+    create_table_call = [
+        c
+        for c in mock_session.return_value.post.call_args_list
+        if c[1].get("json", {}).get("sql", "").startswith("CREATE TABLE")
+    ][0]
+    assert create_table_call[1]["json"]["sql"] == (
+        "CREATE TABLE IF NOT EXISTS db.schema.table (id BIGINT, score DOUBLE)"
+    )
+
+    # 9 rows streamed into parts of 5 and 4 rows
+    assert sorted(upload_server.uploads) == ["/part-00000", "/part-00001"]
+    part_rows = [
+        len(pd.read_parquet(io.BytesIO(upload_server.uploads[path])))
+        for path in sorted(upload_server.uploads)
+    ]
+    assert part_rows == [5, 4]
+
+
+@patch("requests.Session")
+def test_query_execution_arrow(mock_session):
+    """Test the Arrow result path for both JSON and Arrow IPC responses."""
+    mock_session.return_value.headers = {}
+    mock_auth_response = Mock()
+    mock_auth_response.json.return_value = {"token": "DDB_test123"}
+
+    mock_json_response = Mock(headers={"Content-Type": "application/json"})
+    mock_json_response.json.return_value = {
+        "columns": ["id", "name"],
+        "rows": [[1, "test"], [2, "test2"]],
+    }
+
+    table = pa.Table.from_pydict({"id": [1, 2], "name": ["test", "test2"]})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    mock_arrow_response = Mock(
+        headers={"Content-Type": "application/vnd.apache.arrow.stream"},
+        content=sink.getvalue().to_pybytes(),
+    )
+
+    mock_session.return_value.post.side_effect = [
+        mock_auth_response,
+        mock_json_response,
+        mock_arrow_response,
+    ]
+
+    client = Chakra("access:secret:username", quiet=True)
+    client.login()
+
+    df = client.execute("SELECT * FROM test_table", dtype_backend="pyarrow")
+    assert list(df.columns) == ["id", "name"]
+    assert isinstance(df["id"].dtype, pd.ArrowDtype)
+    query_call = mock_session.return_value.post.call_args
+    assert query_call[1]["headers"]["Accept"].startswith(
+        "application/vnd.apache.arrow.stream"
+    )
+
+    assert client.execute_arrow("SELECT * FROM test_table").equals(table)
+
+
+@patch("requests.Session")
+def test_query_execution_iter(mock_session):
+    """Test streaming results chunk by chunk from JSON and Arrow IPC responses."""
+    mock_session.return_value.headers = {}
+    mock_auth_response = Mock()
+    mock_auth_response.json.return_value = {"token": "DDB_test123"}
+
+    body = json.dumps(
+        {"columns": ["id", "name"], "rows": [[i, f"name{i}"] for i in range(5)]}
+    ).encode()
+    mock_json_response = Mock(headers={"Content-Type": "application/json"})
+    mock_json_response.iter_content.return_value = [body[:10], body[10:]]
+
+    table = pa.Table.from_pydict({"id": [1, 2], "name": ["test", "test2"]})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    mock_arrow_response = Mock(
+        headers={"Content-Type": "application/vnd.apache.arrow.stream"},
+        raw=io.BytesIO(sink.getvalue().to_pybytes()),
+    )
+
+    mock_session.return_value.post.side_effect = [
+        mock_auth_response,
+        mock_json_response,
+        mock_arrow_response,
+    ]
+
+    client = Chakra("access:secret:username", quiet=True)
+    client.login()
+
+    chunks = list(client.execute_iter("SELECT * FROM test_table", chunk_size=2))
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert list(chunks[0].columns) == ["id", "name"]
+    assert mock_session.return_value.post.call_args[1]["stream"] is True
+    mock_json_response.close.assert_called_once()
+
+    batches = list(client.execute_iter("SELECT * FROM test_table", return_type="arrow"))
+    assert pa.Table.from_batches(batches).equals(table)
+
+
+@patch("requests.Session")
+def test_query_execution_iter_paginated(mock_session):
+    """Test paginating results with LIMIT/OFFSET until a short page is returned."""
+    mock_session.return_value.headers = {}
+    mock_auth_response = Mock()
+    mock_auth_response.json.return_value = {"token": "DDB_test123"}
+
+    pages = []
+    for rows in ([[1], [2]], [[3]]):
+        page = Mock()
+        page.json.return_value = {"columns": ["id"], "rows": rows}
+        pages.append(page)
+    mock_session.return_value.post.side_effect = [mock_auth_response] + pages
+
+    client = Chakra("access:secret:username", quiet=True)
+    client.login()
+
+    chunks = list(
+        client.execute_iter(
+            "SELECT id FROM t WHERE id > $1;", [0], chunk_size=2, paginate=True
+        )
+    )
+    assert [chunk["id"].tolist() for chunk in chunks] == [[1, 2], [3]]
+
+    page_calls = mock_session.return_value.post.call_args_list[1:]
+    assert [c[1]["json"] for c in page_calls] == [
+        {
+            "sql": "SELECT * FROM (SELECT id FROM t WHERE id > ?) AS page LIMIT 2 OFFSET 0",
+            "parameters": [0],
+        },
+        {
+            "sql": "SELECT * FROM (SELECT id FROM t WHERE id > ?) AS page LIMIT 2 OFFSET 2",
+            "parameters": [0],
+        },
+    ]
+
+
+@patch("requests.Session")
+def test_execute_many_shares_token_refresh(mock_session):
+    """Test concurrent queries keep their order, isolate errors and re-login once."""
+    session = mock_session.return_value
+    session.headers = {}
+    tokens = iter(["DDB_old", "DDB_new"])
+    token_fetches = []
+    stale_barrier = threading.Barrier(4, timeout=5)
+
+    def response(status_code, body):
+        response = Mock(status_code=status_code)
+        response.json.return_value = body
+        if status_code >= 400:
+            response.raise_for_status.side_effect = requests.exceptions.HTTPError(
+                response=response
+            )
+        return response
+
+    def post(url, json=None, **kwargs):
+        if url.endswith("/servers"):
+            token_fetches.append(1)
+            return response(200, {"token": next(tokens)})
+        if session.headers["Authorization"] == "Bearer DDB_old":
+            # Make every query observe the stale token before any re-login
+            stale_barrier.wait()
+            return response(401, {"error": "stale token"})
+        if "broken" in json["sql"]:
+            return response(400, {"error": "syntax error"})
+        return response(200, {"columns": ["sql"], "rows": [[json["sql"]]]})
+
+    session.post.side_effect = post
+
+    client = Chakra("access:secret:username", quiet=True)
+    results = client.execute_many(
+        ["SELECT 1", "SELECT broken", ("SELECT $1", [3]), "SELECT 4"],
+        max_workers=4,
+    )
+
+    assert len(token_fetches) == 2
+    assert results[0]["sql"][0] == "SELECT 1"
+    assert isinstance(results[1], ChakraAPIError)
+    assert results[1].message == "syntax error"
+    assert results[2]["sql"][0] == "SELECT ?"
+    assert results[3]["sql"][0] == "SELECT 4"
+
+
+@patch("requests.Session")
+def test_query_cache_skips_round_trip(mock_session):
+    """Test repeated queries are served from the cache until a write invalidates them."""
+    session = mock_session.return_value
+    session.headers = {}
+    queries = []
+
+    def post(url, json=None, **kwargs):
+        response = Mock()
+        if url.endswith("/servers"):
+            response.json.return_value = {"token": "DDB_token"}
+        else:
+            queries.append(json["sql"])
+            response.json.return_value = {"columns": ["id"], "rows": [[len(queries)]]}
+        return response
+
+    session.post.side_effect = post
+
+    client = Chakra("access:secret:username", quiet=True, cache=QueryCache())
+    first = client.execute("SELECT id FROM users")
+    first.loc[0, "id"] = -1  # Mutating a result must not corrupt the cache
+    second = client.execute("select id\n  FROM users;")
+
+    assert queries == ["SELECT id FROM users"]
+    assert second["id"][0] == 1
+    assert client.cache.stats["hits"] == 1
+
+    client.execute("INSERT INTO users VALUES (2)")
+    client.execute("SELECT id FROM users")
+    assert len(queries) == 3
+
+
+@patch("requests.Session")
+def test_shared_query_cache_is_scoped_by_account(mock_session, tmp_path):
+    """Test cache hits skip logging in, and accounts never see each other's results."""
+    session = mock_session.return_value
+    session.headers = {}
+    logins = []
+
+    def post(url, json=None, **kwargs):
+        response = Mock()
+        if url.endswith("/servers"):
+            logins.append(json)
+            response.json.return_value = {"token": "DDB_token"}
+        else:
+            response.json.return_value = {"columns": ["n"], "rows": [[len(logins)]]}
+        return response
+
+    session.post.side_effect = post
+
+    first = Chakra(
+        "access:first:username", quiet=True, cache=QueryCache(directory=tmp_path)
+    )
+    assert first.execute("SELECT n FROM t")["n"][0] == 1
+    assert len(logins) == 1
+
+    # A new client of the same account is served from the shared disk tier
+    # without logging in
+    same = Chakra(
+        "access:first:username", quiet=True, cache=QueryCache(directory=tmp_path)
+    )
+    assert same.execute("SELECT n FROM t")["n"][0] == 1
+    assert same.token is None and len(logins) == 1
+
+    other = Chakra(
+        "access:second:username", quiet=True, cache=QueryCache(directory=tmp_path)
+    )
+    assert other.execute("SELECT n FROM t")["n"][0] == 2
+    assert len(logins) == 2
+
+
+@patch("requests.Session")
+def test_query_result_options_shrink_and_report_memory(mock_session):
+    """Test result options type the columns and the result's memory is reported."""
+    mock_session.return_value.headers = {}
+    response = Mock(status_code=200, headers={"Content-Type": "application/json"})
+    response.json.return_value = {
+        "token": "DDB_test123",
+        "columns": ["id", "country"],
+        "rows": [[1, "US"], [2, "US"], [3, "EU"], [None, "US"]],
+    }
+    mock_session.return_value.post.return_value = response
+
+    collector = SpanCollector()
+    client = Chakra(
+        "access:secret:username",
+        quiet=True,
+        cache=QueryCache(),
+        instrumentation=Instrumentation(collector),
+    )
+    options = ResultOptions(downcast=True, max_category_ratio=0.5)
+    df = client.execute("SELECT * FROM users", result_options=options)
+
+    assert df["id"].dtype == "Int8" and df["id"].isna().sum() == 1
+    assert isinstance(df["country"].dtype, pd.CategoricalDtype)
+    (build,) = collector.named("build")
+    assert (
+        build.attributes["memory_bytes"]
+        == df.memory_usage(deep=True, index=False).sum()
+    )
+
+    # Results with other options are cached separately
+    assert client.execute("SELECT * FROM users")["id"].dtype == "float64"
+    assert client.execute("SELECT * FROM users", result_options=options) is not df
+    assert client.cache.stats["hits"] == 1
+
+
+@patch("requests.Session")
+def test_failed_push_cleans_up_staged_files(mock_session, upload_server):
+    """Test that staged files are deleted when an import fails."""
+    mock_session.return_value.headers = {}
+
+    def post(url, json=None, **kwargs):
+        response = Mock(status_code=200)
+        response.json.return_value = {"token": "DDB_test123"}
+        if url.endswith("/tables/s3_parquet_import"):
+            response.status_code = 400
+            response.json.return_value = {"error": "import failed"}
+            response.raise_for_status.side_effect = requests.exceptions.HTTPError(
+                response=response
+            )
+        return response
+
+    def presigned_response(url):
+        part = url.rsplit("_part", 1)[1].split(".")[0]
+        response = Mock(status_code=200)
+        response.json.return_value = {
+            "presignedUrl": f"{upload_server.url}/part-{part}",
+            "key": f"key-{part}",
+        }
+        return response
+
+    mock_session.return_value.post.side_effect = post
+    mock_session.return_value.get.side_effect = presigned_response
+    mock_session.return_value.put.side_effect = requests.put
+
+    client = Chakra("access:secret:username", quiet=True)
+    with pytest.raises(ChakraAPIError, match="import failed"):
+        client.push("db.schema.table", pd.DataFrame({"id": range(4)}), chunk_size=2)
+
+    delete_calls = mock_session.return_value.delete.call_args_list
+    assert [c[1]["json"]["fileName"] for c in delete_calls] == [
+        "key-00000",
+        "key-00001",
+    ]
+
+
+@patch("requests.Session")
+def test_expired_token_during_push_resends_only_the_rejected_import(
+    mock_session, upload_server
+):
+    """Test a 401 part way through a push logs in again without importing parts twice."""
+    session = mock_session.return_value
+    session.headers = {}
+    tokens = iter(["DDB_old", "DDB_new"])
+    imports = []
+
+    def post(url, json=None, **kwargs):
+        response = Mock(status_code=200)
+        if url.endswith("/servers"):
+            response.json.return_value = {"token": next(tokens)}
+        elif url.endswith("/tables/s3_parquet_import"):
+            if json["s3_key"] == "key-00001" and "DDB_new" not in str(
+                session.headers["Authorization"]
+            ):
+                response.status_code = 401
+                response.json.return_value = {"error": "stale token"}
+            else:
+                imports.append(json["s3_key"])
+        return response
+
+    def presigned_response(url):
+        part = url.rsplit("_part", 1)[1].split(".")[0]
+        response = Mock(status_code=200)
+        response.json.return_value = {
+            "presignedUrl": f"{upload_server.url}/part-{part}",
+            "key": f"key-{part}",
+        }
+        return response
+
+    session.post.side_effect = post
+    session.get.side_effect = presigned_response
+    session.put.side_effect = requests.put
+
+    client = Chakra("access:secret:username", quiet=True)
+    result = client.push(
+        "db.schema.table", pd.DataFrame({"id": range(10)}), chunk_size=2
+    )
+
+    assert result.rows == 10
+    assert imports == [f"key-{part:05d}" for part in range(5)]
+    assert client.token == "DDB_new"
+
+
+@patch("requests.Session")
+def test_journaled_push_resumes_after_failure(mock_session, upload_server, tmp_path):
+    """Test a push run again with its job id skips the parts already imported."""
+    mock_session.return_value.headers = {}
+    imports, statements = [], []
+    failing = {"key-00001"}
+
+    def post(url, json=None, **kwargs):
+        response = Mock(status_code=200)
+        response.json.return_value = {"token": "DDB_test123"}
+        statements.append(str(json))
+        if url.endswith("/tables/s3_parquet_import"):
+            if json["s3_key"] in failing:
+                failing.clear()
+                response.status_code = 400
+                response.json.return_value = {"error": "import failed"}
+                response.raise_for_status.side_effect = requests.exceptions.HTTPError(
+                    response=response
+                )
+            else:
+                imports.append(json["s3_key"])
+        return response
+
+    def presigned_response(url):
+        part = url.rsplit("_part", 1)[1].split(".")[0]
+        response = Mock(status_code=200)
+        response.json.return_value = {
+            "presignedUrl": f"{upload_server.url}/part-{part}",
+            "key": f"key-{part}",
+        }
+        return response
+
+    session = mock_session.return_value
+    session.post.side_effect = post
+    session.get.side_effect = presigned_response
+    session.put.side_effect = requests.put
+
+    client = Chakra("access:secret:username", quiet=True)
+    journal = PushJournal(tmp_path)
+    data = pd.DataFrame({"id": range(6)})
+    options = dict(
+        chunk_size=2, replace_if_exists=True, job_id="events-1", journal=journal
+    )
+    with pytest.raises(ChakraAPIError, match="import failed"):
+        client.push("db.schema.table", data, **options)
+
+    # The uploaded files are kept for the next run, the imported one is not
+    deleted = [c[1]["json"]["fileName"] for c in session.delete.call_args_list]
+    assert imports == ["key-00000"] and deleted == ["key-00000"]
+    assert sorted(journal.load("events-1").resumable_keys()) == [
+        "key-00001",
+        "key-00002",
+    ]
+
+    session.get.reset_mock()
+    statements.clear()
+    result = client.push("db.schema.table", data, **options)
+    assert imports == ["key-00000", "key-00001", "key-00002"]
+    assert result.rows == 6 and result.resumed_parts == 1 and result.bytes_sent == 0
+    session.get.assert_not_called()  # nothing uploaded again
+    assert not any("DROP" in statement for statement in statements)
+    assert len(upload_server.uploads) == 3
+
+    session.post.reset_mock()
+    assert client.push("db.schema.table", data, **options).rows == 6
+    session.post.assert_not_called()
+    assert not os.path.exists(journal.job_directory("events-1"))
+
+
+@patch("requests.Session")
+def test_small_push_uses_direct_insert(mock_session):
+    """Test a small DataFrame is inserted without staging a parquet file."""
+    mock_session.return_value.headers = {}
+    mock_auth_response = Mock(status_code=200)
+    mock_auth_response.json.return_value = {"token": "DDB_test123"}
+    mock_session.return_value.post.return_value = mock_auth_response
+
+    client = Chakra("access:secret:username", quiet=True)
+    client.push("db.schema.table", pd.DataFrame({"id": [1, 2], "name": ["a", None]}))
+
+    insert_call = mock_session.return_value.post.call_args
+    assert json.loads(insert_call[1]["data"]) == {
+        "sql": 'INSERT INTO db.schema.table ("id", "name") VALUES (?, ?), (?, ?)',
+        "parameters": [1, "a", 2, None],
+    }
+    mock_session.return_value.get.assert_not_called()
+    mock_session.return_value.put.assert_not_called()
+
+
+@patch("requests.Session")
+def test_push_overlaps_ddl_with_upload(mock_session, upload_server):
+    """Test parts are staged while the table is created and a report is returned."""
+    mock_session.return_value.headers = {}
+    presigned, overlapped = threading.Event(), []
+
+    def post(url, json=None, **kwargs):
+        if json and "CREATE TABLE" in json.get("sql", ""):
+            # Parts are staged while the table is being created
+            overlapped.append(presigned.wait(timeout=5))
+        response = Mock(status_code=200)
+        response.json.return_value = {"token": "DDB_test123"}
+        return response
+
+    def presigned_response(url):
+        presigned.set()
+        response = Mock(status_code=200)
+        response.json.return_value = {
+            "presignedUrl": f"{upload_server.url}/part",
+            "key": "key",
+        }
+        return response
+
+    mock_session.return_value.post.side_effect = post
+    mock_session.return_value.get.side_effect = presigned_response
+    mock_session.return_value.put.side_effect = requests.put
+
+    client = Chakra("access:secret:username", quiet=True)
+    result = client.push(
+        "db.schema.table", pd.DataFrame({"id": range(4)}), method="parquet"
+    )
+
+    assert overlapped == [True]
+    assert (result.table_name, result.method) == ("db.schema.table", "parquet")
+    assert (result.rows, result.parts) == (4, 1)
+    assert result.bytes_sent == len(upload_server.uploads["/part"])
+    assert result.raw_bytes > 0 and result.encode_throughput > 0
+    assert result.parquet_options == ParquetOptions()
+    assert {"ddl", "encode", "presign", "upload", "import", "cleanup"} <= set(
+        result.timings
+    )
+
+
+@patch("chakra_py.retry.time.sleep")
+@patch("requests.Session")
+def test_push_reports_spans(mock_session, mock_sleep, upload_server):
+    """Test a push reports each request as a span nested under the push."""
+    mock_session.return_value.headers = {}
+    mock_response = Mock(status_code=200)
+    mock_response.json.return_value = {"token": "DDB_test123"}
+    mock_session.return_value.post.return_value = mock_response
+
+    def presigned_response(url):
+        part = url.rsplit("_part", 1)[1].split(".")[0]
+        response = Mock(status_code=200)
+        response.json.return_value = {
+            "presignedUrl": f"{upload_server.url}/part-{part}",
+            "key": f"key-{part}",
+        }
+        return response
+
+    mock_session.return_value.get.side_effect = presigned_response
+    mock_session.return_value.put.side_effect = requests.put
+    upload_server.fail_once.add("/part-00001")
+
+    collector = SpanCollector()
+    client = Chakra(
+        "access:secret:username",
+        quiet=True,
+        instrumentation=Instrumentation(collector),
+    )
+    client.push("db.schema.table", pd.DataFrame({"id": range(10)}), chunk_size=4)
+
+    (push,) = collector.named("push")
+    assert push.rows == 10 and push.attributes["method"] == "parquet"
+    assert [span.attributes["statement"] for span in collector.named("ddl")] == [
+        "create_database",
+        "create_schema",
+        "create_table",
+    ]
+    uploads = collector.named("upload")
+    assert {span.status_code for span in uploads} == {200}
+    assert sum(span.retries for span in uploads) == 1
+    # The retried part is counted once per attempt
+    assert sum(span.bytes_sent for span in uploads) == sum(
+        map(len, upload_server.uploads.values())
+    ) + len(upload_server.uploads["/part-00001"])
+
+    totals = collector.totals()
+    assert {
+        name: totals[name]["count"] for name in ("presign", "import", "cleanup")
+    } == {
+        "presign": 3,
+        "import": 3,
+        "cleanup": 3,
+    }
+    (login,) = collector.named("login")
+    for span in collector.spans:
+        if span is not push and span.name != "login":
+            assert span.parent is push and span.duration >= 0
+    assert login.parent is push and push.parent is None
+
+
+@patch("requests.Session")
+def test_executemany_inserts_rows_in_one_request(mock_session):
+    """Test executemany packs INSERT executions into one request and drops stale results."""
+    mock_session.return_value.headers = {}
+    response = Mock(status_code=200)
+    response.json.return_value = {"token": "DDB_test123", "columns": [], "rows": []}
+    mock_session.return_value.post.return_value = response
+
+    cache = QueryCache()
+    client = Chakra("access:secret:username", quiet=True, cache=cache)
+    client.execute("SELECT * FROM events")
+    insert = client.prepare("INSERT INTO events VALUES ($1, $2)")
+
+    assert insert.executemany([(1, "a"), (2, "b"), (3, None)]) == 3
+    query = mock_session.return_value.post.call_args[1]["json"]
+    assert query == {
+        "sql": "INSERT INTO events VALUES (?, ?), (?, ?), (?, ?)",
+        "parameters": [1, "a", 2, "b", 3, None],
+    }
+    # Login, SELECT and a single INSERT
+    assert mock_session.return_value.post.call_count == 3
+    assert cache.get("SELECT * FROM events") is None
+
+
+@patch("requests.Session")
+def test_push_many_stages_and_imports_every_table(mock_session, upload_server):
+    """Test push_many creates each schema once and imports every table."""
+    mock_session.return_value.headers = {}
+    posts = []
+
+    def post(url, json=None, **kwargs):
+        posts.append((url, json))
+        response = Mock(status_code=200)
+        response.json.return_value = {"token": "DDB_test123"}
+        return response
+
+    def presigned_response(url):
+        name = url.split("filename=")[1]
+        response = Mock(status_code=200)
+        response.json.return_value = {
+            "presignedUrl": f"{upload_server.url}/{name}",
+            "key": name,
+        }
+        return response
+
+    mock_session.return_value.post.side_effect = post
+    mock_session.return_value.get.side_effect = presigned_response
+    mock_session.return_value.put.side_effect = requests.put
+
+    client = Chakra("access:secret:username", quiet=True)
+    results = client.push_many(
+        {
+            "db.sales.orders": pd.DataFrame({"id": range(6), "customer": [1, 2] * 3}),
+            "db.sales.customers": pd.DataFrame({"id": [1, 2], "name": ["a", "b"]}),
+        },
+        chunk_size=4,
+        dedupe_on_append=True,
+        primary_key_columns={"db.sales.orders": ["id"]},
+    )
+
+    assert {name: (r.rows, r.parts) for name, r in results.items()} == {
+        "db.sales.orders": (6, 2),
+        "db.sales.customers": (2, 1),
+    }
+    assert len(upload_server.uploads) == 3
+    assert {"ddl", "encode", "upload", "import", "total"} <= set(
+        results["db.sales.orders"].timings
+    )
+    statements = [body["sql"] for _, body in posts if body and "sql" in body]
+    assert sum("CREATE SCHEMA" in sql for sql in statements) == 1
+    assert sum("CREATE TABLE" in sql for sql in statements) == 2
+    imports = {
+        body["s3_key"]: body for url, body in posts if "s3_parquet_import" in url
+    }
+    assert len(imports) == 3
+    assert all(
+        body["primary_key_columns"] == (["id"] if "orders" in key else [])
+        for key, body in imports.items()
+    )
@@ -0,0 +1,81 @@
+from unittest.mock import patch
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from chakra_py import ParquetOptions, encoding
+from chakra_py.encoding import auto_parquet_options, update_bandwidth
+from chakra_py.sources import write_parquet_parts
+
+
+def _reader(num_batches: int = 4, rows: int = 3) -> pa.RecordBatchReader:
+    table = pa.table(
+        {"id": range(num_batches * rows), "name": ["a"] * num_batches * rows}
+    )
+    return pa.RecordBatchReader.from_batches(table.schema, table.to_batches(rows))
+
+
+def _describe(parts) -> list:
+    described = []
+    for file, size, rows, raw_bytes in parts:
+        metadata = pq.ParquetFile(file).metadata
+        described.append(
+            (
+                rows,
+                [
+                    metadata.row_group(i).num_rows
+                    for i in range(metadata.num_row_groups)
+                ],
+                metadata.row_group(0).column(0).compression,
+                size > 0 and raw_bytes > 0,
+            )
+        )
+        file.close()
+    return described
+
+
+@pytest.mark.parametrize("encode_workers", [1, 3])
+def test_parts_follow_encoding_options(encode_workers):
+    """Test row groups are filled across batches and parts keep their order."""
+    options = ParquetOptions(
+        compression="lz4", row_group_size=4, encode_workers=encode_workers
+    )
+    parts = write_parquet_parts(_reader(), chunk_size=10, options=options)
+    assert _describe(parts) == [
+        (10, [4, 4, 2], "LZ4", True),
+        (2, [2], "LZ4", True),
+    ]
+
+
+def test_unchunked_parts_are_streamed_with_several_workers():
+    """Test a single part is encoded as it is read instead of being collected."""
+    options = ParquetOptions(row_group_size=4, encode_workers=3)
+    with patch("chakra_py.sources._write_parts_concurrently") as concurrent:
+        parts = write_parquet_parts(_reader(), chunk_size=None, options=options)
+        assert _describe(parts) == [(12, [4, 4, 4], "ZSTD", True)]
+    concurrent.assert_not_called()
+
+
+def test_invalid_options():
+    with pytest.raises(ValueError):
+        ParquetOptions(compression="lzo")
+    with pytest.raises(ValueError):
+        ParquetOptions(encode_workers=0)
+
+
+def test_auto_options(monkeypatch):
+    """Test the codec follows the bandwidth and row groups the data size."""
+    table = pa.table({"id": range(1000)})
+    assert auto_parquet_options(table) == ParquetOptions()
+    assert auto_parquet_options(table, 500 * 1024 * 1024).compression == "lz4"
+    assert auto_parquet_options(table, 1024 * 1024).compression_level == 9
+
+    monkeypatch.setattr(encoding, "estimated_size", lambda data: 1024**3)
+    options = auto_parquet_options(table)
+    assert options.row_group_size == 125
+    assert options.encode_workers >= 1
+
+    assert update_bandwidth(None, 1024, 1.0) is None
+    assert update_bandwidth(None, 1024 * 1024, 1.0) == 1024 * 1024
+    assert update_bandwidth(100.0, 1024 * 1024, 1.0) > 100.0
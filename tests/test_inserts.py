@@ -0,0 +1,74 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from chakra_py.inserts import insert_bodies, use_direct_insert
+
+
+def test_insert_bodies_send_typed_parameters():
+    """Test values keep their JSON type and missing values become nulls."""
+    df = pd.DataFrame(
+        {
+            "id": [1, 2],
+            "score": [0.5, np.nan],
+            "name": ["a", None],
+            "active": [True, False],
+            "at": pd.to_datetime(["2024-01-01 00:00:00", "2024-01-02 03:04:05"]),
+        }
+    )
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    [(body, rows)] = list(insert_bodies("db.main.t", table))
+    payload = json.loads(body)
+
+    assert rows == 2
+    assert payload["sql"] == (
+        'INSERT INTO db.main.t ("id", "score", "name", "active", "at") '
+        "VALUES (?, ?, ?, ?, ?), (?, ?, ?, ?, ?)"
+    )
+    assert payload["parameters"][:4] == [1, 0.5, "a", True]
+    assert payload["parameters"][5:9] == [2, None, None, False]
+    assert payload["parameters"][9].startswith("2024-01-02 03:04:05")
+
+
+def test_insert_bodies_send_infinities_as_strings():
+    """Test infinities, which JSON cannot represent, are sent as strings."""
+    table = pa.table({"x": pa.array([1.0, float("inf"), float("nan"), -np.inf])})
+
+    [(body, rows)] = list(insert_bodies("t", table))
+
+    assert rows == 4
+    assert json.loads(body)["parameters"] == [1.0, "inf", None, "-inf"]
+
+
+def test_insert_bodies_are_sized_by_bytes():
+    """Test batches adapt to the target body size and cover every row once."""
+    table = pa.table({"id": range(5000), "text": ["x" * 50] * 5000})
+
+    batches = list(insert_bodies("t", table, max_bytes=20_000))
+
+    assert sum(rows for _, rows in batches) == 5000
+    assert len(batches) > 10
+    assert all(len(body) < 30_000 for body, _ in batches)
+    ids = [v for body, _ in batches for v in json.loads(body)["parameters"][::2]]
+    assert ids == list(range(5000))
+
+
+def test_use_direct_insert():
+    """Test small in-memory data is inserted and everything else staged."""
+    small = pd.DataFrame({"id": range(10)})
+    large = pd.DataFrame({"id": range(1_000_000)})
+
+    assert use_direct_insert(small, "auto", False, None)
+    assert not use_direct_insert(large, "auto", False, None)
+    assert not use_direct_insert(small, "auto", True, None)
+    assert not use_direct_insert(small, "auto", False, 1000)
+    assert not use_direct_insert(iter([small]), "auto", False, None)
+    assert use_direct_insert(large, "insert", False, None)
+    with pytest.raises(ValueError):
+        use_direct_insert(small, "insert", True, None)
+    with pytest.raises(ValueError):
+        use_direct_insert(small, "copy", False, None)
@@ -0,0 +1,79 @@
+import asyncio
+import threading
+
+import pytest
+
+from chakra_py import Instrumentation, SpanCollector
+from chakra_py.instrumentation import NULL_SPAN
+from tests.test_async_client import MockChakraServer
+
+
+def test_disabled_instrumentation_is_a_no_op():
+    instrumentation = Instrumentation()
+    assert not instrumentation.enabled
+
+    def func():
+        pass
+
+    assert instrumentation.bind(func) is func
+    with instrumentation.span("query") as span:
+        assert span is NULL_SPAN
+        span.rows = 3
+        span.retries += 1
+    assert NULL_SPAN.rows is None and NULL_SPAN.retries == 0
+
+
+def test_spans_nest_across_threads_and_record_errors():
+    finished = []
+    instrumentation = Instrumentation(finished.append)
+
+    with pytest.raises(ValueError):
+        with instrumentation.span("push", table_name="db.s.t") as push:
+            with instrumentation.span("ddl"):
+                instrumentation.current_span().retries += 2
+            worker = instrumentation.bind(
+                lambda: instrumentation.current_span().set_attribute("part", 1)
+            )
+            thread = threading.Thread(target=worker)
+            thread.start()
+            thread.join()
+            raise ValueError("boom")
+
+    ddl, push_span = finished
+    assert (ddl.name, ddl.retries, ddl.parent) == ("ddl", 2, push)
+    assert push_span is push and isinstance(push.error, ValueError)
+    assert push.attributes == {"table_name": "db.s.t", "part": 1}
+    assert push.end_time >= push.start_time
+    assert instrumentation.current_span() is NULL_SPAN
+
+
+def test_failing_hook_does_not_fail_the_operation():
+    def broken(span):
+        raise RuntimeError("exporter down")
+
+    collector = SpanCollector()
+    instrumentation = Instrumentation(broken, collector)
+    with pytest.warns(RuntimeWarning, match="exporter down"):
+        with instrumentation.span("query"):
+            pass
+    assert [span.name for span in collector.spans] == ["query"]
+
+
+def test_async_execute_reports_spans():
+    server = MockChakraServer()
+    collector = SpanCollector()
+
+    async def run():
+        async with server.client() as client:
+            client.instrumentation = Instrumentation(collector)
+            return await client.execute("SELECT 1")
+
+    df = asyncio.run(run())
+
+    names = [span.name for span in collector.spans]
+    assert names == ["login", "query", "decode", "build", "execute"]
+    login, query, decode, build, execute = collector.spans
+    assert all(span.parent is execute for span in (login, query, decode, build))
+    assert query.status_code == 200 and query.attributes["query"] == "SELECT 1"
+    assert query.bytes_sent > 0 and query.bytes_received > 0
+    assert decode.rows == execute.rows == len(df) == 1
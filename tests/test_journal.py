@@ -0,0 +1,95 @@
+import io
+import json
+from unittest.mock import Mock, patch
+
+import pytest
+
+from chakra_py import Chakra, PushJournal
+
+
+def encode_parts(count):
+    """A stand-in for write_parquet_parts yielding count parts of 2 rows."""
+
+    def encode():
+        for number in range(count):
+            content = f"part {number}".encode()
+            yield io.BytesIO(content), len(content), 2, 16
+
+    return encode
+
+
+def test_journal_keeps_jobs_across_runs(tmp_path):
+    """Test a job is recorded on disk and cannot be resumed for another push."""
+    journal = PushJournal(tmp_path)
+    job = journal.open("job/1", "db.schema.events", 2)
+    for number, (file, size, rows, raw_bytes, kept) in enumerate(
+        job.encoded_parts(encode_parts(2))
+    ):
+        assert not kept
+        filename = f"events_part{number:05d}.parquet"
+        job.update(filename, number=number, size=size, rows=rows, raw_bytes=raw_bytes)
+        job.keep_part(filename, file)
+    job.finish_encoding()
+    job.update("events_part00000.parquet", key="key-0", uploaded=True)
+
+    resumed = journal.open("job/1", "db.schema.events", 2)
+    assert resumed.upload_id == job.upload_id and resumed.encoded
+    assert resumed.resumable_keys() == ["key-0"]
+    with pytest.raises(ValueError, match="cannot be resumed"):
+        journal.open("job/1", "db.schema.events", 3)
+    assert [job.job_id for job in journal.jobs()] == ["job/1"]
+
+    journal.forget("job/1")
+    assert journal.load("job/1") is None and journal.jobs() == []
+
+
+def test_journal_reads_back_encoded_parts(tmp_path):
+    """Test kept parts are reused, and parts are encoded again if a copy is corrupt."""
+    journal = PushJournal(tmp_path)
+    job = journal.open("job", "db.schema.events", 2)
+    for number, (file, size, rows, raw_bytes, _) in enumerate(
+        job.encoded_parts(encode_parts(3))
+    ):
+        filename = f"part{number}"
+        job.update(filename, number=number, size=size, rows=rows, raw_bytes=raw_bytes)
+        job.keep_part(filename, file)
+    job.finish_encoding()
+    job.update("part0", key="key-0", uploaded=True, imported=True)
+
+    parts = list(journal.open("job", "db.schema.events", 2).encoded_parts(None))
+    assert parts[0][0] is None
+    assert [file.read() for file, *_ in parts[1:]] == [b"part 1", b"part 2"]
+    assert all(kept for *_, kept in parts)
+
+    with open(job.part("part2")["path"], "wb") as file:
+        file.write(b"truncated")
+    parts = list(job.encoded_parts(encode_parts(3)))
+    assert [part[-1] for part in parts] == [True, True, False]
+    assert parts[2][0].read() == b"part 2"
+
+
+@patch("requests.Session")
+def test_clean_up_jobs_deletes_abandoned_staged_files(mock_session, tmp_path):
+    """Test staged files of jobs without progress are deleted with their jobs."""
+    session = mock_session.return_value
+    session.headers = {}
+    response = Mock(status_code=200)
+    response.json.return_value = {"token": "DDB_test123"}
+    session.post.return_value = session.delete.return_value = response
+
+    journal = PushJournal(tmp_path)
+    job = journal.open("abandoned", "db.schema.events", None)
+    job.update("events.parquet", number=0, key="key-0", uploaded=True)
+    journal.open("recent", "db.schema.events", None).update("b", key="key-1")
+
+    client = Chakra("access:secret:username", quiet=True)
+    assert client.clean_up_jobs(journal, max_age=3600) == 0
+    with open(journal.path("abandoned")) as file:
+        state = json.load(file)
+    with open(journal.path("abandoned"), "w") as file:
+        json.dump({**state, "updated_at": state["updated_at"] - 7200}, file)
+    assert client.clean_up_jobs(journal, max_age=3600) == 1
+
+    session.delete.assert_called_once()
+    assert session.delete.call_args[1]["json"] == {"fileName": "key-0"}
+    assert [job.job_id for job in journal.jobs()] == ["recent"]
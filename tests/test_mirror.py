@@ -0,0 +1,156 @@
+import time
+from unittest.mock import Mock, patch
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+pytest.importorskip("duckdb")
+
+from chakra_py import Chakra, LocalMirror  # noqa: E402
+
+
+@pytest.fixture
+def mirror():
+    mirror = LocalMirror()
+    mirror.register(
+        "duckdb.main.events", pa.table({"id": [1, 2, 3], "kind": list("aab")})
+    )
+    mirror.register("analytics.public.users", pd.DataFrame({"id": [1], "name": ["x"]}))
+    yield mirror
+    mirror.close()
+
+
+def test_mirror_only_answers_reads_of_copied_tables(mirror):
+    """Test queries are routed locally only if every table they read is copied."""
+    assert mirror.covers("SELECT kind, COUNT(*) FROM events GROUP BY kind")
+    assert mirror.covers(
+        "SELECT * FROM main.events e JOIN analytics.public.users u USING (id)"
+    )
+    assert mirror.covers("WITH recent AS (SELECT * FROM events) SELECT * FROM recent")
+
+    assert not mirror.covers("SELECT * FROM orders")
+    assert not mirror.covers("SELECT * FROM events JOIN orders USING (id)")
+    assert not mirror.covers("SELECT * FROM read_parquet('s3://bucket/*.parquet')")
+    assert not mirror.covers("SELECT 1")
+    assert not mirror.covers("DELETE FROM events")
+    assert not mirror.covers("SELECT * FROM events; DROP TABLE events")
+
+    result = mirror.execute("SELECT COUNT(*) AS n FROM events WHERE kind = $1", ["a"])
+    assert result.column("n").to_pylist() == [2]
+    assert mirror.execute("SELECT * FROM orders") is None
+    assert mirror.stats == {"hits": 1, "misses": 1, "tables": 2, "rows": 4}
+
+
+def test_mirror_follows_pushes_and_expires(mirror):
+    """Test appends extend a copy, other writes drop it and old copies go stale."""
+    mirror.record_push(
+        "duckdb.main.events", pd.DataFrame({"id": [4], "kind": ["c"]}), False, False
+    )
+    assert mirror.execute("SELECT COUNT(*) AS n FROM events").column(
+        "n"
+    ).to_pylist() == [4]
+
+    mirror.record_push("duckdb.main.events", pd.DataFrame({"other": [1]}), False, False)
+    assert not mirror.covers("SELECT * FROM events")
+
+    assert mirror.invalidate("public.users") is False
+    assert mirror.invalidate("analytics.public.users") is True
+    assert mirror.tables() == {}
+
+    mirror.max_age = 60
+    copied = mirror.register("duckdb.main.events", pa.table({"id": [1]}))
+    assert mirror.covers("SELECT * FROM events")
+    copied.mirrored_at = time.time() - 120
+    assert not mirror.covers("SELECT * FROM events")
+
+
+@patch("requests.Session")
+def test_mirror_hits_need_no_login(mock_session):
+    """Test queries answered by the mirror are not held up by logging in."""
+    client = Chakra("access:secret:username", quiet=True, mirror=LocalMirror())
+    client.mirror.register("duckdb.main.events", pd.DataFrame({"id": [1, 2]}))
+
+    result = client.execute("SELECT COUNT(*) AS n FROM events")
+
+    assert result["n"].tolist() == [2]
+    assert client.token is None
+    mock_session.return_value.post.assert_not_called()
+
+
+@patch("requests.Session")
+def test_client_answers_queries_from_mirror(mock_session):
+    """Test mirrored tables are queried locally until a write drops them."""
+    session = mock_session.return_value
+    session.headers = {}
+    selects = []
+
+    def post(url, json=None, data=None, **kwargs):
+        response = Mock(status_code=200, headers={})
+        response.json.return_value = {
+            "token": "DDB_token",
+            "columns": ["id", "kind"],
+            "rows": [[1, "a"], [2, "b"]],
+        }
+        sql = (json or {}).get("sql", "")
+        if sql.startswith("SELECT"):
+            selects.append(sql)
+        return response
+
+    session.post.side_effect = post
+
+    client = Chakra("access:secret:username", quiet=True, mirror=LocalMirror())
+    client.mirror_table("events")
+    assert selects == ["SELECT * FROM duckdb.main.events"]
+
+    counts = client.execute(
+        "SELECT kind, COUNT(*) AS n FROM events GROUP BY ALL ORDER BY kind"
+    )
+    assert counts["n"].tolist() == [1, 1]
+    client.push("events", pd.DataFrame({"id": [3], "kind": ["a"]}))
+    total = client.execute_arrow("SELECT COUNT(*) AS n FROM events")
+    assert total.column("n").to_pylist() == [3]
+    assert len(selects) == 1 and client.mirror.stats["hits"] == 2
+
+    client.execute("DELETE FROM events WHERE id = 1")
+    client.execute("SELECT * FROM events")
+    assert selects[1:] == ["SELECT * FROM events"]
+    assert client.mirror.tables() == {} and client.refresh_mirror() == []
+
+
+@patch("requests.Session")
+def test_execute_many_uses_and_invalidates_mirror(mock_session):
+    """Test execute_many reads the mirror like execute and drops tables it writes."""
+    session = mock_session.return_value
+    session.headers = {}
+    sent = []
+
+    def post(url, json=None, data=None, **kwargs):
+        response = Mock(status_code=200, headers={})
+        response.json.return_value = {
+            "token": "DDB_token",
+            "columns": ["n"],
+            "rows": [[7]],
+        }
+        if json and "sql" in json:
+            sent.append(json["sql"])
+        return response
+
+    session.post.side_effect = post
+
+    client = Chakra("access:secret:username", quiet=True, mirror=LocalMirror())
+    client.mirror.register("duckdb.main.events", pd.DataFrame({"id": [1, 2]}))
+
+    [local] = client.execute_many(["SELECT COUNT(*) AS n FROM events"])
+    assert local["n"].tolist() == [2] and sent == []
+    [remote] = client.execute_many(
+        ["SELECT COUNT(*) AS n FROM events"], use_mirror=False
+    )
+    assert remote["n"].tolist() == [7]
+
+    client.execute_many(["DELETE FROM events WHERE id = 1"])
+    assert client.mirror.tables() == {}
+    assert sent == [
+        "SELECT COUNT(*) AS n FROM events",
+        "DELETE FROM events WHERE id = 1",
+    ]
@@ -0,0 +1,141 @@
+import json
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from chakra_py.results import (
+    ResultOptions,
+    arrow_to_pandas,
+    convert_result,
+    decode_arrow_stream,
+    decode_json_result,
+    iter_json_result,
+    json_result_to_pandas,
+    memory_report,
+)
+
+
+def test_decode_json_result():
+    """Test that row-oriented JSON is decoded into typed Arrow columns."""
+    table = decode_json_result(
+        {
+            "columns": ["id", "score", "name"],
+            "rows": [[1, 0.5, "a"], [2, None, "b"]],
+        }
+    )
+    assert table.column_names == ["id", "score", "name"]
+    assert table.schema.types == [pa.int64(), pa.float64(), pa.string()]
+    assert table.column("score").to_pylist() == [0.5, None]
+
+
+def test_decode_json_result_mixed_and_empty():
+    """Test mixed-type columns fall back to strings and empty results keep columns."""
+    table = decode_json_result({"columns": ["value"], "rows": [[1], ["a"], [None]]})
+    assert table.column("value").to_pylist() == ["1", "a", None]
+
+    empty = decode_json_result({"columns": ["id", "name"], "rows": []})
+    assert empty.column_names == ["id", "name"]
+    assert empty.num_rows == 0
+
+
+def test_decode_arrow_stream():
+    """Test that Arrow IPC stream payloads are decoded as-is."""
+    table = pa.Table.from_pydict({"id": [1, 2], "name": ["a", "b"]})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    assert decode_arrow_stream(sink.getvalue().to_pybytes()).equals(table)
+
+
+def test_arrow_to_pandas():
+    """Test that DataFrames built from Arrow tables keep Arrow-backed dtypes."""
+    df = arrow_to_pandas(pa.Table.from_pydict({"id": [1, 2]}))
+    assert isinstance(df["id"].dtype, pd.ArrowDtype)
+
+
+def test_iter_json_result_across_chunk_boundaries():
+    """Test that rows are parsed incrementally regardless of how the body is split."""
+    body = json.dumps(
+        {
+            "columns": ["id", "name"],
+            "rows": [[i, f"név{i}"] for i in range(25)],
+            "elapsed": 123456,
+        }
+    ).encode()
+
+    for size in (1, 7, len(body)):
+        chunks = [body[i : i + size] for i in range(0, len(body), size)]
+        result = list(iter_json_result(chunks, chunk_size=10))
+        assert [len(rows) for _, rows in result] == [10, 10, 5]
+        assert result[0][0] == ["id", "name"]
+        assert result[-1][1][-1] == [24, "név24"]
+
+
+def test_iter_json_result_rows_before_columns():
+    """Test that rows received before the column names are held until they are known."""
+    body = json.dumps({"rows": [[1], [2]], "columns": ["id"]}).encode()
+    assert list(iter_json_result([body], chunk_size=1)) == [(["id"], [[1], [2]])]
+    assert list(iter_json_result([b'{"columns": ["id"], "rows": []}'], 1)) == []
+
+
+def test_json_result_keeps_reported_types():
+    """Test columns are decoded into compact dtypes when their types are reported."""
+    df = json_result_to_pandas(
+        {
+            "columns": ["id", "kind", "at"],
+            "types": ["TINYINT", "ENUM('a', 'b')", "TIMESTAMPTZ"],
+            "rows": [[1, "a", "2024-01-01 00:00:00+00"], [2, "b", None]],
+        }
+    )
+    assert df["id"].dtype == "int8"
+    assert isinstance(df["kind"].dtype, pd.CategoricalDtype)
+    assert str(df["at"].dtype) == "datetime64[us, UTC]"
+
+
+def test_result_options_shrink_columns():
+    """Test numbers are downcast losslessly and repeated strings become categoricals."""
+    table = decode_json_result(
+        {
+            "columns": ["id", "big", "price", "exact", "kind", "name"],
+            "rows": [
+                [1, 2**40, 0.1, 0.5, "a", "x"],
+                [2, None, 2.0, None, "a", "y"],
+                [300, 7, None, 1.25, "b", "z"],
+                [4, 8, 3.5, 2.0, "a", None],
+            ],
+        }
+    )
+    options = ResultOptions(
+        downcast=True, max_category_ratio=0.5, string_storage="python"
+    )
+    df = convert_result(table, "pandas", None, options)
+    assert df["id"].dtype == "Int16"
+    assert df["big"].dtype == "Int64" and df["big"].isna().tolist()[1]
+    assert df["price"].dtype == "float64"  # 0.1 is not exact in float32
+    assert df["exact"].dtype == "float32"
+    assert isinstance(df["kind"].dtype, pd.CategoricalDtype)
+    assert df["kind"].cat.codes.dtype == "int8"
+    assert df["name"].dtype == pd.StringDtype("python")
+
+    arrow = convert_result(table, "arrow", None, options)
+    assert arrow.schema.field("id").type == pa.int16()
+    assert pa.types.is_dictionary(arrow.schema.field("kind").type)
+    assert arrow.to_pylist() == table.to_pylist()
+
+    with pytest.raises(ValueError, match="string_storage"):
+        ResultOptions(string_storage="numpy")
+
+
+def test_memory_report():
+    """Test the memory of results is measured per column, values included."""
+    df = pd.DataFrame({"id": [1, 2, 3], "name": ["a", "bb", "ccc"]})
+    report = memory_report(df)
+    assert report.rows == 3 and report.columns["id"] == 24
+    assert report.total_bytes == sum(report.columns.values())
+    assert report.columns["name"] > 3
+
+    table = pa.table({"id": pa.array([1, 2, 3], pa.int8())})
+    assert memory_report(table).columns == {"id": 3}
+    assert memory_report(table).dtypes == {"id": "int8"}
+    assert str(memory_report(table)).startswith("3 rows")
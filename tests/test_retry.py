@@ -0,0 +1,82 @@
+import asyncio
+from unittest.mock import Mock, patch
+
+import pytest
+import requests
+
+from chakra_py.retry import RetryPolicy, retry_after
+
+
+def http_error(status_code, headers=None):
+    response = Mock(status_code=status_code, headers=headers or {})
+    return requests.exceptions.HTTPError(response=response)
+
+
+@patch("chakra_py.retry.time.sleep")
+def test_retries_transient_failures(mock_sleep):
+    """Test transient failures are retried with capped exponential backoff."""
+    func = Mock(
+        side_effect=[requests.exceptions.ConnectionError(), http_error(502), "ok"]
+    )
+    policy = RetryPolicy(backoff=1, max_backoff=1.5, jitter=False)
+
+    assert policy.run(func) == "ok"
+    assert [c[0][0] for c in mock_sleep.call_args_list] == [1, 1.5]
+
+
+@patch("chakra_py.retry.time.sleep")
+def test_non_idempotent_requests_retry_only_when_rejected(mock_sleep):
+    """Test a request that may have been processed is not sent twice."""
+    policy = RetryPolicy(jitter=False)
+
+    func = Mock(side_effect=[http_error(502), "ok"])
+    with pytest.raises(requests.exceptions.HTTPError):
+        policy.run(func, idempotent=False)
+    assert func.call_count == 1
+
+    func = Mock(side_effect=[http_error(429, {"Retry-After": "7"}), "ok"])
+    assert policy.run(func, idempotent=False) == "ok"
+    mock_sleep.assert_called_once_with(7.0)
+
+
+@patch("chakra_py.retry.time.monotonic")
+@patch("chakra_py.retry.time.sleep")
+def test_deadline_and_client_errors(mock_sleep, mock_monotonic):
+    """Test client errors are never retried and retries stop at the deadline."""
+    clock = [0.0]
+    mock_monotonic.side_effect = lambda: clock[0]
+    mock_sleep.side_effect = lambda seconds: clock.__setitem__(0, clock[0] + seconds)
+
+    func = Mock(side_effect=http_error(400))
+    with pytest.raises(requests.exceptions.HTTPError):
+        RetryPolicy().run(func)
+    assert func.call_count == 1
+
+    # Long Retry-After delays are capped by max_backoff, then by the deadline
+    func = Mock(side_effect=http_error(503, {"Retry-After": "120"}))
+    with pytest.raises(requests.exceptions.HTTPError):
+        RetryPolicy(max_attempts=5, max_backoff=25, deadline=60).run(func)
+    assert func.call_count == 4
+    assert [c[0][0] for c in mock_sleep.call_args_list] == [25, 25, 10]
+
+
+def test_retry_after_http_date():
+    assert retry_after(http_error(503, {"Retry-After": "invalid"})) is None
+    assert retry_after(
+        http_error(503, {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})
+    ) == pytest.approx(0)
+
+
+def test_run_async():
+    """Test the async variant retries the same way."""
+    calls = []
+
+    async def func():
+        calls.append(1)
+        if len(calls) < 3:
+            raise requests.exceptions.Timeout()
+        return "ok"
+
+    policy = RetryPolicy(backoff=0, jitter=False)
+    assert asyncio.run(policy.run_async(func)) == "ok"
+    assert len(calls) == 3
@@ -0,0 +1,180 @@
+from unittest.mock import Mock, patch
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from chakra_py import Chakra, SchemaCache
+from chakra_py.exceptions import ChakraSchemaError
+from chakra_py.schemas import can_cast, changes_schema, validate_columns
+from chakra_py.typemap import null_columns
+
+
+def test_validate_columns():
+    validate_columns("db.s.t", {"ID": "BIGINT"}, {"id": "BIGINT"})
+    with pytest.raises(ChakraSchemaError) as excinfo:
+        validate_columns(
+            "db.s.t",
+            {"id": "BIGINT", "name": "VARCHAR"},
+            {"id": "DOUBLE", "extra": "VARCHAR"},
+        )
+    assert str(excinfo.value) == (
+        "Data does not match the schema of db.s.t: column 'id' is BIGINT but got "
+        "DOUBLE; unexpected column 'extra'; missing column 'name'"
+    )
+
+
+def test_validate_columns_allows_implicit_casts_and_null_columns():
+    validate_columns(
+        "db.s.t",
+        {
+            "id": "BIGINT",
+            "score": "DOUBLE",
+            "price": "DECIMAL(18, 3)",
+            "at": "TIMESTAMPTZ",
+        },
+        {"id": "INTEGER", "score": "VARCHAR", "price": "SMALLINT", "at": "DATE"},
+        null_columns={"SCORE"},
+    )
+    with pytest.raises(
+        ChakraSchemaError, match="column 'score' is DOUBLE but got VARCHAR"
+    ):
+        validate_columns("db.s.t", {"score": "DOUBLE"}, {"score": "VARCHAR"})
+
+    df = pd.DataFrame({"id": [1, 2], "score": [None, None], "name": ["a", None]})
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    assert null_columns(schema) == {"score"}
+    assert null_columns(schema, pa.table({"x": pa.array([None], pa.string())})) == {
+        "score",
+        "x",
+    }
+    assert null_columns(schema, df.assign(name=None)) == {"score", "name"}
+
+
+@pytest.mark.parametrize(
+    "source, target, fits",
+    [
+        ("INTEGER", "BIGINT", True),
+        ("int4", "INT8", True),
+        ("BIGINT", "INTEGER", False),
+        ("UINTEGER", "BIGINT", True),
+        ("UBIGINT", "BIGINT", False),
+        ("INTEGER", "UBIGINT", False),
+        ("BIGINT", "DOUBLE", True),
+        ("FLOAT", "DOUBLE", True),
+        ("DOUBLE", "FLOAT", False),
+        ("INTEGER", "DECIMAL(10, 0)", True),
+        ("BIGINT", "DECIMAL(18, 3)", False),
+        ("DECIMAL(5, 2)", "DECIMAL(18, 3)", True),
+        ("DECIMAL(18, 3)", "DECIMAL(18, 2)", False),
+        ("DATE", "TIMESTAMP", True),
+        ("TIMESTAMP_MS", "TIMESTAMP_NS", True),
+        ("TIMESTAMP", "TIMESTAMP_NS", True),
+        ("TIMESTAMP_NS", "TIMESTAMP", False),
+        ("VARCHAR", "ENUM('a', 'b')", True),
+        ("INTEGER[]", "BIGINT[]", True),
+        ("VARCHAR", "INTEGER", False),
+        ("TIMESTAMPTZ", "TIMESTAMP WITH TIME ZONE", True),
+    ],
+)
+def test_can_cast(source, target, fits):
+    assert can_cast(source, target) is fits
+
+
+def test_schema_cache_expiry_and_invalidation():
+    cache = SchemaCache(ttl=60)
+    cache.add("db.schema.table", {"id": "BIGINT"})
+    assert cache.exists("DB") and cache.exists("db.schema")
+    assert cache.columns("db.schema.TABLE") == {"id": "BIGINT"}
+    # Pushing narrower data does not narrow the known columns
+    cache.add("db.schema.table", {"id": "INTEGER"})
+    assert cache.columns("db.schema.table") == {"id": "BIGINT"}
+
+    cache.invalidate("db.schema.table")
+    assert cache.columns("db.schema.table") is None
+    assert cache.exists("db.schema")
+
+    cache.add("db.schema.table", {"id": "BIGINT"})
+    cache.invalidate("db.schema.table", parents=True)
+    assert not cache.exists("db")
+
+    cache = SchemaCache(ttl=0)
+    cache.add("db.schema.table", {"id": "BIGINT"})
+    assert not cache.exists("db.schema.table")
+
+    assert changes_schema("  DROP TABLE db.schema.table")
+    assert changes_schema("create or replace table t AS SELECT 1")
+    assert not changes_schema("CREATE TABLE IF NOT EXISTS t (id BIGINT)")
+    assert not changes_schema("SELECT 'drop table t'")
+
+
+@patch("requests.Session")
+def test_repeated_push_skips_ddl(mock_session):
+    """Test only the first push to a table runs DDL, and mismatches fail early."""
+    mock_session.return_value.headers = {}
+    mock_auth_response = Mock(status_code=200)
+    mock_auth_response.json.return_value = {
+        "token": "DDB_test123",
+        "columns": ["column_name", "data_type"],
+        "rows": [["id", "BIGINT"]],
+    }
+    mock_session.return_value.post.return_value = mock_auth_response
+
+    client = Chakra("access:secret:username", quiet=True, schema_cache=SchemaCache())
+    client.push("db.schema.table", pd.DataFrame({"id": [1, 2]}))
+    first_push_calls = mock_session.return_value.post.call_count
+
+    mock_session.return_value.post.reset_mock()
+    client.push("db.schema.table", pd.DataFrame({"id": [3, 4]}))
+    (insert_call,) = mock_session.return_value.post.call_args_list
+    assert b"INSERT INTO" in insert_call[1]["data"]
+    # Token, database, schema, table and its columns, then the insert
+    assert first_push_calls == 6
+
+    mock_session.return_value.post.reset_mock()
+    with pytest.raises(ChakraSchemaError, match="column 'id' is BIGINT"):
+        client.push("db.schema.table", pd.DataFrame({"id": ["a"]}))
+    mock_session.return_value.post.assert_not_called()
+
+    # Schema changes made through execute are not served from the cache
+    client.execute("DROP TABLE db.schema.table")
+    assert client.schema_cache.columns("db.schema.table") is None
+
+
+@patch("requests.Session")
+def test_push_caches_the_columns_of_an_existing_table(mock_session):
+    """Test a table kept by CREATE TABLE IF NOT EXISTS is cached with its own types."""
+    mock_session.return_value.headers = {}
+    mock_response = Mock(status_code=200)
+    mock_response.json.return_value = {
+        "token": "DDB_test123",
+        "columns": ["column_name", "data_type"],
+        "rows": [["id", "BIGINT"], ["at", "TIMESTAMP WITH TIME ZONE"]],
+    }
+    mock_session.return_value.post.return_value = mock_response
+
+    client = Chakra("access:secret:username", quiet=True, schema_cache=SchemaCache())
+    at = pd.to_datetime(["2024-01-01"]).tz_localize("UTC")
+    client.push(
+        "db.schema.table", pd.DataFrame({"id": pd.array([1], "int32"), "at": at})
+    )
+    assert client.schema_cache.columns("db.schema.table") == {
+        "id": "BIGINT",
+        "at": "TIMESTAMP WITH TIME ZONE",
+    }
+    client.push(
+        "db.schema.table", pd.DataFrame({"id": pd.array([2], "int64"), "at": at})
+    )
+
+    # Replacing the table caches the pushed columns without reading them back
+    mock_session.return_value.post.reset_mock()
+    client.push(
+        "db.schema.other",
+        pd.DataFrame({"id": [1]}),
+        replace_if_exists=True,
+    )
+    assert client.schema_cache.columns("db.schema.other") == {"id": "BIGINT"}
+    assert not any(
+        "information_schema" in str(call[1].get("json"))
+        for call in mock_session.return_value.post.call_args_list
+    )
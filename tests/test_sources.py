@@ -0,0 +1,61 @@
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from chakra_py.sources import to_record_batch_reader
+
+
+def test_dataframe_source():
+    """Test that a DataFrame is converted without its index."""
+    df = pd.DataFrame({"id": [1, 2]}, index=[10, 20])
+    table = to_record_batch_reader(df).read_all()
+    assert table.column_names == ["id"]
+    assert table.num_rows == 2
+
+
+def test_dataframe_iterable_source():
+    """Test that an iterable of DataFrames is streamed with the first frame's schema."""
+    consumed = []
+
+    def frames():
+        for i in range(3):
+            consumed.append(i)
+            yield pd.DataFrame({"id": [i, i + 10], "name": ["a", "b"]})
+
+    reader = to_record_batch_reader(frames())
+    # Only the first frame is read up front to infer the schema
+    assert consumed == [0]
+    assert reader.schema.names == ["id", "name"]
+    assert reader.read_all().column("id").to_pylist() == [0, 10, 1, 11, 2, 12]
+
+
+def test_empty_iterable_source():
+    """Test that an empty iterable is rejected since it has no schema."""
+    with pytest.raises(ValueError):
+        to_record_batch_reader(iter([]))
+
+
+def test_file_sources(tmp_path):
+    """Test that parquet and CSV paths are streamed from disk."""
+    df = pd.DataFrame({"id": [1, 2, 3], "score": [0.5, 1.5, 2.5]})
+    df.to_parquet(tmp_path / "data.parquet", index=False)
+    df.to_csv(tmp_path / "data.csv", index=False)
+
+    for path in [tmp_path / "data.parquet", str(tmp_path / "data.csv")]:
+        table = to_record_batch_reader(path).read_all()
+        pd.testing.assert_frame_equal(table.to_pandas(), df)
+
+    with pytest.raises(ValueError):
+        to_record_batch_reader(tmp_path / "data.json")
+
+
+def test_record_batch_reader_source():
+    """Test that RecordBatchReaders are passed through untouched."""
+    reader = pa.Table.from_pydict({"id": [1]}).to_reader()
+    assert to_record_batch_reader(reader) is reader
+
+
+def test_unsupported_source():
+    """Test that unsupported inputs raise a TypeError."""
+    with pytest.raises(TypeError):
+        to_record_batch_reader(42)
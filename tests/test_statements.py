@@ -0,0 +1,86 @@
+import pytest
+
+from chakra_py import PreparedStatement
+from chakra_py.protocol import bind_parameters, query_payload, rewrite_placeholders
+from chakra_py.statements import executemany_requests
+
+
+def test_rewrite_handles_many_repeated_and_reordered_parameters():
+    """Test $N placeholders past $9 bind the right values, in any order."""
+    query = "SELECT " + ", ".join(f"${i}" for i in range(12, 0, -1)) + ", $1"
+    payload = query_payload(query, list(range(1, 13)))
+    assert payload["sql"] == "SELECT " + ", ".join(["?"] * 13)
+    assert payload["parameters"] == list(range(12, 0, -1)) + [1]
+
+
+def test_rewrite_ignores_placeholders_in_literals_and_comments():
+    """Test $ and ? inside strings, identifiers and comments are left alone."""
+    query = (
+        "SELECT 'costs $2 it''s ?', \"col$3\", $$ $4 $$, $1 -- $5\n"
+        "/* $6 */ FROM t WHERE x = $2"
+    )
+    sql, order = rewrite_placeholders(query)
+    assert sql == (
+        "SELECT 'costs $2 it''s ?', \"col$3\", $$ $4 $$, ? -- $5\n"
+        "/* $6 */ FROM t WHERE x = ?"
+    )
+    assert order == (0, 1)
+
+
+def test_rewrite_rejects_invalid_placeholders():
+    """Test mixed placeholders, $0 and missing parameters are reported."""
+    with pytest.raises(ValueError, match="mix"):
+        rewrite_placeholders("SELECT $1, ?")
+    with pytest.raises(ValueError, match=r"\$1"):
+        rewrite_placeholders("SELECT $0")
+    with pytest.raises(ValueError, match=r"\$3"):
+        bind_parameters(rewrite_placeholders("SELECT $3")[1], [1, 2])
+    assert query_payload("SELECT ?, ?", [1, 2]) == {
+        "sql": "SELECT ?, ?",
+        "parameters": [1, 2],
+    }
+
+
+def test_executemany_batches_single_row_inserts():
+    """Test INSERT ... VALUES executions are packed into multi-row INSERTs."""
+    requests = list(
+        executemany_requests(
+            "INSERT INTO t VALUES ($2, $1);",
+            [(i, str(i)) for i in range(5)],
+            max_parameters=4,
+        )
+    )
+    assert [count for _, _, count in requests] == [2, 2, 1]
+    assert requests[0][0] == "INSERT INTO t VALUES (?, ?), (?, ?)"
+    assert requests[0][1] == ["0", 0, "1", 1]
+    assert requests[2] == ("INSERT INTO t VALUES (?, ?)", ["4", 4], 1)
+
+
+def test_executemany_sends_other_statements_one_by_one():
+    """Test statements that are not single-row INSERTs are not merged."""
+    requests = list(
+        executemany_requests("UPDATE t SET v = $2 WHERE id = $1", [(1, "a"), (2, "b")])
+    )
+    assert requests == [
+        ("UPDATE t SET v = ? WHERE id = ?", ["a", 1], 1),
+        ("UPDATE t SET v = ? WHERE id = ?", ["b", 2], 1),
+    ]
+    insert_select = "INSERT INTO t SELECT * FROM s WHERE id = $1"
+    assert len(list(executemany_requests(insert_select, [[1], [2]]))) == 2
+
+
+def test_prepared_statement_delegates_to_client():
+    """Test a prepared statement checks its query and runs through the client."""
+    calls = []
+
+    class Client:
+        def execute(self, query, parameters, **kwargs):
+            calls.append((query, parameters, kwargs))
+
+    statement = PreparedStatement(Client(), "SELECT $2, $1")
+    assert statement.sql == "SELECT ?, ?"
+    assert statement.parameter_count == 2
+    statement.execute((1, 2), return_type="arrow")
+    assert calls == [("SELECT $2, $1", [1, 2], {"return_type": "arrow"})]
+    with pytest.raises(ValueError):
+        PreparedStatement(Client(), "SELECT $1, ?")
@@ -0,0 +1,67 @@
+import json
+from unittest.mock import Mock, patch
+
+import pandas as pd
+import pytest
+
+from chakra_py import Chakra, SyncIndex
+from chakra_py.sync import diff_rows
+
+
+def test_diff_rows():
+    """Test inserted, updated and deleted rows are told apart by key and hash."""
+    first = pd.DataFrame({"id": [1, 2, 3], "name": ["a", "b", "c"]})
+    initial = diff_rows(first, ["id"], None, delete_missing=True)
+    assert (initial.inserted, initial.updated, initial.deleted) == (3, 0, 0)
+
+    second = pd.DataFrame({"id": [2, 3, 4], "name": ["b", "C", "d"]})
+    changes = diff_rows(second, ["id"], initial.index, delete_missing=True)
+    assert changes.changed["id"].tolist() == [3, 4]
+    assert changes.deleted_keys["id"].tolist() == [1]
+    assert (changes.inserted, changes.updated, changes.unchanged) == (1, 1, 1)
+    assert sorted(changes.index["id"]) == [2, 3, 4]
+
+    partial = diff_rows(second, ["id"], initial.index, delete_missing=False)
+    assert partial.deleted == 0
+    assert sorted(partial.index["id"]) == [1, 2, 3, 4]
+
+    with pytest.raises(ValueError, match="unique"):
+        diff_rows(pd.DataFrame({"id": [1, 1]}), ["id"], None, delete_missing=False)
+
+
+@patch("requests.Session")
+def test_sync_sends_only_changes(mock_session, tmp_path):
+    """Test a second sync stages only the changed rows and applies them."""
+    mock_session.return_value.headers = {}
+    response = Mock(status_code=200)
+    response.json.return_value = {"token": "DDB_test123", "columns": [], "rows": []}
+    mock_session.return_value.post.return_value = response
+
+    client = Chakra("access:secret:username", quiet=True)
+    index = SyncIndex(tmp_path)
+    users = pd.DataFrame({"id": range(100), "score": [1.0] * 100})
+    first = client.sync("db.schema.users", users, ["id"], index=index)
+    assert (first.inserted, first.unchanged) == (100, 0)
+
+    mock_session.return_value.post.reset_mock()
+    users.loc[5, "score"] = 2.0
+    second = client.sync(
+        "db.schema.users", users.drop(index=7), ["id"], index=index, delete_missing=True
+    )
+    assert (second.inserted, second.updated, second.deleted) == (0, 1, 1)
+    assert second.unchanged == 98
+
+    bodies = [
+        c[1].get("json") or json.loads(c[1]["data"])
+        for c in mock_session.return_value.post.call_args_list
+    ]
+    bodies = [body for body in bodies if "sql" in body]
+    inserts = [
+        b for b in bodies if b["sql"].startswith("INSERT INTO db.schema.users__")
+    ]
+    assert [b["parameters"] for b in inserts] == [[7], [5, 2.0]]
+    applied = [b["sql"] for b in bodies if "db.schema.users " in b["sql"] + " "]
+    assert [sql.split(" ")[0] for sql in applied] == ["DELETE", "DELETE", "INSERT"]
+    assert applied[-1].startswith('INSERT INTO db.schema.users ("id", "score") SELECT')
+    drops = [b["sql"] for b in bodies if b["sql"].startswith("DROP TABLE")]
+    assert len(drops) == 4  # replaced before staging, then dropped after
@@ -0,0 +1,138 @@
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+from chakra_py import Chakra, TransportConfig
+from chakra_py.transport import configure_session
+
+
+class RecordingAdapter(BaseAdapter):
+    """Transport answering every request with an empty JSON object."""
+
+    def __init__(self):
+        super().__init__()
+        self.sent = []
+
+    def send(self, request, **kwargs):
+        self.sent.append((request, kwargs))
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b"{}"
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def test_configure_session_applies_config():
+    """Test timeouts, base URL and query body compression are applied."""
+    adapter = RecordingAdapter()
+    session = requests.Session()
+    configure_session(
+        session,
+        TransportConfig(
+            read_timeout=60,
+            request_compression="gzip",
+            base_url="http://localhost:8000/",
+            adapter=adapter,
+        ),
+    )
+
+    large_query = {"sql": "SELECT " + ", ".join(["1"] * 1000)}
+    session.post("https://api.chakra.dev/api/v1/query", json=large_query)
+    session.post("https://api.chakra.dev/api/v1/query", json={"sql": "SELECT 1"})
+    session.post("https://api.chakra.dev/api/v1/servers", json=large_query)
+    session.put("https://bucket.s3.amazonaws.com/part", data=b"data", timeout=5)
+
+    (compressed, kwargs), small, token, upload = adapter.sent
+    assert compressed.url == "http://localhost:8000/api/v1/query"
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(compressed.body)) == large_query
+    assert kwargs["timeout"] == (10.0, 60)
+    assert "Content-Encoding" not in small[0].headers
+    assert "Content-Encoding" not in token[0].headers
+    assert upload[0].url == "https://bucket.s3.amazonaws.com/part"
+    assert upload[1]["timeout"] == 5
+
+
+def test_invalid_request_compression():
+    with pytest.raises(ValueError):
+        TransportConfig(request_compression="brotli")
+
+
+@pytest.fixture
+def api_server():
+    """Local stand-in for the Chakra API and its presigned upload target."""
+    requests_seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, body: dict):
+            content = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def _record(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            requests_seen.append((self.command, self.path, dict(self.headers)))
+            return self.rfile.read(length)
+
+        def do_POST(self):
+            body = self._record()
+            if self.path == "/api/v1/servers":
+                self._reply({"token": "DDB_local"})
+            elif self.path == "/api/v1/query":
+                sql = json.loads(body)["sql"]
+                self._reply({"columns": ["sql"], "rows": [[sql]]})
+            else:
+                self._reply({})
+
+        def do_GET(self):
+            self._record()
+            self._reply({"presignedUrl": f"{server.url}/upload", "key": "key"})
+
+        def do_PUT(self):
+            self._record()
+            self._reply({})
+
+        def do_DELETE(self):
+            self._record()
+            self._reply({})
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    server.requests_seen = requests_seen
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_client_against_local_server(api_server):
+    """Test the whole client can run against a local server through base_url."""
+    client = Chakra(
+        "access:secret:username",
+        quiet=True,
+        transport_config=TransportConfig(base_url=api_server.url),
+    )
+    df = client.execute("SELECT 1")
+    client.push("db.schema.table", pd.DataFrame({"id": [1, 2]}), method="parquet")
+
+    assert df["sql"][0] == "SELECT 1"
+    headers = {path: headers for _, path, headers in api_server.requests_seen}
+    assert headers["/api/v1/query"]["Authorization"] == "Bearer DDB_local"
+    # The API token is never sent to the presigned upload target
+    assert "Authorization" not in headers["/upload"]
@@ -0,0 +1,82 @@
+from decimal import Decimal
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from chakra_py import protocol
+from chakra_py.typemap import arrow_type, column_types, duckdb_type
+
+
+def test_column_types_from_dataframe():
+    """Test columns map to the narrowest DuckDB types, categoricals to VARCHAR."""
+    df = pd.DataFrame(
+        {
+            "small": pd.Series([1, 2], dtype="int16"),
+            "ratio": pd.Series([0.5, 1.0], dtype="float32"),
+            "price": [Decimal("1.25"), Decimal("2.50")],
+            "at": pd.to_datetime(["2024-01-01", "2024-01-02"]).tz_localize("UTC"),
+            "day": pd.to_datetime(["2024-01-01", "2024-01-02"]).date,
+            "kind": pd.Categorical(["a", "it's"]),
+            "tags": [["x"], []],
+        }
+    )
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+
+    assert column_types(schema) == {
+        "small": "SMALLINT",
+        "ratio": "FLOAT",
+        "price": "DECIMAL(3, 2)",
+        "at": "TIMESTAMPTZ",
+        "day": "DATE",
+        "kind": "VARCHAR",
+        "tags": "VARCHAR[]",
+    }
+    # ENUMs are only declared with values given explicitly, never the categories
+    # of the data, which later pushes may outgrow
+    enums = column_types(schema, {"kind": ["a", "b", "it's"], "small": ["1"]})
+    assert enums["kind"] == "ENUM('a', 'b', 'it''s')"
+    assert enums["small"] == "SMALLINT"
+    assert protocol.create_table_sql("db.s.t", {"id": "INTEGER", "at": "DATE"}) == (
+        "CREATE TABLE IF NOT EXISTS db.s.t (id INTEGER, at DATE)"
+    )
+
+
+@pytest.mark.parametrize(
+    "type_",
+    [
+        pa.bool_(),
+        pa.int8(),
+        pa.uint32(),
+        pa.float32(),
+        pa.float64(),
+        pa.decimal128(12, 4),
+        pa.string(),
+        pa.binary(),
+        pa.date32(),
+        pa.time64("us"),
+        pa.timestamp("ms"),
+        pa.timestamp("us", tz="UTC"),
+        pa.list_(pa.int16()),
+        pa.map_(pa.string(), pa.float64()),
+        pa.struct([("a b", pa.int32()), ('quoted "name"', pa.list_(pa.string()))]),
+    ],
+)
+def test_arrow_type_reverses_duckdb_type(type_):
+    assert arrow_type(duckdb_type(type_)) == type_
+
+
+def test_nanosecond_timestamps_are_timestamp():
+    """Test pandas' nanosecond timestamps create TIMESTAMP columns, not TIMESTAMP_NS."""
+    df = pd.DataFrame({"at": pd.to_datetime(["2024-01-01"]).astype("datetime64[ns]")})
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+
+    assert column_types(schema) == {"at": "TIMESTAMP"}
+    assert arrow_type("TIMESTAMP_NS") == pa.timestamp("ns")
+
+
+def test_arrow_type_of_other_names():
+    assert arrow_type("VARCHAR(20)") == pa.string()
+    assert arrow_type("INTEGER[3]") == pa.list_(pa.int32(), 3)
+    assert arrow_type("ENUM('a', 'b')") == pa.dictionary(pa.int32(), pa.string())
+    assert arrow_type("GEOMETRY") == pa.string()
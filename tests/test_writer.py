@@ -0,0 +1,125 @@
+import threading
+from unittest.mock import patch
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from chakra_py import BufferedWriter, Chakra
+
+
+class FakeClient:
+    """Records pushed tables, optionally blocking or failing pushes."""
+
+    def __init__(self):
+        self.pushes = []
+        self.pushed = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+        self.failures = 0
+
+    def push(self, table_name, table, **options):
+        self.release.wait(timeout=5)
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("upload failed")
+        self.pushes.append((table_name, table, options))
+        self.pushed.set()
+        return table.num_rows
+
+
+def test_writer_coalesces_writes_into_one_push():
+    """Test small writes are pushed together, as Arrow, on flush."""
+    client = FakeClient()
+    with BufferedWriter(client, "events", dedupe_on_append=True) as writer:
+        writer.write(pd.DataFrame({"id": [1, 2], "value": [0.5, None]}))
+        writer.write(pa.table({"id": [3], "value": [1.5]}))
+        writer.write(pd.DataFrame({"id": [4], "value": [7]}))
+        writer.flush()
+        assert writer.buffered_rows == 0
+
+    assert len(client.pushes) == 1
+    table_name, table, options = client.pushes[0]
+    assert (table_name, options) == ("events", {"dedupe_on_append": True})
+    assert table.column("id").to_pylist() == [1, 2, 3, 4]
+    assert table.schema.field("value").type == pa.float64()
+    assert writer.rows_written == 4 and writer.results == [4]
+
+
+def test_writer_pushes_when_rows_or_age_exceed_limits():
+    """Test pushes start in the background once max_rows or max_age is reached."""
+    client = FakeClient()
+    with BufferedWriter(client, "events", max_rows=3) as writer:
+        writer.write(pd.DataFrame({"id": [1, 2]}))
+        assert not client.pushed.wait(timeout=0.1)
+        writer.write(pd.DataFrame({"id": [3]}))
+        assert client.pushed.wait(timeout=5)
+
+    client = FakeClient()
+    with BufferedWriter(client, "events", max_age=0.05) as writer:
+        writer.write(pd.DataFrame({"id": [1]}))
+        assert client.pushed.wait(timeout=5)
+    assert writer.rows_written == 1
+
+
+def test_writer_blocks_writes_while_buffer_is_full():
+    """Test writes wait for a push to drain a full buffer."""
+    client = FakeClient()
+    client.release.clear()
+    chunk = pa.table({"id": list(range(1000))})
+    writer = BufferedWriter(
+        client, "events", max_bytes=chunk.nbytes, max_buffer_bytes=2 * chunk.nbytes
+    )
+    writer.write(chunk)  # pushed in the background, blocked
+    writer.write(chunk)  # fills the buffer
+
+    blocked = threading.Thread(target=writer.write, args=(chunk,))
+    blocked.start()
+    blocked.join(timeout=0.2)
+    assert blocked.is_alive()
+
+    client.release.set()
+    blocked.join(timeout=5)
+    assert not blocked.is_alive()
+    writer.close()
+    assert writer.rows_written == 3000
+
+
+def test_writer_raises_failed_push_and_retries_rows():
+    """Test a failed push is reported once and its rows are pushed again."""
+    client = FakeClient()
+    client.failures = 1
+    writer = BufferedWriter(client, "events")
+    writer.write(pd.DataFrame({"id": [1, 2]}))
+    with pytest.raises(ConnectionError):
+        writer.flush()
+    assert writer.buffered_rows == 2
+
+    writer.write(pd.DataFrame({"id": [3]}))
+    writer.close()
+    assert [t.column("id").to_pylist() for _, t, _ in client.pushes] == [[1, 2, 3]]
+    with pytest.raises(ValueError, match="closed"):
+        writer.write(pd.DataFrame({"id": [4]}))
+
+
+def test_writer_rejects_mismatched_rows():
+    """Test rows that cannot be combined with earlier ones are refused."""
+    with BufferedWriter(FakeClient(), "events") as writer:
+        writer.write(pd.DataFrame({"id": [1]}))
+        with pytest.raises(ValueError, match="columns"):
+            writer.write(pd.DataFrame({"id": ["a"]}))
+    with pytest.raises(ValueError, match="replace_if_exists"):
+        BufferedWriter(FakeClient(), "events", replace_if_exists=True)
+
+
+def test_client_close_flushes_writers():
+    """Test closing the client pushes the rows of its open writers."""
+    with patch.object(Chakra, "push") as push:
+        client = Chakra("access:secret:username", quiet=True)
+        writer = client.writer("events", max_age=60)
+        writer.write(pd.DataFrame({"id": [1, 2]}))
+        client.close()
+
+    push.assert_called_once()
+    assert push.call_args[0][0] == "events"
+    assert push.call_args[0][1].num_rows == 2